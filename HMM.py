@@ -13,6 +13,8 @@ from ta.momentum import RSIIndicator, StochasticOscillator
 from ta.volatility import BollingerBands, AverageTrueRange
 from ta.volume import OnBalanceVolumeIndicator, VolumePriceTrendIndicator
 
+from result_cache import ResultCache
+
 
 class ForexHMMTrader:
     def __init__(self, n_regimes: int = 3):
@@ -271,15 +273,9 @@ class ForexHMMTrader:
         plt.show()
 
 
-def main():
-    # Load your forex data
-    df = pd.read_csv("currency_hourly_data.csv")
-    # drop nan and zero values
-    df = df.dropna()
-    df = df[df["Close"] != 0]
-
-    # Initialize and train the model
-    trader = ForexHMMTrader(n_regimes=3)
+def train_and_backtest(df: pd.DataFrame, n_regimes: int = 3) -> Dict[str, object]:
+    """Fit the curriculum HMM on ``df`` and backtest its signals."""
+    trader = ForexHMMTrader(n_regimes=n_regimes)
     X, processed_df = trader.preprocess_data(df)
 
     # Identify initial regimes
@@ -296,6 +292,27 @@ def main():
 
     # Backtest strategy
     results = trader.backtest_strategy(processed_df, signals)
+    return {
+        "trader": trader,
+        "X": X,
+        "processed_df": processed_df,
+        "final_regimes": final_regimes,
+        "results": results,
+    }
+
+
+def main(use_cache: bool = True):
+    # Load your forex data
+    df = pd.read_csv("currency_hourly_data.csv")
+    # drop nan and zero values
+    df = df.dropna()
+    df = df[df["Close"] != 0]
+
+    # Re-running on unchanged data and code reuses the trained model and backtest
+    run = ResultCache().wrap(train_and_backtest) if use_cache else train_and_backtest
+    outcome = run(df, n_regimes=3)
+    trader, X, results = outcome["trader"], outcome["X"], outcome["results"]
+    processed_df, final_regimes = outcome["processed_df"], outcome["final_regimes"]
 
     # Plot results
     trader.plot_regime_transitions(final_regimes, processed_df)
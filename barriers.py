@@ -0,0 +1,103 @@
+import numpy as np
+from typing import Optional, Tuple
+
+ArrayLike = np.ndarray
+
+# Bars scanned per event on the first pass; doubles for unresolved events
+FIRST_WINDOW = 64
+MAX_ELEMENTS = 1 << 22  # Cap on (events x window) cells materialised at once
+
+
+def first_touch(
+    high: ArrayLike,
+    low: ArrayLike,
+    start: ArrayLike,
+    upper: ArrayLike,
+    lower: ArrayLike,
+    end: Optional[ArrayLike] = None,
+    window: int = FIRST_WINDOW,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find, for many events at once, the first bar that touches a barrier.
+
+    Event ``k`` scans bars ``start[k]`` up to ``end[k]`` (exclusive, default
+    the end of the series) for ``high >= upper[k]`` or ``low <= lower[k]``.
+    Use ``np.inf`` / ``-np.inf`` to disable a barrier. All events are scanned
+    together in windows that double in length for events still unresolved,
+    so the cost tracks how long positions actually stay open.
+
+    Returns ``(index, side, both)``: the touching bar (-1 if none), +1 for the
+    upper barrier, -1 for the lower one, 0 for none, and whether both
+    barriers lie inside that bar so the order of touches is unknown. When
+    both are touched ``side`` is -1; callers that need the real order can
+    drill into finer data with ``both``.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    start = np.asarray(start, dtype=np.int64)
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), start.shape)
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), start.shape)
+    end = (
+        np.full(start.shape, len(high), dtype=np.int64)
+        if end is None
+        else np.minimum(
+            np.broadcast_to(np.asarray(end, dtype=np.int64), start.shape), len(high)
+        )
+    )
+
+    index = np.full(start.shape, -1, dtype=np.int64)
+    side = np.zeros(start.shape, dtype=np.int8)
+    both = np.zeros(start.shape, dtype=bool)
+    cursor = start.copy()
+    pending = np.flatnonzero(cursor < end)
+
+    while len(pending):
+        per_chunk = max(1, MAX_ELEMENTS // window)
+        for lo in range(0, len(pending), per_chunk):
+            events = pending[lo : lo + per_chunk]
+            bars = cursor[events, None] + np.arange(window)
+            valid = bars < end[events, None]
+            bars = np.minimum(bars, len(high) - 1)
+            up = (high[bars] >= upper[events, None]) & valid
+            down = (low[bars] <= lower[events, None]) & valid
+            hit = up | down
+            found = hit.any(axis=1)
+            offset = hit.argmax(axis=1)
+            rows = np.arange(len(events))
+            done = events[found]
+            first = offset[found]
+            index[done] = cursor[done] + first
+            up_first = up[rows[found], first]
+            down_first = down[rows[found], first]
+            side[done] = np.where(down_first, -1, 1)
+            both[done] = up_first & down_first
+            cursor[events] += window
+        pending = pending[(index[pending] < 0) & (cursor[pending] < end[pending])]
+        window *= 2
+    return index, side, both
+
+
+def touch_price(
+    open_: ArrayLike,
+    index: ArrayLike,
+    side: ArrayLike,
+    upper: ArrayLike,
+    lower: ArrayLike,
+    gap_after: ArrayLike,
+) -> np.ndarray:
+    """Fill price of each barrier touch, honouring opening gaps.
+
+    A bar that opens beyond the touched barrier fills at its open, unless it
+    is at or before ``gap_after`` (the bar the order became active inside).
+    Events without a touch get NaN.
+    """
+    index = np.asarray(index)
+    side = np.asarray(side)
+    level = np.where(side > 0, upper, lower)
+    opens = np.asarray(open_, dtype=np.float64)[np.maximum(index, 0)]
+    gapped = index > np.asarray(gap_after)
+    price = np.where(
+        side > 0,
+        np.where(gapped, np.maximum(level, opens), level),
+        np.where(gapped, np.minimum(level, opens), level),
+    )
+    return np.where(side == 0, np.nan, price)
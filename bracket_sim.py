@@ -0,0 +1,253 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+from barriers import first_touch, touch_price
+from metrics import max_drawdown
+
+Zone = Tuple[str, int]
+
+
+def simulate_brackets(
+    data: pd.DataFrame,
+    zones: List[Zone],
+    initial_balance: float = 10000,
+    sl_pips: float = 25,
+    tp_ratio: float = 2,
+    pip_value: float = 0.0001,
+    size: float = 1.0,
+) -> Dict[str, object]:
+    """Array-based replay of ``CNNLSTMStrategy`` with backtrader's bracket semantics.
+
+    A zone ``(type, idx)`` fires on the bar where ``len(self) == idx`` (0-based
+    bar ``idx - 1``) and submits a limit entry at that bar's close with a stop
+    and a limit child, like ``buy_bracket``/``sell_bracket`` with the default
+    fixed stake. Matching ``BackBroker``:
+
+    * the entry limit is first checked on the next bar and fills at the open
+      when the bar gaps through it, otherwise at the limit price; it stays
+      pending until filled
+    * children become active on the bar after the entry fills; on a bar
+      where both could execute the stop wins, as it is queued first
+    * executions are netted into one position and a trade closes whenever
+      the position returns to zero, so overlapping brackets share trades
+
+    Returns fills, closed-trade PnL, wins/losses, max drawdown (account
+    currency, over the closed-trade balance curve) and the final broker
+    value, all without a per-bar Python loop.
+    """
+    opens = data["Open"].to_numpy(dtype=np.float64)
+    highs = data["High"].to_numpy(dtype=np.float64)
+    lows = data["Low"].to_numpy(dtype=np.float64)
+    closes = data["Close"].to_numpy(dtype=np.float64)
+    n = len(closes)
+
+    zones = [(zone_type, idx) for zone_type, idx in zones if 1 <= idx <= n]
+    signal_bar = np.array([idx - 1 for _, idx in zones], dtype=np.int64)
+    direction = np.array([1 if zone_type == "Demand" else -1 for zone_type, _ in zones])
+    entry_limit = closes[signal_bar] if len(zones) else np.zeros(0)
+    stop_price = entry_limit - direction * sl_pips * pip_value
+    target_price = entry_limit + direction * sl_pips * tp_ratio * pip_value
+
+    # Entry limits: buys fill when price trades down to them, sells when it trades up
+    start = signal_bar + 1
+    upper = np.where(direction > 0, np.inf, entry_limit)
+    lower = np.where(direction > 0, entry_limit, -np.inf)
+    fill_bar, fill_side, _ = first_touch(highs, lows, start, upper, lower)
+    fill_price = touch_price(opens, fill_bar, fill_side, upper, lower, start - 1)
+    filled = fill_bar >= 0
+
+    # Children: stop and limit on the other side, active from the next bar
+    rows = np.flatnonzero(filled)
+    upper = np.where(direction[rows] > 0, target_price[rows], stop_price[rows])
+    lower = np.where(direction[rows] > 0, stop_price[rows], target_price[rows])
+    hit_bar, hit_side, hit_both = first_touch(
+        highs, lows, fill_bar[rows] + 1, upper, lower
+    )
+    hit_side = np.where(hit_both, -direction[rows], hit_side)  # Stop child queued first
+    exit_bar = np.full(len(zones), -1, dtype=np.int64)
+    exit_price = np.full(len(zones), np.nan)
+    exit_bar[rows] = hit_bar
+    exit_price[rows] = touch_price(
+        opens, hit_bar, hit_side, upper, lower, fill_bar[rows]
+    )
+    exit_reason = np.full(len(zones), "", dtype=object)
+    exit_reason[rows] = np.where(
+        hit_bar < 0, "open", np.where(hit_side == -direction[rows], "stop", "target")
+    )
+    exit_reason[~filled] = "unfilled"
+
+    # Net every execution in broker queue order: bar, then bracket, then role
+    entries = np.flatnonzero(filled)
+    exits = np.flatnonzero(exit_bar >= 0)
+    exec_bar = np.concatenate([fill_bar[entries], exit_bar[exits]])
+    exec_zone = np.concatenate([entries, exits])
+    exec_role = np.concatenate([np.zeros(len(entries)), np.ones(len(exits))])
+    exec_size = np.concatenate([direction[entries], -direction[exits]]) * size
+    exec_price = np.concatenate([fill_price[entries], exit_price[exits]])
+    order = np.lexsort((exec_role, exec_zone, exec_bar))
+    exec_bar, exec_size, exec_price = (
+        exec_bar[order],
+        exec_size[order],
+        exec_price[order],
+    )
+
+    position = np.cumsum(exec_size)
+    cash_flow = -exec_size * exec_price
+    closes_trade = np.isclose(position, 0.0)
+    trade_id = np.cumsum(closes_trade) - closes_trade  # Closing fill ends its trade
+    n_closed = int(closes_trade.sum())
+    pnl_by_trade = np.bincount(trade_id, weights=cash_flow, minlength=n_closed + 1)
+    trade_pnl = pnl_by_trade[:n_closed]
+    balance = initial_balance + np.concatenate([[0.0], np.cumsum(trade_pnl)])
+
+    open_size = position[-1] if len(position) else 0.0
+    final_value = initial_balance + cash_flow.sum() + open_size * closes[-1]
+    fills = pd.DataFrame(
+        {
+            "zone": [zone_type for zone_type, _ in zones],
+            "signal_bar": signal_bar,
+            "entry_bar": fill_bar,
+            "entry_price": fill_price,
+            "exit_bar": exit_bar,
+            "exit_price": exit_price,
+            "reason": exit_reason,
+        }
+    )
+    return {
+        "fills": fills,
+        "trade_pnl": trade_pnl,
+        "balance_history": balance,
+        "total_profit": float(trade_pnl.sum()),
+        "wins": int((trade_pnl > 0).sum()),
+        "losses": int((trade_pnl <= 0).sum()),
+        "max_drawdown": float(max_drawdown(balance, relative=False)),
+        "final_value": float(final_value),
+    }
+
+
+def run_backtrader(
+    data: pd.DataFrame,
+    zones: List[Zone],
+    initial_balance: float = 10000,
+    sl_pips: float = 25,
+    tp_ratio: float = 2,
+    pip_value: float = 0.0001,
+) -> Dict[str, object]:
+    """Reference run of the same brackets through backtrader's Cerebro."""
+    import backtrader as bt
+
+    class BracketStrategy(bt.Strategy):
+        def __init__(self):
+            self.zone_index = 0
+            self.trade_pnl = []
+
+        def next(self):
+            if self.zone_index < len(zones):
+                zone_type, idx = zones[self.zone_index]
+                if len(self) == idx:
+                    entry = self.datas[0].close[0]
+                    side = 1 if zone_type == "Demand" else -1
+                    sl = entry - side * sl_pips * pip_value
+                    tp = entry + side * sl_pips * tp_ratio * pip_value
+                    if side > 0:
+                        self.buy_bracket(price=entry, stopprice=sl, limitprice=tp)
+                    else:
+                        self.sell_bracket(price=entry, stopprice=sl, limitprice=tp)
+                    self.zone_index += 1
+
+        def notify_trade(self, trade):
+            if trade.isclosed:
+                self.trade_pnl.append(trade.pnlcomm)
+
+    cerebro = bt.Cerebro()
+    cerebro.adddata(
+        bt.feeds.PandasData(
+            dataname=data,
+            datetime=None,
+            open="Open",
+            high="High",
+            low="Low",
+            close="Close",
+            volume=None,
+            openinterest=None,
+        )
+    )
+    cerebro.addstrategy(BracketStrategy)
+    cerebro.broker.set_cash(initial_balance)
+    strategy = cerebro.run()[0]
+    trade_pnl = np.array(strategy.trade_pnl)
+    balance = initial_balance + np.concatenate([[0.0], np.cumsum(trade_pnl)])
+    return {
+        "trade_pnl": trade_pnl,
+        "balance_history": balance,
+        "total_profit": float(trade_pnl.sum()),
+        "wins": int((trade_pnl > 0).sum()),
+        "losses": int((trade_pnl <= 0).sum()),
+        "max_drawdown": float(max_drawdown(balance, relative=False)),
+        "final_value": float(cerebro.broker.getvalue()),
+    }
+
+
+def compare_with_backtrader(
+    data: pd.DataFrame, zones: List[Zone], tolerance: float = 1e-6, **params
+) -> Dict[str, object]:
+    """Run both engines, check they agree and report their wall-clock times."""
+    started = time.perf_counter()
+    native = simulate_brackets(data, zones, **params)
+    native_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    reference = run_backtrader(data, zones, **params)
+    backtrader_seconds = time.perf_counter() - started
+
+    mismatches = [
+        key
+        for key in ("wins", "losses", "total_profit", "max_drawdown", "final_value")
+        if abs(native[key] - reference[key]) > tolerance
+    ]
+    if len(native["trade_pnl"]) != len(reference["trade_pnl"]) or not np.allclose(
+        native["trade_pnl"], reference["trade_pnl"], atol=tolerance
+    ):
+        mismatches.append("trade_pnl")
+    logging.info(
+        f"Native {native_seconds:.3f}s vs backtrader {backtrader_seconds:.3f}s "
+        f"({backtrader_seconds / max(native_seconds, 1e-9):.0f}x)"
+    )
+    return {
+        "equivalent": not mismatches,
+        "mismatches": mismatches,
+        "native_seconds": native_seconds,
+        "backtrader_seconds": backtrader_seconds,
+        "native": native,
+        "backtrader": reference,
+    }
+
+
+def _random_walk(bars: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0004, bars))
+    open_ = np.concatenate([[close[0]], close[:-1]]) + rng.normal(0, 0.0001, bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 0.0003, bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 0.0003, bars))
+    index = pd.date_range("2024-01-01", periods=bars, freq="15min")
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close}, index=index
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    data = _random_walk(20000)
+    rng = np.random.default_rng(1)
+    picks = np.sort(rng.choice(np.arange(1, len(data)), size=800, replace=False))
+    zones = [("Demand" if rng.random() < 0.5 else "Supply", int(i)) for i in picks]
+    report = compare_with_backtrader(data, zones)
+    print(f"Equivalent: {report['equivalent']} {report['mismatches']}")
+    print(
+        f"Native: {report['native_seconds']:.3f}s, "
+        f"backtrader: {report['backtrader_seconds']:.3f}s"
+    )
@@ -3,12 +3,11 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Conv1D, MaxPooling1D, Flatten, Dropout
-from keras_tuner.tuners import BayesianOptimization
 import math
 import time
+from onnx_export import scaler_params
+from online_inference import OnlineWindowPredictor
+from tuning import tune
 
 # Parameters
 pair = 'EURUSD'
@@ -84,52 +83,17 @@ def calculate_metrics(y_true, y_pred):
     rmse = math.sqrt(mean_squared_error(y_true, y_pred))
     return mae, rmse
 
-# Build the CNN model
-def build_cnn_model(hp):
-    model = Sequential()
-
-    # CNN layers for pattern recognition
-    model.add(Conv1D(filters=hp.Int('filters', 32, 128, step=32),
-                     kernel_size=hp.Choice('kernel_size', [3, 5]),
-                     activation='relu', input_shape=(X_train.shape[1], X_train.shape[2])))
-    model.add(MaxPooling1D(pool_size=hp.Choice('pool_size', [2, 3])))
-
-    # Flatten the CNN output for Dense layers
-    model.add(Flatten())
-
-    # Dense layers for learning more complex features
-    model.add(Dense(hp.Int('dense_units', 32, 128, step=32), activation='relu'))
-    model.add(Dropout(hp.Float('dropout', 0.2, 0.5, step=0.1)))
-
-    # Output layer (predicting the next closing price)
-    model.add(Dense(1))
-
-    # Compile the model with a loss function and optimizer
-    model.compile(optimizer=tf.keras.optimizers.Adam(hp.Float('learning_rate', 1e-4, 1e-2, sampling='log')),
-                  loss='mean_squared_error')  # MSE for regression tasks
-    return model
-
-# Bayesian Optimization tuner
-tuner = BayesianOptimization(
-    build_cnn_model,
-    objective='val_loss',
-    max_trials=10,
-    executions_per_trial=2,
-    directory='cnn_tuner_dir',
-    project_name='cnn_optimization'
-)
-
-# Perform tuning
-tuner.search(X_train, y_train, epochs=5, validation_split=0.2)
-
-# Get the best hyperparameters
-best_hps = tuner.get_best_hyperparameters(num_trials=1)[0]
-model = tuner.hypermodel.build(best_hps)
+# Search space, search and final-fit callbacks come from tuning.tune
+tuning_mode = 'bayesian'  # or 'hyperband'
+tuning_workers = 1  # > 1 runs trials in that many processes
+model, best_hps, callbacks = tune('cnn', X_train, y_train, outputs=1, mode=tuning_mode, workers=tuning_workers,
+                                  directory='cnn_tuner_dir', project_name='cnn_optimization')
 
 # Train the optimized model
-history = model.fit(X_train, y_train, epochs=20, validation_split=0.2, batch_size=32)
+history = model.fit(X_train, y_train, epochs=20, validation_split=0.2, batch_size=32,
+                    callbacks=callbacks)
 
-# Predict the next prices on the test set
+# Predict the next prices on the test set (batch predict is for the backtest only)
 predicted_prices = model.predict(X_test)
 
 # Rescale the predicted prices back to actual price values
@@ -198,12 +162,17 @@ def place_trade(action, sl_pips, tp_ratio):
     else:
         print(f"Trade placed successfully: {action} at {price}")
 
-# Example of placing a trade based on predictions
-for i in range(1, len(predicted_prices_rescaled)):
-    if predicted_prices_rescaled[i] > predicted_prices_rescaled[i - 1]:
-        place_trade("buy", sl_pips, tp_ratio)
-    elif predicted_prices_rescaled[i] < predicted_prices_rescaled[i - 1]:
-        place_trade("sell", sl_pips, tp_ratio)
+# Trade on the newest closed window only: buy if the next close is predicted
+# above the last one, sell if below
+live = OnlineWindowPredictor(model, seq_length, scaler_params(scaler))
+recent = pd.DataFrame(mt5.copy_rates_from_pos(pair, timeframe, 1, seq_length))
+predicted_close = live.prime(recent[['open', 'high', 'low', 'close']].to_numpy())[0]
+last_close = live.window[-1, 3]
+if predicted_close > last_close:
+    place_trade("buy", sl_pips, tp_ratio)
+elif predicted_close < last_close:
+    place_trade("sell", sl_pips, tp_ratio)
+print(f"Inference latency: {live.latency_stats()}")
 
 # Shutdown MT5 after finishing
 mt5.shutdown()
@@ -4,6 +4,7 @@ import numpy as np
 from pandas_ta import highest, lowest
 import matplotlib.pyplot as plt
 import logging
+from metrics import max_drawdown, win_rate
 
 
 class TradingBot:
@@ -181,30 +182,20 @@ class TradingBot:
         """Calculate and print key performance metrics."""
         net_profit = self.balance - self.initial_balance
         total_trades = len(self.trades)
-        winning_trades = [trade for trade in self.trades if trade["profit"] > 0]
-        losing_trades = [trade for trade in self.trades if trade["profit"] <= 0]
-        win_rate = len(winning_trades) / total_trades * 100 if total_trades > 0 else 0
+        trade_win_rate = win_rate([trade["profit"] for trade in self.trades]) * 100
         avg_profit = net_profit / total_trades if total_trades > 0 else 0
-        max_drawdown = self.calculate_max_drawdown()
+        max_drawdown_pct = self.calculate_max_drawdown()
 
         logging.info(f"Net Profit: {net_profit}")
         logging.info(f"Total Trades: {total_trades}")
-        logging.info(f"Win Rate: {win_rate:.2f}%")
+        logging.info(f"Win Rate: {trade_win_rate:.2f}%")
         logging.info(f"Average Profit per Trade: {avg_profit}")
-        logging.info(f"Max Drawdown: {max_drawdown:.2f}%")
+        logging.info(f"Max Drawdown: {max_drawdown_pct:.2f}%")
 
     def calculate_max_drawdown(self):
         """Calculate maximum drawdown."""
-        balances = [point["balance"] for point in self.equity_curve]
-        peak = balances[0]
-        max_drawdown = 0
-        for balance in balances:
-            if balance > peak:
-                peak = balance
-            drawdown = (peak - balance) / peak
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
-        return max_drawdown * 100  # as percentage
+        balances = np.array([point["balance"] for point in self.equity_curve])
+        return max_drawdown(balances) * 100  # as percentage
 
     def plot_results(self):
         """Plot backtesting results."""
@@ -0,0 +1,192 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from metrics import compute_metrics
+
+# One row per env step; the fields of the notebook TradingEnv info dicts
+STEP_DTYPE = np.dtype(
+    [
+        ("env", np.int32),
+        ("episode", np.int32),
+        ("tick", np.int64),
+        ("action", np.int8),
+        ("position", np.int8),
+        ("reward", np.float64),
+        ("price", np.float64),
+        ("total_reward", np.float64),
+        ("total_profit", np.float64),
+    ]
+)
+SHORT, LONG = 0, 1
+
+
+class EpisodeRecorder:
+    """Per-step history in preallocated structured arrays, spilled in chunks.
+
+    A columnar stand-in for the notebook's ``_update_history`` lists of info
+    values: a step costs one 50-byte ``STEP_DTYPE`` row instead of a dict
+    and several Python floats. Only :class:`forex_vec_env.VecForexEnv`
+    records into it (pass it as ``recorder``); the notebook ``TradingEnv``
+    classes are unchanged and still keep their own lists. When the
+    ``chunk_size`` buffer fills it is saved to ``spill_dir`` as ``.npy``
+    (or kept in memory when no directory is given) and reused. Episode
+    queries, plots and metrics filter each memory-mapped chunk and keep
+    only the matching rows; :meth:`to_array` loads everything when that is
+    really wanted.
+    """
+
+    def __init__(
+        self, chunk_size: int = 1 << 16, spill_dir: Optional[Union[str, Path]] = None
+    ):
+        self.chunk_size = chunk_size
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._buffer = np.empty(chunk_size, dtype=STEP_DTYPE)
+        self._filled = 0
+        self._chunks: List[Union[np.ndarray, Path]] = []
+
+    def __len__(self) -> int:
+        return len(self._chunks) * self.chunk_size + self._filled
+
+    def record(
+        self,
+        tick: int,
+        action: int,
+        position: int,
+        reward: float,
+        price: float,
+        total_reward: float,
+        total_profit: float,
+        env: int = 0,
+        episode: int = 0,
+    ) -> None:
+        """Append one step of one env."""
+        self._buffer[self._filled] = (
+            env,
+            episode,
+            tick,
+            action,
+            position,
+            reward,
+            price,
+            total_reward,
+            total_profit,
+        )
+        self._filled += 1
+        if self._filled == self.chunk_size:
+            self._spill()
+
+    def record_batch(self, **columns) -> None:
+        """Append one step of many envs; columns are named after ``STEP_DTYPE``.
+
+        Missing columns are zero, except ``env``, which defaults to
+        ``0 .. n - 1``. ``episode`` numbers the episodes of each env, so
+        auto-resetting vector envs can be replayed one episode at a time.
+        """
+        count = len(next(iter(columns.values())))
+        if "env" not in columns:
+            columns["env"] = np.arange(count)
+        written = 0
+        while written < count:
+            take = min(count - written, self.chunk_size - self._filled)
+            rows = self._buffer[self._filled : self._filled + take]
+            for name in STEP_DTYPE.names:
+                if name in columns:
+                    rows[name] = columns[name][written : written + take]
+                else:
+                    rows[name] = 0
+            self._filled += take
+            written += take
+            if self._filled == self.chunk_size:
+                self._spill()
+
+    def _spill(self) -> None:
+        if self.spill_dir is None:
+            self._chunks.append(self._buffer.copy())
+        else:
+            path = self.spill_dir / f"steps_{len(self._chunks):06d}.npy"
+            np.save(path, self._buffer)
+            self._chunks.append(path)
+        self._filled = 0
+
+    def _parts(self):
+        """Each chunk in order, spilled ones memory-mapped, then the live buffer."""
+        for chunk in self._chunks:
+            yield np.load(chunk, mmap_mode="r") if isinstance(chunk, Path) else chunk
+        yield self._buffer[: self._filled]
+
+    def to_array(self) -> np.ndarray:
+        """Every recorded row in order, as one in-memory structured array.
+
+        This reads all spilled chunks back into memory; queries of single
+        episodes go through :meth:`episode`, which does not.
+        """
+        return np.concatenate(list(self._parts()))
+
+    def episode(self, env: int = 0, episode: int = 0) -> np.ndarray:
+        """Rows of one episode of one env, e.g. for a replay of a vectorized run.
+
+        Each chunk is filtered on its own, so only the matching rows are
+        read into memory.
+        """
+        matches = [
+            part[(part["env"] == env) & (part["episode"] == episode)]
+            for part in self._parts()
+        ]
+        return np.concatenate(matches)
+
+    def history(self, env: int = 0, episode: int = 0) -> Dict[str, np.ndarray]:
+        """Columns keyed like the notebook ``TradingEnv.history``."""
+        rows = self.episode(env, episode)
+        return {
+            "total_reward": rows["total_reward"],
+            "total_profit": rows["total_profit"],
+            "position": rows["position"],
+        }
+
+    def metrics(
+        self, env: int = 0, episode: int = 0, periods_per_year: int = 252
+    ) -> Dict[str, float]:
+        """Standard metrics of one episode's ``total_profit`` curve."""
+        rows = self.episode(env, episode)
+        if len(rows) == 0:
+            return {}
+        equity = np.concatenate([[1.0], rows["total_profit"]])
+        result = compute_metrics(
+            equity,
+            positions=rows["position"] == LONG,
+            periods_per_year=periods_per_year,
+        )
+        result["total_reward"] = float(rows["total_reward"][-1])
+        result["steps"] = len(rows)
+        return result
+
+    def render_all(
+        self, prices: np.ndarray, env: int = 0, episode: int = 0, title=None
+    ) -> None:
+        """Plot prices with short (red) and long (green) marks, like ``render_all``."""
+        rows = self.episode(env, episode)
+        plt.plot(prices)
+        short = rows["tick"][rows["position"] == SHORT]
+        long = rows["tick"][rows["position"] == LONG]
+        plt.plot(short, prices[short], "ro")
+        plt.plot(long, prices[long], "go")
+        if title:
+            plt.title(title)
+        if len(rows):
+            plt.suptitle(
+                "Total Reward: %.6f" % rows["total_reward"][-1]
+                + " ~ "
+                + "Total Profit: %.6f" % rows["total_profit"][-1]
+            )
+
+    def clear(self) -> None:
+        """Drop every row and delete spilled chunks."""
+        for chunk in self._chunks:
+            if isinstance(chunk, Path):
+                chunk.unlink(missing_ok=True)
+        self._chunks.clear()
+        self._filled = 0
@@ -0,0 +1,506 @@
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from metrics import max_drawdown, profit_factor, win_rate
+from result_cache import ResultCache
+from forex.mql5 import param_sweep
+from forex.mql5.set_files import read_set_file, write_set_file
+
+# Inputs of CCIEABotVix75.mq5 / CCIEABotVix50(1s).mq5 with their EA defaults
+DEFAULT_PARAMS = {
+    "InpPeriodCCI": 40,
+    "InpPrice": 2,  # ENUM_APPLIED_PRICE: 1 close, 2 open, 3 high, 4 low, 5-7 median/typical/weighted
+    "InpCCILevel": 100.0,
+    "InpDuration": 93,
+    "InpSlippage": 100,
+    "takeProfitPercentage": 0.07,
+    "stopLossPercentage": 0.061,
+    "trailingStopLossPercentage": 0.0025,
+    "trailingStopTriggerPoints": 2000.0,
+    "DrawdownPercent": 10.0,
+    "useMaxDrawDownOnTrade": True,
+    "InpLot": 0.3,
+    "InpMagicNumber": 130100,
+}
+
+CCI_CHUNK = 1 << 22  # Max window elements materialised at once when computing CCI
+
+
+def load_bars(filepath: str) -> pd.DataFrame:
+    """Load an MT5 tab-separated bar export (Date, Time, OHLC, volumes, Spread)."""
+    data = pd.read_csv(
+        filepath,
+        sep="\t",
+        header=None,
+        names=[
+            "Date",
+            "Time",
+            "Open",
+            "High",
+            "Low",
+            "Close",
+            "TickVol",
+            "Vol",
+            "Spread",
+        ],
+        dtype=str,
+    )
+    numeric_cols = ["Open", "High", "Low", "Close", "TickVol", "Vol", "Spread"]
+    data[numeric_cols] = data[numeric_cols].apply(pd.to_numeric, errors="coerce")
+    data.dropna(subset=["Open", "High", "Low", "Close"], inplace=True)
+    data.index = pd.to_datetime(data["Date"] + " " + data["Time"])
+    return data.drop(columns=["Date", "Time"])
+
+
+def prepare_bars(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Convert a bar DataFrame into the contiguous arrays the simulator works on."""
+    bars = {
+        key: np.ascontiguousarray(data[col].to_numpy(dtype=np.float64))
+        for key, col in (
+            ("open", "Open"),
+            ("high", "High"),
+            ("low", "Low"),
+            ("close", "Close"),
+        )
+    }
+    spread = (
+        data["Spread"] if "Spread" in data.columns else pd.Series(0.0, index=data.index)
+    )
+    bars["spread"] = np.nan_to_num(spread.to_numpy(dtype=np.float64))
+    return bars
+
+
+def applied_price(bars: Dict[str, np.ndarray], price_type: int) -> np.ndarray:
+    """Price series for an ENUM_APPLIED_PRICE value."""
+    o, h, l, c = bars["open"], bars["high"], bars["low"], bars["close"]
+    prices = {
+        1: lambda: c,
+        2: lambda: o,
+        3: lambda: h,
+        4: lambda: l,
+        5: lambda: (h + l) / 2,
+        6: lambda: (h + l + c) / 3,
+        7: lambda: (h + l + 2 * c) / 4,
+    }
+    if price_type not in prices:
+        raise ValueError(f"Unsupported applied price {price_type}")
+    return prices[price_type]()
+
+
+def _cci_rows(windows: np.ndarray) -> np.ndarray:
+    """CCI of the last element of each window row, as MT5's iCCI computes it."""
+    sma = windows.mean(axis=1)
+    deviation = np.abs(windows - sma[:, None]).mean(axis=1) * 0.015
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(deviation > 0, (windows[:, -1] - sma) / deviation, 0.0)
+
+
+def compute_cci(
+    bars: Dict[str, np.ndarray], period: int, price_type: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return CCI of each closed bar and CCI as seen at the open of each bar.
+
+    The EA reads CCI(1) and CCI(0) on the first tick of a new bar, when the
+    forming bar's high, low and close all still equal its open. The second
+    array reproduces that value, which is exact for every applied price.
+    """
+    price = applied_price(bars, price_type)
+    n = len(price)
+    closed = np.full(n, np.nan)
+    at_open = np.full(n, np.nan)
+    if n < period:
+        return closed, at_open
+
+    windows = np.lib.stride_tricks.sliding_window_view(price, period)
+    step = max(1, CCI_CHUNK // period)
+    for start in range(0, len(windows), step):
+        block = windows[start : start + step]
+        rows = slice(start + period - 1, start + period - 1 + len(block))
+        closed[rows] = _cci_rows(block)
+        forming = block.copy()
+        forming[:, -1] = bars["open"][rows]
+        at_open[rows] = _cci_rows(forming)
+    return closed, at_open
+
+
+def _signals(
+    cci: Tuple[np.ndarray, np.ndarray], level: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Entry direction and close flags per bar, evaluated at each bar open."""
+    closed, at_open = cci
+    cci1 = np.concatenate([[np.nan], closed[:-1]])  # CCI(1): last closed bar
+    cci0 = at_open  # CCI(0): forming bar on its first tick
+    buy = (cci1 < -level) & (cci0 > -level)
+    sell = (cci1 > level) & (cci0 < level) & ~buy
+    direction = np.where(buy, 1, np.where(sell, -1, 0))
+    return direction, cci1 > level, cci1 < -level
+
+
+def _first(mask: np.ndarray, offset: int, default: int) -> int:
+    hits = np.flatnonzero(mask)
+    return offset + hits[0] if len(hits) else default
+
+
+def trailing_stops(
+    direction: int,
+    entry: float,
+    stop: float,
+    favourable: np.ndarray,
+    trigger: float,
+    trail,
+) -> np.ndarray:
+    """Stop level in force on each bar of a window when trailing on bar extremes.
+
+    ``favourable`` is the best price of each bar for the position (bid high for
+    longs, ask low for shorts). ``trail`` maps it to the new stop once the
+    move from entry exceeds ``trigger``; a bar's update applies from the next
+    bar, and stops only ever move in the position's favour.
+    """
+    if direction > 0:
+        moved = favourable - entry > trigger
+        candidate = np.where(moved, trail(favourable), -np.inf)
+        running = np.maximum.accumulate(np.concatenate([[stop], candidate[:-1]]))
+        return np.maximum(running, stop)
+    moved = entry - favourable > trigger
+    candidate = np.where(moved, trail(favourable), np.inf)
+    running = np.minimum.accumulate(np.concatenate([[stop], candidate[:-1]]))
+    return np.minimum(running, stop)
+
+
+def _resolve_exit(
+    bars: Dict[str, np.ndarray],
+    entry_bar: int,
+    direction: int,
+    entry: float,
+    stop: float,
+    target: float,
+    close_flags: np.ndarray,
+    time_bar: Optional[int],
+    point: float,
+    trailing: Optional[Tuple[float, float]],
+) -> Tuple[int, float, str]:
+    """Find the first exit of one position and its fill price."""
+    n = len(bars["open"])
+    spread = bars["spread"] * point
+    chunk = 1024
+    start = entry_bar
+    stop_in_force = stop
+    while start < n:
+        end = n if time_bar is None else min(n, time_bar + 1)
+        end = min(end, start + chunk)
+        high = bars["high"][start:end]
+        low = bars["low"][start:end]
+        opens = bars["open"][start:end]
+        ask_shift = spread[start:end]
+        if direction > 0:
+            best, worst, exit_open = high, low, opens
+        else:
+            best, worst, exit_open = (
+                low + ask_shift,
+                high + ask_shift,
+                opens + ask_shift,
+            )
+
+        if trailing is not None:
+            trigger, pct = trailing
+            stops = trailing_stops(
+                direction,
+                entry,
+                stop_in_force,
+                best,
+                trigger,
+                lambda price: price * (1 - direction * pct),
+            )
+            stop_in_force = stops[-1]
+        else:
+            stops = np.full(len(high), stop)
+
+        if direction > 0:
+            stop_hit, target_hit = worst <= stops, best >= target
+        else:
+            stop_hit, target_hit = worst >= stops, best <= target
+
+        j_stop = _first(stop_hit, start, n)
+        j_target = _first(target_hit, start, n)
+        signal_mask = close_flags[start:end].copy()
+        if start == entry_bar:
+            signal_mask[0] = False  # Close signals are only checked on later bars
+        j_signal = _first(signal_mask, start, n)
+        j_time = time_bar if time_bar is not None and time_bar < end else n
+        j_open = min(j_signal, j_time)
+        j_intra = min(j_stop, j_target)
+
+        if j_open < n and j_open <= j_intra:
+            reason = "signal" if j_signal <= j_time else "time"
+            return j_open, float(exit_open[j_open - start]), reason
+        if j_intra < n:
+            k = j_intra - start
+            gapped = j_intra > entry_bar
+            if j_stop <= j_target:  # Both inside one bar: assume the stop came first
+                level = stops[k]
+                beyond = (
+                    exit_open[k] <= level if direction > 0 else exit_open[k] >= level
+                )
+                return (
+                    j_intra,
+                    float(exit_open[k] if gapped and beyond else level),
+                    "stop",
+                )
+            beyond = exit_open[k] >= target if direction > 0 else exit_open[k] <= target
+            return (
+                j_intra,
+                float(exit_open[k] if gapped and beyond else target),
+                "target",
+            )
+        if time_bar is not None and end > time_bar:
+            break
+        start = end
+        chunk *= 2
+
+    last = n - 1
+    price = bars["close"][last] + (spread[last] if direction < 0 else 0.0)
+    return last, float(price), "end"
+
+
+def run_backtest(
+    bars: Dict[str, np.ndarray],
+    params: Dict[str, object],
+    cci: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    initial_balance: float = 10000,
+    point: float = 0.01,
+    contract_size: float = 1.0,
+    use_trailing: bool = False,
+) -> Dict[str, object]:
+    """Replay the CCI EA over bar arrays and return trades, equity and stats.
+
+    Entries, close signals and holding-time exits happen at bar opens like the
+    EA's new-bar checks; SL, TP, trailing and the per-trade drawdown stop are
+    resolved intrabar against bid (longs) or ask (shorts) extremes. The EA
+    keeps ManageTrailingStop commented out, so trailing is opt-in here. The
+    port holds one position at a time instead of hedging long and short.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    if cci is None:
+        cci = compute_cci(bars, int(params["InpPeriodCCI"]), int(params["InpPrice"]))
+    direction, close_long, close_short = _signals(cci, float(params["InpCCILevel"]))
+    signal_bars = np.flatnonzero(direction)
+
+    duration = int(params["InpDuration"])
+    lot_value = float(params["InpLot"]) * contract_size
+    tp_pct = float(params["takeProfitPercentage"])
+    sl_pct = float(params["stopLossPercentage"])
+    trailing = (
+        (
+            float(params["trailingStopTriggerPoints"]) * point,
+            float(params["trailingStopLossPercentage"]),
+        )
+        if use_trailing
+        else None
+    )
+    balance = float(initial_balance)
+    trades: List[Dict[str, object]] = []
+    bar = 0
+
+    while True:
+        k = np.searchsorted(signal_bars, bar)
+        if k >= len(signal_bars):
+            break
+        entry_bar = int(signal_bars[k])
+        side = int(direction[entry_bar])
+        entry = bars["open"][entry_bar] + (
+            bars["spread"][entry_bar] * point if side > 0 else 0.0
+        )
+        stop = entry * (1 - side * sl_pct)
+        target = entry * (1 + side * tp_pct)
+        if params["useMaxDrawDownOnTrade"] and lot_value > 0:
+            limit = balance * float(params["DrawdownPercent"]) / 100 / lot_value
+            stop = max(stop, entry - limit) if side > 0 else min(stop, entry + limit)
+        time_bar = entry_bar + max(duration - 1, 1) if duration > 0 else None
+
+        exit_bar, exit_price, reason = _resolve_exit(
+            bars,
+            entry_bar,
+            side,
+            entry,
+            stop,
+            target,
+            close_long if side > 0 else close_short,
+            time_bar,
+            point,
+            trailing,
+        )
+        profit = (exit_price - entry) * side * lot_value
+        balance += profit
+        trades.append(
+            {
+                "entry_bar": entry_bar,
+                "exit_bar": exit_bar,
+                "direction": side,
+                "entry_price": entry,
+                "exit_price": exit_price,
+                "reason": reason,
+                "profit": profit,
+                "balance": balance,
+            }
+        )
+        if reason == "end":
+            break
+        # Exits at a bar open leave that bar free for a new entry
+        bar = exit_bar if reason in ("signal", "time") else exit_bar + 1
+
+    trades_df = pd.DataFrame(
+        trades,
+        columns=[
+            "entry_bar",
+            "exit_bar",
+            "direction",
+            "entry_price",
+            "exit_price",
+            "reason",
+            "profit",
+            "balance",
+        ],
+    )
+    equity = np.concatenate([[initial_balance], trades_df["balance"].to_numpy()])
+    profits = trades_df["profit"].to_numpy()
+    stats = {
+        "net_profit": balance - initial_balance,
+        "trades": len(trades_df),
+        "win_rate": win_rate(profits),
+        "profit_factor": profit_factor(profits),
+        "max_drawdown": max_drawdown(equity),
+    }
+    return {"trades": trades_df, "equity": equity, "stats": stats}
+
+
+def _cci_key(params: Dict[str, object]) -> Tuple[int, int]:
+    return int(params["InpPeriodCCI"]), int(params["InpPrice"])
+
+
+def _sweep_cci(
+    bars: Dict[str, np.ndarray], params: Dict[str, object]
+) -> Tuple[np.ndarray, np.ndarray]:
+    return compute_cci(bars, *_cci_key(params))
+
+
+def _sweep_run(bars, params, cci, **kwargs) -> Dict[str, object]:
+    return run_backtest(bars, params, cci=cci, **kwargs)["stats"]
+
+
+def sweep(
+    bars: Dict[str, np.ndarray],
+    grid: Dict[str, list],
+    base_params: Optional[Dict[str, object]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 32,
+    rank_by: str = "net_profit",
+    cache: Optional[ResultCache] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Run every parameter combination in parallel and rank the results.
+
+    Combinations sharing a CCI period and applied price are kept together so
+    each worker computes that indicator once. With a ``cache`` only the
+    combinations not already stored for these bars and this code version
+    are simulated.
+    """
+    return param_sweep.sweep(
+        "cci_bot",
+        _sweep_run,
+        _cci_key,
+        _sweep_cci,
+        bars,
+        param_sweep.expand_grid(grid, {**DEFAULT_PARAMS, **(base_params or {})}),
+        workers=workers,
+        chunk_size=chunk_size,
+        rank_by=rank_by,
+        cache=cache,
+        dependencies=(max_drawdown,),
+        **kwargs,
+    )
+
+
+def write_winners(
+    results: pd.DataFrame,
+    template: str,
+    output_dir: str = "presets/optimised",
+    top: int = 5,
+    prefix: str = "ccieabot",
+) -> List[str]:
+    """Write the best parameter sets back out as MT5 .set presets."""
+    names = list(read_set_file(template))
+    paths = []
+    for rank, row in enumerate(results.head(top).to_dict(orient="records"), start=1):
+        params = {name: row[name] for name in names if name in row}
+        for name, value in params.items():
+            if isinstance(value, (np.integer, np.floating, np.bool_)):
+                params[name] = value.item()
+        paths.append(
+            write_set_file(
+                Path(output_dir) / f"{prefix}_{rank:02d}.set", params, template=template
+            )
+        )
+    return paths
+
+
+def parse_grid(specs: List[str]) -> Dict[str, list]:
+    """Parse ``name=a,b,c`` or ``name=start:stop:step`` grid arguments."""
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        if ":" in values:
+            start, stop, step = (float(v) for v in values.split(":"))
+            points = np.arange(start, stop + step / 2, step)
+            is_int = all(float(v).is_integer() for v in (start, stop, step))
+            grid[name] = [int(v) if is_int else round(float(v), 10) for v in points]
+        else:
+            grid[name] = [
+                int(v) if v.lstrip("-").isdigit() else float(v)
+                for v in values.split(",")
+            ]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep CCIEABot parameters on local bars"
+    )
+    parser.add_argument("--data", required=True, help="MT5 bar export (tab separated)")
+    parser.add_argument("--preset", default="forex/mql5/presets/ccieabotvx751.00.set")
+    parser.add_argument(
+        "--grid", nargs="+", default=[], help="name=a,b,c or name=start:stop:step"
+    )
+    parser.add_argument("--out", default="forex/mql5/presets/optimised")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--point", type=float, default=0.01)
+    parser.add_argument(
+        "--trailing", action="store_true", help="Enable ManageTrailingStop"
+    )
+    parser.add_argument("--cache-dir", default=None, help="Reuse results across sweeps")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    bars = prepare_bars(load_bars(args.data))
+    results = sweep(
+        bars,
+        parse_grid(args.grid),
+        base_params=read_set_file(args.preset),
+        workers=args.workers,
+        point=args.point,
+        use_trailing=args.trailing,
+        cache=ResultCache(args.cache_dir) if args.cache_dir else None,
+    )
+    print(results.head(args.top).to_string())
+    for path in write_winners(results, args.preset, args.out, top=args.top):
+        logging.info(f"Preset written: {path}")
+
+
+if __name__ == "__main__":
+    main()
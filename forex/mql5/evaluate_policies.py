@@ -0,0 +1,205 @@
+import argparse
+import functools
+import logging
+import os
+import numpy as np
+import pandas as pd
+import torch
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from stable_baselines3 import A2C, DQN, PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from forex.mql5.trading_env import TradingEnv
+from forex.mql5.v76 import add_technical_indicators, load_and_clean_data
+from metrics import compute_metrics
+
+ALGORITHMS = {"ppo": PPO, "dqn": DQN, "a2c": A2C}
+DateRange = Tuple[Optional[str], Optional[str]]
+
+_WORKER_MODELS: Dict[Tuple[str, str], object] = {}
+_WORKER_DATA: Dict[str, pd.DataFrame] = {}
+
+
+def parse_range(text: str) -> DateRange:
+    """``start:end`` with either side optional, e.g. ``2024-01-01:`` or ``:``."""
+    start, _, end = text.partition(":")
+    return start or None, end or None
+
+
+def _init_worker() -> None:
+    # One policy forward pass per step; several workers must not share cores
+    torch.set_num_threads(1)
+
+
+def _model(path: str, algo: str):
+    key = (path, algo)
+    if key not in _WORKER_MODELS:
+        _WORKER_MODELS[key] = ALGORITHMS[algo].load(path, device="cpu")
+    return _WORKER_MODELS[key]
+
+
+def _features(path: str) -> pd.DataFrame:
+    if path not in _WORKER_DATA:
+        _WORKER_DATA[path] = add_technical_indicators(load_and_clean_data(path))
+    return _WORKER_DATA[path]
+
+
+def _rollout(model, vec_env, deterministic: bool) -> List[np.ndarray]:
+    """Step every env to its first episode end; one batched predict per step."""
+    num_envs = vec_env.num_envs
+    rewards: List[List[float]] = [[] for _ in range(num_envs)]
+    live = np.ones(num_envs, dtype=bool)
+    obs = vec_env.reset()
+    while live.any():
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        obs, step_rewards, dones, _ = vec_env.step(actions)
+        for env in np.flatnonzero(live):
+            rewards[env].append(float(step_rewards[env]))
+        live &= ~dones
+    return [np.asarray(r) for r in rewards]
+
+
+def evaluate_job(job: dict) -> List[dict]:
+    """All date ranges and seeds of one model on one file.
+
+    Each seed is its own rollout: the policy is reseeded and the ranges
+    step together as one vector env, one episode per range, so a seed's
+    result does not depend on which other seeds were asked for. A
+    deterministic policy ignores the seed, so only the first one is run.
+    """
+    model = _model(job["model"], job["algo"])
+    data = _features(job["data"])
+    frames = [data.loc[start:end] for start, end in job["ranges"]]
+    # Frames shorter than one step would end their episode before it started
+    frames = [frame for frame in frames if len(frame) > 1]
+    if not frames:
+        logging.warning(f"No bars of {job['data']} in the requested date ranges")
+        return []
+    seeds = job["seeds"][:1] if job["deterministic"] else job["seeds"]
+
+    rows = []
+    for seed in seeds:
+        vec_env = DummyVecEnv(
+            [functools.partial(TradingEnv, frame) for frame in frames]
+        )
+        if job.get("normalize"):
+            vec_env = VecNormalize.load(job["normalize"], vec_env)
+            vec_env.training = False
+            vec_env.norm_reward = False
+        model.set_random_seed(seed)
+        try:
+            episodes = _rollout(model, vec_env, job["deterministic"])
+        finally:
+            vec_env.close()
+
+        for frame, rewards in zip(frames, episodes):
+            # Per-step returns on the env's initial balance, as in v76.evaluate_rl_model
+            equity = np.concatenate([[1.0], np.cumprod(1.0 + rewards / 10000)])
+            row = {
+                "model": Path(job["model"]).stem,
+                "data": Path(job["data"]).stem,
+                "start": str(frame.index[0]),
+                "end": str(frame.index[-1]),
+                "seed": seed,
+                "steps": len(rewards),
+                "total_reward": float(rewards.sum()),
+            }
+            row.update(
+                compute_metrics(equity, periods_per_year=job["periods_per_year"])
+            )
+            rows.append(row)
+    return rows
+
+
+def evaluate_policies(
+    models: Sequence[str],
+    data_files: Sequence[str],
+    algo: str = "ppo",
+    ranges: Sequence[DateRange] = ((None, None),),
+    seeds: Sequence[int] = (0,),
+    normalize: Optional[Sequence[Optional[str]]] = None,
+    deterministic: bool = False,
+    periods_per_year: int = 252,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Metrics of every model on every file, date range and seed, in one table.
+
+    Each (model, file) pair is a job for one worker process, which loads
+    the policy and the file's features once and steps the pair's ranges
+    together, once per seed. ``normalize`` gives each model's saved
+    ``VecNormalize`` statistics (or None), applied frozen as in v76.
+    """
+    normalize = list(normalize) if normalize else [None] * len(models)
+    if len(normalize) != len(models):
+        raise ValueError("Give one normalize path (or none at all) per model.")
+    jobs = [
+        {
+            "model": model,
+            "algo": algo,
+            "normalize": stats,
+            "data": data_file,
+            "ranges": list(ranges),
+            "seeds": list(seeds),
+            "deterministic": deterministic,
+            "periods_per_year": periods_per_year,
+        }
+        for model, stats in zip(models, normalize)
+        for data_file in data_files
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _init_worker()
+        results = [evaluate_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(evaluate_job, jobs))
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate saved RL policies across data files, date ranges and seeds"
+    )
+    parser.add_argument("--models", nargs="+", required=True, help="Saved model .zip")
+    parser.add_argument("--data", nargs="+", required=True, help="MT5 bar exports")
+    parser.add_argument("--algo", choices=sorted(ALGORITHMS), default="ppo")
+    parser.add_argument(
+        "--normalize", nargs="+", default=None, help="VecNormalize .pkl per model"
+    )
+    parser.add_argument(
+        "--ranges", nargs="+", default=[":"], help="start:end date ranges"
+    )
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--deterministic", action="store_true")
+    parser.add_argument("--periods-per-year", type=int, default=252)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="reports/policy_evaluation.csv")
+    args = parser.parse_args()
+
+    table = evaluate_policies(
+        args.models,
+        args.data,
+        algo=args.algo,
+        ranges=[parse_range(text) for text in args.ranges],
+        seeds=args.seeds,
+        normalize=args.normalize,
+        deterministic=args.deterministic,
+        periods_per_year=args.periods_per_year,
+        workers=args.workers,
+    )
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.output, index=False)
+    if table.empty:
+        print("No results.")
+        return
+    summary = table.groupby(["model", "data"])[
+        ["total_reward", "total_return", "sharpe", "max_drawdown"]
+    ].agg(["mean", "std"])
+    print(summary.to_string())
+    print(f"Per-run metrics written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+from result_cache import ResultCache, code_version, data_fingerprint
+
+Params = Dict[str, object]
+
+# Per-process state: bars are shipped once per worker, and each group's shared
+# inputs (an indicator, swing levels) are prepared once per worker
+_WORKER_BARS: Optional[Dict[str, np.ndarray]] = None
+_WORKER_PREPARED: Dict[Hashable, Any] = {}
+
+
+def _init_worker(bars: Dict[str, np.ndarray]) -> None:
+    global _WORKER_BARS
+    _WORKER_BARS = bars
+    _WORKER_PREPARED.clear()
+
+
+def _run_chunk(job) -> List[Params]:
+    run, group_key, prepare, combos, kwargs = job
+    rows = []
+    for params in combos:
+        key = group_key(params)
+        if key not in _WORKER_PREPARED:
+            _WORKER_PREPARED[key] = prepare(_WORKER_BARS, params)
+        stats = run(_WORKER_BARS, params, _WORKER_PREPARED[key], **kwargs)
+        rows.append({**params, **stats})
+    return rows
+
+
+def expand_grid(grid: Dict[str, list], base: Params) -> List[Params]:
+    """Cartesian product of the grid on top of the base parameters."""
+    names = list(grid)
+    return [
+        {**base, **dict(zip(names, values))}
+        for values in itertools.product(*grid.values())
+    ]
+
+
+def sweep(
+    strategy: str,
+    run: Callable[..., Params],
+    group_key: Callable[[Params], Hashable],
+    prepare: Callable[[Dict[str, np.ndarray], Params], Any],
+    bars: Dict[str, np.ndarray],
+    combos: List[Params],
+    workers: Optional[int] = None,
+    chunk_size: int = 32,
+    rank_by: str = "net_profit",
+    cache: Optional[ResultCache] = None,
+    dependencies: Sequence[Any] = (),
+    **kwargs,
+) -> pd.DataFrame:
+    """Backtest every parameter combination in parallel and rank the results.
+
+    ``run(bars, params, prepared, **kwargs)`` returns the stats of one
+    backtest, where ``prepared`` is ``prepare(bars, params)`` for the
+    combination's ``group_key``. Combinations are sorted by that key and
+    chunked, so each worker prepares a group once. With a ``cache`` only
+    combinations not already stored for these bars and the code version of
+    ``run``'s module and its ``dependencies`` are simulated; ``strategy``
+    names the bot in cache keys and logs. Functions must be module-level so
+    they can be sent to worker processes.
+    """
+    combos = list(combos)
+    rows: List[Params] = []
+    keys: Dict[int, str] = {}
+    if cache is not None:
+        fingerprint = data_fingerprint(bars)
+        version = code_version(run, *dependencies)
+        missing = []
+        for params in combos:
+            key = cache.key(strategy, {**params, **kwargs}, fingerprint, version)
+            stats = cache.get(key)
+            if stats is None:
+                keys[id(params)] = key
+                missing.append(params)
+            else:
+                rows.append({**params, **stats})
+        logging.info(f"{len(rows)} of {len(combos)} combinations served from cache")
+        combos = missing
+
+    combos.sort(key=group_key)
+    jobs = [
+        (run, group_key, prepare, combos[i : i + chunk_size], kwargs)
+        for i in range(0, len(combos), chunk_size)
+    ]
+    logging.info(
+        f"Sweeping {len(combos)} {strategy} parameter combinations in {len(jobs)} jobs"
+    )
+
+    new_rows: List[Params] = []
+    if workers == 1:
+        _init_worker(bars)
+        for job in jobs:
+            new_rows.extend(_run_chunk(job))
+    elif jobs:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(bars,)
+        ) as pool:
+            for chunk_rows in pool.map(_run_chunk, jobs):
+                new_rows.extend(chunk_rows)
+    if cache is not None:
+        for params, row in zip(combos, new_rows):
+            cache.put(keys[id(params)], {k: row[k] for k in row if k not in params})
+    rows.extend(new_rows)
+    return (
+        pd.DataFrame(rows).sort_values(rank_by, ascending=False).reset_index(drop=True)
+    )
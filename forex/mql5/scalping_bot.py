@@ -0,0 +1,492 @@
+import argparse
+import heapq
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from barriers import first_touch, touch_price
+from metrics import max_drawdown, profit_factor, win_rate
+from result_cache import ResultCache
+from forex.mql5 import param_sweep
+from forex.mql5.cci_bot import load_bars, parse_grid, trailing_stops, write_winners
+from forex.mql5.cci_bot import prepare_bars as prepare_price_bars
+from forex.mql5.set_files import read_set_file
+
+# TradingProfileType in GeneralScalpingBot.mq5
+FOREX, BITCOIN, GOLD, US_INDICES = 0, 1, 2, 3
+PERCENT_PROFILES = {BITCOIN: "crypto", GOLD: "gold", US_INDICES: "indices"}
+
+# Inputs of GeneralScalpingBot.mq5 that drive its orders, with their EA defaults
+DEFAULT_PARAMS = {
+    "tradingProfile": FOREX,
+    "riskPercentage": 2.0,
+    "expirationBars": 100,
+    "numberOfCandlesRange": 200,
+    "barsToLookBack": 5,
+    "startHour": 0,
+    "endHour": 0,
+    "cryptoTakeProfitPercentage": 0.2,
+    "cryptoStopLossPercentage": 0.2,
+    "cryptoTrailingStopLossAsPercentOfTP": 5.0,
+    "cryptoTrailingStopLossTriggerAsPercentOfTP": 7.0,
+    "goldTakeProfitPercentage": 0.2,
+    "goldStopLossPercentage": 0.2,
+    "goldTrailingStopLossAsPercentOfTP": 5.0,
+    "goldTrailingStopLossTriggerAsPercentOfTP": 7.0,
+    "indicesTakeProfitPercentage": 0.2,
+    "indicesStopLossPercentage": 0.2,
+    "indicesTrailingStopLossAsPercentOfTP": 5.0,
+    "indicesTrailingStopLossTriggerAsPercentOfTP": 7.0,
+    "forexTakeProfitPoints": 200.0,
+    "forexStopLossPoints": 200.0,
+    "forexTrailingStopLossPoints": 10.0,
+    "forexTrailingStopLossTrigger": 15.0,
+}
+
+TRADE_COLUMNS = [
+    "order_bar",
+    "entry_bar",
+    "exit_bar",
+    "direction",
+    "entry_price",
+    "exit_price",
+    "stop_distance",
+    "reason",
+]
+
+
+def prepare_bars(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Price arrays plus the hour of each bar for the trading-hours filter."""
+    bars = prepare_price_bars(data)
+    bars["hour"] = np.asarray(data.index.hour, dtype=np.int64)
+    return bars
+
+
+def swing_levels(
+    high: np.ndarray, open_: np.ndarray, lookback: int, candles_range: int
+) -> np.ndarray:
+    """Price ``findHighs`` returns on the first tick of every bar, NaN for -1.
+
+    Walking back from the forming bar (whose high is still its open), the EA
+    returns the first bar ``i`` with ``lookback < i < candles_range`` that is
+    the iHighest of bars ``i - lookback .. i + lookback`` and above every
+    newer bar. Such a bar is a running record scanned backwards, so each
+    round searches all bars at once for the next record and stops at those
+    that are swings. Pass ``-low``/``-open`` (and negate) for ``findLows``.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    open_ = np.asarray(open_, dtype=np.float64)
+    n = len(high)
+    levels = np.full(n, np.nan)
+    if lookback > 0:
+        older = pd.Series(high).rolling(lookback, min_periods=1).max().shift(1)
+        older = older.to_numpy()
+    else:
+        older = np.full(n, np.nan)
+    # iHighest picks the newest bar on ties, so a swing only needs to match older bars
+    swing = ~(older > high)
+
+    t = np.arange(lookback + 1, n)
+    if candles_range <= lookback + 1 or not len(t):
+        return levels
+    newest = np.fmax(open_[t], older[t])  # Forming bar and shifts 1..lookback
+    reversed_high = high[::-1].copy()
+    start = n - 1 - (t - lookback - 1)
+    end = n - 1 - (t - candles_range)
+    upper = np.nextafter(newest, np.inf)
+    while len(t):
+        # Records are usually a few bars back, so start with short windows
+        index, _, _ = first_touch(
+            reversed_high, reversed_high, start, upper, -np.inf, end=end, window=8
+        )
+        found = index >= 0
+        j = n - 1 - index[found]
+        t, start, end = t[found], index[found] + 1, end[found]
+        done = swing[j]
+        levels[t[done]] = high[j[done]]
+        keep = ~done
+        t, start, end = t[keep], start[keep], end[keep]
+        upper = np.nextafter(high[j[keep]], np.inf)
+    return levels
+
+
+def order_distances(
+    params: Dict[str, object], ask: np.ndarray, point: float
+) -> Dict[str, np.ndarray]:
+    """Per-bar price distances OnTick derives from the trading profile.
+
+    The percentage profiles scale with the ask (``pct * ask`` points) and place
+    orders half a take profit away; Forex uses fixed points, a 100 point
+    order distance and, as in the EA, its stop loss as the take profit.
+    ``orderDistancePointsInp`` is not read by the EA and has no effect here.
+    """
+    profile = int(params["tradingProfile"])
+    ones = np.ones(len(ask))
+    if profile in PERCENT_PROFILES:
+        prefix = PERCENT_PROFILES[profile]
+        tp = float(params[f"{prefix}TakeProfitPercentage"]) * ask
+        sl = float(params[f"{prefix}StopLossPercentage"]) * ask
+        trail = float(params[f"{prefix}TrailingStopLossAsPercentOfTP"]) / 100 * tp
+        trigger = (
+            float(params[f"{prefix}TrailingStopLossTriggerAsPercentOfTP"]) / 100 * tp
+        )
+        distance = tp / 2
+    elif profile == FOREX:
+        tp = float(params["forexStopLossPoints"]) * ones
+        sl = float(params["forexStopLossPoints"]) * ones
+        trail = float(params["forexTrailingStopLossPoints"]) * ones
+        trigger = float(params["forexTrailingStopLossTrigger"]) * ones
+        distance = 100.0 * ones
+    else:
+        raise ValueError(f"Unknown trading profile {profile}")
+    return {
+        "tp": tp * point,
+        "sl": sl * point,
+        "trail": trail * point,
+        "trigger": trigger * point,
+        "distance": distance * point,
+    }
+
+
+def trading_hours(hours: np.ndarray, start_hour: int, end_hour: int) -> np.ndarray:
+    """Bars on which OnTick gets past its hour checks.
+
+    The EA compares the StartHour/EndHour ordinals directly with the hour,
+    so ``startHour=6`` trades from 06:00 and ``endHour=0`` disables the end.
+    """
+    allowed = hours >= start_hour
+    if end_hour != 0:
+        allowed &= hours < end_hour
+    return allowed
+
+
+def _resolve_exit(
+    bars: Dict[str, np.ndarray],
+    dist: Dict[str, np.ndarray],
+    fill_bar: int,
+    direction: int,
+    entry: float,
+    stop: float,
+    target: float,
+    point: float,
+) -> Tuple[int, float, str]:
+    """First SL/TP exit of one position, trailing on bar extremes after the fill bar."""
+    n = len(bars["open"])
+    initial_stop = stop
+    start = fill_bar + 1
+    chunk = 256
+    while start < n:
+        end = min(n, start + chunk)
+        extended = slice(start, min(n, end + 1))  # One more bar carries the last update
+        shift = 0.0 if direction > 0 else bars["spread"][extended] * point
+        high = bars["high"][extended] + shift
+        low = bars["low"][extended] + shift
+        opens = bars["open"][extended] + shift
+        best, worst = (high, low) if direction > 0 else (low, high)
+        trail = dist["trail"][extended]
+        stops = trailing_stops(
+            direction,
+            entry,
+            stop,
+            best,
+            dist["trigger"][extended],
+            lambda price: price - direction * trail,
+        )
+        stop = stops[-1]
+        m = end - start
+        if direction > 0:
+            stop_hit, target_hit = worst[:m] <= stops[:m], best[:m] >= target
+        else:
+            stop_hit, target_hit = worst[:m] >= stops[:m], best[:m] <= target
+        hit = stop_hit | target_hit
+        if hit.any():
+            k = int(hit.argmax())
+            if stop_hit[k]:  # Both inside one bar: assume the stop came first
+                level = stops[k]
+                beyond = opens[k] <= level if direction > 0 else opens[k] >= level
+                reason = "stop" if level == initial_stop else "trailing"
+                return start + k, float(opens[k] if beyond else level), reason
+            beyond = opens[k] >= target if direction > 0 else opens[k] <= target
+            return start + k, float(opens[k] if beyond else target), "target"
+        start = end
+        chunk *= 2
+
+    last = n - 1
+    price = bars["close"][last] + (bars["spread"][last] * point if direction < 0 else 0)
+    return last, float(price), "end"
+
+
+def _side_trades(
+    bars: Dict[str, np.ndarray],
+    dist: Dict[str, np.ndarray],
+    direction: int,
+    levels: np.ndarray,
+    allowed: np.ndarray,
+    expiration_bars: int,
+    point: float,
+) -> List[Dict[str, object]]:
+    """Orders and positions of one side; the EA keeps at most one of each side."""
+    n = len(bars["open"])
+    ask_shift = bars["spread"] * point
+    ask_open = bars["open"] + ask_shift
+    if direction > 0:
+        # Buy stop above the ask, at least the order distance away
+        placeable = allowed & (ask_open <= levels - dist["distance"])
+        placeable &= levels - dist["sl"] <= ask_open
+    else:
+        placeable = allowed & (bars["open"] >= levels + dist["distance"])
+        placeable &= levels + dist["sl"] >= bars["open"]
+    candidates = np.flatnonzero(placeable)
+
+    # Pending orders die at expiry or at the next out-of-hours bar (CloseAllOrders)
+    positions = np.where(~allowed, np.arange(n), n)
+    next_closed = np.minimum.accumulate(positions[::-1])[::-1]
+    next_closed = np.concatenate([next_closed[1:], [n]])
+    expiry = np.minimum(candidates + max(expiration_bars, 1), next_closed[candidates])
+    entry = levels[candidates]
+    if direction > 0:
+        high = bars["high"] + ask_shift
+        upper, lower = entry, -np.inf
+        fill_bar, side, _ = first_touch(high, high, candidates, upper, lower, expiry)
+        fill_price = touch_price(ask_open, fill_bar, side, upper, lower, candidates)
+    else:
+        upper, lower = np.inf, entry
+        fill_bar, side, _ = first_touch(
+            bars["low"], bars["low"], candidates, upper, lower, expiry
+        )
+        fill_price = touch_price(bars["open"], fill_bar, side, upper, lower, candidates)
+
+    trades = []
+    bar = 0
+    while True:
+        k = int(np.searchsorted(candidates, bar))
+        if k >= len(candidates):
+            break
+        order_bar = int(candidates[k])
+        if fill_bar[k] < 0:
+            bar = int(expiry[k])
+            continue
+        stop = entry[k] - direction * dist["sl"][order_bar]
+        target = entry[k] + direction * dist["tp"][order_bar]
+        exit_bar, exit_price, reason = _resolve_exit(
+            bars,
+            dist,
+            int(fill_bar[k]),
+            direction,
+            float(fill_price[k]),
+            stop,
+            target,
+            point,
+        )
+        trades.append(
+            {
+                "order_bar": order_bar,
+                "entry_bar": int(fill_bar[k]),
+                "exit_bar": exit_bar,
+                "direction": direction,
+                "entry_price": float(fill_price[k]),
+                "exit_price": exit_price,
+                "stop_distance": float(dist["sl"][order_bar]),
+                "reason": reason,
+            }
+        )
+        if reason == "end":
+            break
+        bar = exit_bar + 1
+    return trades
+
+
+def lot_sizes(
+    trades: pd.DataFrame,
+    initial_balance: float,
+    risk_percentage: float,
+    contract_size: float,
+    lot_step: float = 0.01,
+    min_lot: float = 0.01,
+    max_lot: float = 100.0,
+) -> np.ndarray:
+    """Lots of every order from lotSizeOptimization on the balance when it was placed."""
+    order_bar = trades["order_bar"].to_numpy()
+    exit_bar = trades["exit_bar"].to_numpy()
+    stop_distance = trades["stop_distance"].to_numpy()
+    move = (trades["exit_price"] - trades["entry_price"]).to_numpy()
+    move = move * trades["direction"].to_numpy()
+    lots = np.zeros(len(trades))
+    balance = initial_balance
+    open_trades: List[Tuple[int, int]] = []
+    for i in np.argsort(order_bar, kind="stable"):
+        # Only trades closed before this order was placed count towards the balance
+        while open_trades and open_trades[0][0] < order_bar[i]:
+            _, j = heapq.heappop(open_trades)
+            balance += move[j] * lots[j] * contract_size
+        if risk_percentage > 0:
+            risk = balance * risk_percentage / 100
+            money_per_lot = stop_distance[i] * contract_size * lot_step
+            size = np.floor(risk / money_per_lot) * lot_step
+            lots[i] = round(min(max(size, min_lot), max_lot), 2)
+        else:
+            lots[i] = 0.01
+        heapq.heappush(open_trades, (int(exit_bar[i]), int(i)))
+    return lots
+
+
+def run_backtest(
+    bars: Dict[str, np.ndarray],
+    params: Dict[str, object],
+    levels: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    initial_balance: float = 10000,
+    point: float = 0.01,
+    contract_size: float = 100.0,
+    lot_step: float = 0.01,
+    min_lot: float = 0.01,
+    max_lot: float = 100.0,
+) -> Dict[str, object]:
+    """Replay GeneralScalpingBot over bar arrays and return trades, equity and stats.
+
+    On every bar open the EA places a buy stop at the latest swing high and
+    a sell stop at the latest swing low when that side has no order or
+    position. Orders expire after ``expirationBars`` or at the first bar
+    outside the trading hours, fill on ask highs (buys) or bid lows (sells),
+    and positions exit on SL/TP with the trailing stop applied from the bar
+    after the fill. ``levels`` are the ``findHighs``/``findLows`` arrays for
+    these bars, which sweeps share between runs. The drawdown close is not
+    modelled.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    if levels is None:
+        levels = swing_levels_for(bars, params)
+    ask = bars["open"] + bars["spread"] * point
+    dist = order_distances(params, ask, point)
+    allowed = trading_hours(
+        bars["hour"], int(params["startHour"]), int(params["endHour"])
+    )
+    expiration = int(params["expirationBars"])
+    trades = _side_trades(bars, dist, 1, levels[0], allowed, expiration, point)
+    trades += _side_trades(bars, dist, -1, levels[1], allowed, expiration, point)
+
+    trades_df = pd.DataFrame(trades, columns=TRADE_COLUMNS)
+    trades_df["lots"] = lot_sizes(
+        trades_df,
+        initial_balance,
+        float(params["riskPercentage"]),
+        contract_size,
+        lot_step,
+        min_lot,
+        max_lot,
+    )
+    move = (trades_df["exit_price"] - trades_df["entry_price"]) * trades_df["direction"]
+    trades_df["profit"] = move * trades_df["lots"] * contract_size
+    trades_df = trades_df.sort_values(["exit_bar", "order_bar"], kind="stable")
+    trades_df = trades_df.reset_index(drop=True)
+    trades_df["balance"] = initial_balance + trades_df["profit"].cumsum()
+
+    equity = np.concatenate([[initial_balance], trades_df["balance"].to_numpy()])
+    profits = trades_df["profit"].to_numpy()
+    stats = {
+        "net_profit": equity[-1] - initial_balance,
+        "trades": len(trades_df),
+        "win_rate": win_rate(profits),
+        "profit_factor": profit_factor(profits),
+        "max_drawdown": max_drawdown(equity),
+    }
+    return {"trades": trades_df, "equity": equity, "stats": stats}
+
+
+def swing_levels_for(
+    bars: Dict[str, np.ndarray], params: Dict[str, object]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``findHighs`` and ``findLows`` for every bar with the params' swing inputs."""
+    lookback = int(params["barsToLookBack"])
+    candles_range = int(params["numberOfCandlesRange"])
+    highs = swing_levels(bars["high"], bars["open"], lookback, candles_range)
+    lows = -swing_levels(-bars["low"], -bars["open"], lookback, candles_range)
+    return highs, lows
+
+
+def _swing_key(params: Dict[str, object]) -> Tuple[int, int]:
+    return int(params["barsToLookBack"]), int(params["numberOfCandlesRange"])
+
+
+def _sweep_run(bars, params, levels, **kwargs) -> Dict[str, object]:
+    return run_backtest(bars, params, levels=levels, **kwargs)["stats"]
+
+
+def sweep(
+    bars: Dict[str, np.ndarray],
+    grid: Dict[str, list],
+    base_params: Optional[Dict[str, object]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    rank_by: str = "net_profit",
+    cache: Optional[ResultCache] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Run every parameter combination in parallel and rank the results.
+
+    Combinations sharing ``barsToLookBack`` and ``numberOfCandlesRange`` are
+    kept together so each worker finds those swing levels once. With a
+    ``cache`` only combinations not already stored are simulated.
+    """
+    return param_sweep.sweep(
+        "scalping_bot",
+        _sweep_run,
+        _swing_key,
+        swing_levels_for,
+        bars,
+        param_sweep.expand_grid(grid, {**DEFAULT_PARAMS, **(base_params or {})}),
+        workers=workers,
+        chunk_size=chunk_size,
+        rank_by=rank_by,
+        cache=cache,
+        dependencies=(first_touch, trailing_stops, max_drawdown),
+        **kwargs,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep GeneralScalpingBot parameters on local M1 bars"
+    )
+    parser.add_argument("--data", required=True, help="MT5 bar export (tab separated)")
+    parser.add_argument(
+        "--preset", default="forex/mql5/presets/generalscalpingbot1.01-gold-1m.set"
+    )
+    parser.add_argument(
+        "--grid", nargs="+", default=[], help="name=a,b,c or name=start:stop:step"
+    )
+    parser.add_argument("--out", default="forex/mql5/presets/optimised")
+    parser.add_argument("--prefix", default="generalscalpingbot")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--point", type=float, default=0.01)
+    parser.add_argument(
+        "--contract-size", type=float, default=100.0, help="100 for gold, 1 for indices"
+    )
+    parser.add_argument("--rank-by", default="net_profit")
+    parser.add_argument("--cache-dir", default=None, help="Reuse results across sweeps")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    bars = prepare_bars(load_bars(args.data))
+    results = sweep(
+        bars,
+        parse_grid(args.grid),
+        base_params=read_set_file(args.preset),
+        workers=args.workers,
+        rank_by=args.rank_by,
+        cache=ResultCache(args.cache_dir) if args.cache_dir else None,
+        point=args.point,
+        contract_size=args.contract_size,
+    )
+    print(results.head(args.top).to_string())
+    for path in write_winners(
+        results, args.preset, args.out, top=args.top, prefix=args.prefix
+    ):
+        logging.info(f"Preset written: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from barriers import first_touch, touch_price
+from metrics import profit_factor, win_rate
+from forex.mql5.cci_bot import load_bars
+
+# Sessions hard-coded in SessionBreakoutEA.mq5 (server time)
+DEFAULT_SESSIONS = [
+    ("Tokyo", 0, 0),
+    ("London", 8, 0),
+    ("New York", 13, 0),
+    ("Sydney", 22, 0),
+    ("Singapore", 1, 0),
+]
+DEFAULT_SYMBOLS = "EURUSD,GBPUSD,AUDUSD,USDJPY,USDCAD,XAUUSD,USDCHF"
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_sessions(
+    custom_sessions: str = "",
+    use_default: bool = True,
+    use_custom: bool = False,
+) -> List[Tuple[str, int, int]]:
+    """Build the session list the way the EA's InitializeSessions does.
+
+    ``custom_sessions`` uses the EA input format ``"Name,StartHour,StartMinute;..."``;
+    malformed entries are skipped like in MQL5.
+    """
+    if not use_default and not use_custom:
+        raise ValueError("Either default sessions or custom sessions must be enabled")
+    sessions = list(DEFAULT_SESSIONS) if use_default else []
+    if use_custom:
+        for entry in custom_sessions.split(";"):
+            fields = entry.split(",")
+            if len(fields) == 3:
+                sessions.append((fields[0], int(fields[1]), int(fields[2])))
+    return sessions
+
+
+def infer_point(prices: np.ndarray, sample: int = 1000) -> float:
+    """Guess the symbol point from the decimals MT5 printed in the export."""
+    decimals = 0
+    for value in prices[:sample]:
+        text = repr(float(value))
+        if "e" not in text and "." in text:
+            decimals = max(decimals, len(text.split(".")[1].rstrip("0")))
+    return 10.0 ** -min(decimals, 8)
+
+
+def session_candles(
+    minutes: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    sessions: List[Tuple[str, int, int]],
+    candle_minutes: int = 15,
+) -> pd.DataFrame:
+    """High and low of the first candle of every session and day in one grouped pass.
+
+    ``minutes`` are bar open times in minutes since the epoch (M1 or finer
+    bars). Bars of all sessions are gathered into one array keyed by
+    (session, trading day) and reduced together with ``reduceat``.
+    """
+    members, keys = [], []
+    for number, (_, hour, minute) in enumerate(sessions):
+        offset = minutes - (hour * 60 + minute)
+        inside = np.flatnonzero(offset % MINUTES_PER_DAY < candle_minutes)
+        day = offset[inside] // MINUTES_PER_DAY
+        members.append(inside)
+        keys.append(np.stack([np.full(len(inside), number), day], axis=1))
+
+    columns = ["session", "day", "high", "low", "first_bar"]
+    if not members or not sum(len(m) for m in members):
+        return pd.DataFrame(columns=columns)
+    bars = np.concatenate(members)
+    key = np.concatenate(keys)
+    boundaries = np.flatnonzero(np.r_[True, np.any(key[1:] != key[:-1], axis=1)])
+    return pd.DataFrame(
+        {
+            "session": key[boundaries, 0],
+            "day": key[boundaries, 1],
+            "high": np.maximum.reduceat(high[bars], boundaries),
+            "low": np.minimum.reduceat(low[bars], boundaries),
+            "first_bar": bars[boundaries],
+        }
+    )
+
+
+def _stack_symbols(data: Dict[str, pd.DataFrame], points: Dict[str, float]):
+    """Concatenate every symbol into flat arrays with per-symbol bounds."""
+    arrays = {key: [] for key in ("minutes", "open", "high", "low", "close", "spread")}
+    bounds, offset = {}, 0
+    for symbol, frame in data.items():
+        point = points.get(symbol) or infer_point(frame["Close"].to_numpy())
+        spread = (
+            frame["Spread"].to_numpy(dtype=np.float64)
+            if "Spread" in frame
+            else np.zeros(len(frame))
+        )
+        arrays["minutes"].append(
+            frame.index.values.astype("datetime64[m]").astype(np.int64)
+        )
+        for key, col in (
+            ("open", "Open"),
+            ("high", "High"),
+            ("low", "Low"),
+            ("close", "Close"),
+        ):
+            arrays[key].append(frame[col].to_numpy(dtype=np.float64))
+        arrays["spread"].append(np.nan_to_num(spread) * point)
+        bounds[symbol] = (offset, offset + len(frame), point)
+        offset += len(frame)
+    return {key: np.concatenate(value) for key, value in arrays.items()}, bounds
+
+
+def run_backtest(
+    data: Dict[str, pd.DataFrame],
+    sessions: Optional[List[Tuple[str, int, int]]] = None,
+    risk_reward: float = 3.0,
+    lot_size: float = 0.1,
+    offset_points: float = 0.0,
+    expiry_minutes: Optional[int] = 60,
+    candle_minutes: int = 15,
+    points: Optional[Dict[str, float]] = None,
+    contract_sizes: Optional[Dict[str, float]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Backtest the session breakout across every symbol at once.
+
+    ``data`` maps symbols to M1 bars (DatetimeIndex, Open/High/Low/Close and
+    optionally the MT5 ``Spread`` column in points). For each session the
+    first ``candle_minutes`` candle brackets a buy stop above its high and a
+    sell stop below its low, each with its stop at the other extreme and
+    the target ``risk_reward`` times the risk away. The first order to fill
+    cancels the other, and unfilled orders expire after ``expiry_minutes``
+    (``None`` keeps them GTC).
+
+    The defaults follow SessionBreakoutEA. ``offset_points=15,
+    expiry_minutes=None, risk_reward=2`` with
+    ``sessions=parse_sessions()[:4]`` approximates SessionEA.
+
+    Buy orders fill and shorts exit on the ask (bid plus recorded spread).
+    Sessions are treated independently, so their trades may overlap. When a
+    bar reaches both stop and target, the stop is assumed to come first and
+    ``ambiguous`` is set on the trade.
+    """
+    sessions = sessions or list(DEFAULT_SESSIONS)
+    points = points or {}
+    contract_sizes = contract_sizes or {}
+    bars, bounds = _stack_symbols(data, points)
+    ask_high = bars["high"] + bars["spread"]
+    ask_low = bars["low"] + bars["spread"]
+
+    # Session candles per symbol, then one flat order book for all symbols
+    books = []
+    for symbol, (lo, hi, point) in bounds.items():
+        candles = session_candles(
+            bars["minutes"][lo:hi],
+            bars["high"][lo:hi],
+            bars["low"][lo:hi],
+            sessions,
+            candle_minutes,
+        )
+        if candles.empty:
+            continue
+        minutes = bars["minutes"][lo:hi]
+        session_start = candles["day"].to_numpy() * MINUTES_PER_DAY + np.array(
+            [sessions[s][1] * 60 + sessions[s][2] for s in candles["session"]],
+            dtype=np.int64,
+        )
+        placed = np.searchsorted(minutes, session_start + candle_minutes)
+        candles["symbol"] = symbol
+        candles["placed"] = lo + placed
+        candles["symbol_end"] = hi
+        candles["point"] = point
+        if expiry_minutes is None:
+            candles["expires"] = hi
+        else:
+            placed_minute = minutes[np.minimum(placed, len(minutes) - 1)]
+            candles["expires"] = lo + np.searchsorted(
+                minutes, placed_minute + expiry_minutes
+            )
+        books.append(candles[placed < len(minutes)])
+    if not books:
+        return {"trades": pd.DataFrame(), "summary": pd.DataFrame()}
+    book = pd.concat(books, ignore_index=True)
+
+    offset = offset_points * book["point"].to_numpy()
+    buy_entry = book["high"].to_numpy() + offset
+    sell_entry = book["low"].to_numpy() - offset
+    buy_stop, sell_stop = book["low"].to_numpy(), book["high"].to_numpy()
+    buy_target = buy_entry + (buy_entry - buy_stop) * risk_reward
+    sell_target = sell_entry - (sell_stop - sell_entry) * risk_reward
+    placed = book["placed"].to_numpy()
+
+    # Entries: buy stops trigger on the ask high, sell stops on the bid low
+    fill_bar, side, both = first_touch(
+        ask_high,
+        bars["low"],
+        placed,
+        buy_entry,
+        sell_entry,
+        end=book["expires"].to_numpy(),
+    )
+    if both.any():
+        # Both stops inside one bar: take the side nearer the bar open
+        opens = bars["open"][fill_bar[both]]
+        side[both] = np.where(
+            buy_entry[both] - opens <= opens - sell_entry[both], 1, -1
+        )
+    filled = side != 0
+    book, side, fill_bar = (
+        book[filled].reset_index(drop=True),
+        side[filled],
+        fill_bar[filled],
+    )
+    long = side > 0
+    entry = np.where(long, buy_entry[filled], sell_entry[filled])
+    stop = np.where(long, buy_stop[filled], sell_stop[filled])
+    target = np.where(long, buy_target[filled], sell_target[filled])
+    entry_open = bars["open"][fill_bar] + np.where(long, bars["spread"][fill_bar], 0.0)
+    # A bar opening beyond the order level fills at its open
+    entry_price = np.where(
+        long, np.maximum(entry, entry_open), np.minimum(entry, entry_open)
+    )
+
+    # Exits: longs close on the bid, shorts on the ask
+    exit_bar = np.full(len(book), -1, dtype=np.int64)
+    exit_price = np.full(len(book), np.nan)
+    ambiguous = np.zeros(len(book), dtype=bool)
+    symbol_end = book["symbol_end"].to_numpy()
+    for direction, high, low, open_shift in (
+        (1, bars["high"], bars["low"], 0.0),
+        (-1, ask_high, ask_low, 1.0),
+    ):
+        rows = np.flatnonzero(side == direction)
+        upper = target[rows] if direction > 0 else stop[rows]
+        lower = stop[rows] if direction > 0 else target[rows]
+        hit_bar, hit_side, hit_both = first_touch(
+            high, low, fill_bar[rows], upper, lower, end=symbol_end[rows]
+        )
+        if direction < 0:
+            hit_side = np.where(
+                hit_both, 1, hit_side
+            )  # Stop first when both are inside the bar
+        opens = bars["open"] + bars["spread"] * open_shift
+        exit_bar[rows] = hit_bar
+        exit_price[rows] = touch_price(
+            opens, hit_bar, hit_side, upper, lower, fill_bar[rows]
+        )
+        ambiguous[rows] = hit_both
+
+    # Positions still open at the end of a symbol's data close at its last bar
+    open_end = exit_bar < 0
+    exit_bar[open_end] = symbol_end[open_end] - 1
+    last = exit_bar[open_end]
+    exit_price[open_end] = bars["close"][last] + np.where(
+        side[open_end] < 0, bars["spread"][last], 0.0
+    )
+
+    move = (exit_price - entry_price) * side
+    risk = np.abs(entry - stop)
+    sizes = np.array([contract_sizes.get(s, 100000.0) for s in book["symbol"]])
+    trades = pd.DataFrame(
+        {
+            "symbol": book["symbol"],
+            "session": [sessions[s][0] for s in book["session"]],
+            "entry_time": pd.to_datetime(bars["minutes"][fill_bar], unit="m"),
+            "exit_time": pd.to_datetime(bars["minutes"][exit_bar], unit="m"),
+            "direction": side.astype(int),
+            "entry_price": entry_price,
+            "stop_loss": stop,
+            "take_profit": target,
+            "exit_price": exit_price,
+            "profit": move * lot_size * sizes,
+            "r_multiple": np.divide(
+                move, risk, out=np.zeros_like(move), where=risk > 0
+            ),
+            "ambiguous": ambiguous,
+            "open_at_end": open_end,
+        }
+    )
+    return {"trades": trades, "summary": summarize(trades)}
+
+
+def summarize(trades: pd.DataFrame) -> pd.DataFrame:
+    """Per symbol and session statistics of a trade list."""
+    rows = []
+    for (symbol, session), group in trades.groupby(["symbol", "session"], sort=True):
+        r = group["r_multiple"].to_numpy()
+        rows.append(
+            {
+                "symbol": symbol,
+                "session": session,
+                "trades": len(group),
+                "win_rate": win_rate(r),
+                "profit_factor": profit_factor(r),
+                "avg_r": r.mean(),
+                "total_r": r.sum(),
+                "profit": group["profit"].sum(),
+                "ambiguous": int(group["ambiguous"].sum()),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest SessionBreakoutEA on M1 exports"
+    )
+    parser.add_argument("--data", nargs="+", required=True, help="SYMBOL=path pairs")
+    parser.add_argument("--rr", type=float, default=3.0, help="RiskRewardRatio")
+    parser.add_argument("--lot", type=float, default=0.1, help="LotSize")
+    parser.add_argument(
+        "--custom-sessions", default="", help='"Name,StartHour,StartMinute;..."'
+    )
+    parser.add_argument("--no-default-sessions", action="store_true")
+    parser.add_argument("--offset-points", type=float, default=0.0)
+    parser.add_argument(
+        "--expiry-minutes", type=int, default=60, help="0 keeps orders GTC"
+    )
+    parser.add_argument(
+        "--trades-out", default=None, help="CSV path for the trade list"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    data = {}
+    for spec in args.data:
+        symbol, path = spec.split("=", 1)
+        data[symbol] = load_bars(path)
+        logging.info(f"Loaded {len(data[symbol])} bars for {symbol}")
+    sessions = parse_sessions(
+        args.custom_sessions,
+        use_default=not args.no_default_sessions,
+        use_custom=bool(args.custom_sessions),
+    )
+    result = run_backtest(
+        data,
+        sessions,
+        risk_reward=args.rr,
+        lot_size=args.lot,
+        offset_points=args.offset_points,
+        expiry_minutes=args.expiry_minutes or None,
+    )
+    print(result["summary"].to_string(index=False))
+    if args.trades_out:
+        result["trades"].to_csv(args.trades_out, index=False)
+
+
+if __name__ == "__main__":
+    main()
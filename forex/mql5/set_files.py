@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+SetValue = Union[bool, int, float, str]
+
+# MT5 writes presets as UTF-16 little-endian with a BOM and CRLF line endings
+SET_ENCODING = "utf-16-le"
+SET_BOM = "\ufeff"
+
+
+def parse_value(raw: str) -> SetValue:
+    """Convert a preset value to bool, int, float or leave it as a string."""
+    # Optimisation presets store ranges as value||start||step||stop||Y
+    value = raw.split("||")[0].strip()
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def format_value(value: SetValue) -> str:
+    """Format a value the way the MT5 terminal writes it."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return repr(float(value))
+    return str(value)
+
+
+def _read_lines(path: Union[str, Path]) -> list:
+    raw = Path(path).read_bytes()
+    if raw.startswith(b"\xff\xfe") or raw.startswith(b"\xfe\xff"):
+        text = raw.decode("utf-16")
+    else:
+        text = raw.decode("utf-8-sig")
+    return text.splitlines()
+
+
+def read_set_file(path: Union[str, Path]) -> Dict[str, SetValue]:
+    """Read an MT5 .set preset into an ordered dict of input name to value."""
+    params = {}
+    for line in _read_lines(path):
+        line = line.strip()
+        if not line or line.startswith(";") or "=" not in line:
+            continue
+        name, raw = line.split("=", 1)
+        params[name.strip()] = parse_value(raw)
+    return params
+
+
+def write_set_file(
+    path: Union[str, Path],
+    params: Dict[str, SetValue],
+    template: Optional[Union[str, Path]] = None,
+) -> str:
+    """Write a .set preset that the MT5 terminal can load.
+
+    With a template, its comments and input order are kept and only the
+    values of ``params`` are replaced; inputs missing from the template are
+    appended at the end.
+    """
+    lines = []
+    remaining = dict(params)
+    if template is not None:
+        for line in _read_lines(template):
+            stripped = line.strip()
+            if stripped and not stripped.startswith(";") and "=" in stripped:
+                name = stripped.split("=", 1)[0].strip()
+                if name in remaining:
+                    line = f"{name}={format_value(remaining.pop(name))}"
+            lines.append(line)
+    lines.extend(f"{name}={format_value(value)}" for name, value in remaining.items())
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes((SET_BOM + "\r\n".join(lines) + "\r\n").encode(SET_ENCODING))
+    return str(path)
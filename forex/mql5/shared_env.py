@@ -0,0 +1,184 @@
+import argparse
+import functools
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from multiprocessing.shared_memory import SharedMemory
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
+from typing import Callable, Dict, List, Optional, Tuple
+
+from forex.mql5.trading_env import TradingEnv, synthetic_features
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]  # Block name, shape, dtype
+
+
+class SharedArrays:
+    """Arrays copied once into named shared-memory blocks.
+
+    ``specs`` is small and picklable, so subprocesses receive it instead of
+    the data and map the same pages with :func:`attach_arrays`. The creating
+    process owns the blocks and must :meth:`close` them (or use ``with``)
+    after every worker has exited.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks: List[SharedMemory] = []
+        self.specs: Dict[str, ArraySpec] = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            view[...] = array
+            self._blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+            self.arrays[key] = view
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def close(self) -> None:
+        self.arrays.clear()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach_arrays(
+    specs: Dict[str, ArraySpec],
+) -> Tuple[Dict[str, np.ndarray], List[SharedMemory]]:
+    """Read-only views of blocks created elsewhere, plus the handles keeping them mapped."""
+    arrays, handles = {}, []
+    for key, (name, shape, dtype) in specs.items():
+        block = SharedMemory(name=name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[key] = array
+        handles.append(block)
+    return arrays, handles
+
+
+def share_features(data: pd.DataFrame) -> SharedArrays:
+    """Put the TradingEnv feature matrix and close prices into shared memory."""
+    return SharedArrays(
+        {
+            "features": data.to_numpy(dtype=np.float32),
+            "close": data["Close"].to_numpy(dtype=np.float64),
+        }
+    )
+
+
+def _build_env(specs: Dict[str, ArraySpec], env_kwargs: dict) -> TradingEnv:
+    arrays, handles = attach_arrays(specs)
+    env = TradingEnv((arrays["features"], arrays["close"]), **env_kwargs)
+    env.shared_handles = handles  # Keep the mapping alive as long as the env
+    return env
+
+
+def make_env(specs: Dict[str, ArraySpec], **env_kwargs) -> Callable[[], TradingEnv]:
+    """Env factory for a worker process; only the block names are pickled."""
+    return functools.partial(_build_env, specs, env_kwargs)
+
+
+def make_shared_vec_env(
+    data: pd.DataFrame,
+    n_envs: Optional[int] = None,
+    seed: int = 0,
+    start_method: Optional[str] = None,
+    normalize: bool = True,
+    subprocess: bool = True,
+    random_start: bool = True,
+    episode_length: Optional[int] = None,
+    **env_kwargs,
+):
+    """TradingEnvs in ``n_envs`` subprocesses over one shared copy of ``data``.
+
+    Workers are seeded ``seed + rank`` and with ``random_start`` begin their
+    episodes at different bars, so their rollouts are not copies of each
+    other. ``VecNormalize`` wraps the whole vector env in this process, so a
+    single running mean/variance is updated from every worker's
+    observations and rewards and is the one saved with the model.
+
+    Every step costs each worker a pipe round trip, so subprocesses pay off
+    once an env step costs more than that (heavier features, slower
+    rewards); for the bare array env ``subprocess=False`` steps all envs in
+    this process over the same arrays. The training script must guard its
+    entry point with ``if __name__ == "__main__"``.
+
+    Returns ``(vec_env, shared)``; close the env before ``shared``.
+    """
+    n_envs = n_envs or os.cpu_count() or 1
+    shared = share_features(data)
+    env_fns = [
+        make_env(
+            shared.specs,
+            random_start=random_start,
+            episode_length=episode_length,
+            **env_kwargs,
+        )
+        for _ in range(n_envs)
+    ]
+    try:
+        if n_envs == 1 or not subprocess:
+            vec_env = DummyVecEnv(env_fns)
+        else:
+            vec_env = SubprocVecEnv(env_fns, start_method=start_method)
+        vec_env.seed(seed)
+    except Exception:
+        shared.close()
+        raise
+    if normalize:
+        vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=True)
+    return vec_env, shared
+
+
+def rollout_rate(vec_env, steps: int = 20000, seed: int = 0) -> float:
+    """Env steps per second over the vector env with random actions."""
+    rng = np.random.default_rng(seed)
+    vec_env.reset()
+    batches = max(1, steps // vec_env.num_envs)
+    actions = rng.integers(0, 3, size=(batches, vec_env.num_envs))
+    started = time.perf_counter()
+    for batch in actions:
+        vec_env.step(batch)
+    return batches * vec_env.num_envs / (time.perf_counter() - started)
+
+
+def benchmark(
+    data: pd.DataFrame, env_counts: List[int], steps: int = 20000, seed: int = 0
+) -> List[Dict[str, float]]:
+    """Rollout rate for each number of worker processes."""
+    results = []
+    for n_envs in env_counts:
+        vec_env, shared = make_shared_vec_env(data, n_envs=n_envs, seed=seed)
+        try:
+            rate = rollout_rate(vec_env, steps, seed)
+        finally:
+            vec_env.close()
+            shared.close()
+        results.append({"n_envs": n_envs, "steps_per_sec": rate})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rollout throughput of shared-memory TradingEnv workers"
+    )
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--bars", type=int, default=200000)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = synthetic_features(args.bars, seed=args.seed)
+    print(json.dumps(benchmark(frame, args.envs, args.steps, args.seed), indent=2))
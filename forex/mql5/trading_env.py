@@ -0,0 +1,232 @@
+import argparse
+import json
+import time
+import gymnasium as gym
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple, Union
+
+
+class TradingEnv(gym.Env):
+    """Long-only trading env of v76.py on arrays prepared once at construction.
+
+    ``data`` is the feature frame (with a Close column) or a ``(features,
+    close)`` pair of arrays, e.g. attached from shared memory. Features
+    become one contiguous, read-only float32 matrix, so observations are row
+    views with nothing copied or allocated per step. Close prices stay
+    float64 for the PnL, as in the pandas version, whose rewards this
+    reproduces exactly. Follows the gymnasium API: ``reset`` returns
+    ``(obs, info)`` and ``step`` the 5-tuple.
+
+    With ``random_start`` each episode begins at a random bar drawn from the
+    env's seeded generator, and ``episode_length`` truncates episodes after
+    that many steps; by default episodes run over the whole data.
+    """
+
+    metadata = {"render_modes": ["human"]}
+
+    def __init__(
+        self,
+        data: Union[pd.DataFrame, Tuple[np.ndarray, np.ndarray]],
+        initial_balance: float = 10000,
+        random_start: bool = False,
+        episode_length: Optional[int] = None,
+    ):
+        super().__init__()
+        if isinstance(data, pd.DataFrame):
+            features = data.to_numpy(dtype=np.float32)
+            close = data["Close"].to_numpy(dtype=np.float64)
+        else:
+            features, close = data
+        if len(features) == 0:
+            raise ValueError("The data is empty. Unable to create the environment.")
+        # A read-only view, so shared or caller-owned arrays stay writeable for them
+        self.features = np.ascontiguousarray(features, dtype=np.float32).view()
+        self.features.flags.writeable = False
+        # Indexed in place: a float list would make each step's scalar math a
+        # little faster, but every subprocess worker would hold its own copy of
+        # the whole price column instead of the one shared array
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.n_steps = len(self.features)
+
+        self.action_space = gym.spaces.Discrete(3)  # Buy, Hold, Sell
+        self.observation_space = gym.spaces.Box(
+            low=-np.inf, high=np.inf, shape=self.features.shape[1:], dtype=np.float32
+        )
+
+        self.initial_balance = initial_balance
+        self.random_start = random_start
+        self.episode_length = episode_length
+        self.penalty = -0.002  # Penalty for losing trades
+        self.reward_multiplier = 0.01  # Reward multiplier for profits
+        self.current_step = 0
+        self.episode_end = self.n_steps
+        self.balance = initial_balance
+        self.position = 0  # No position (1 = Long)
+        self.entry_price = 0.0
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        super().reset(seed=seed)
+        start = 0
+        if self.random_start:
+            last_start = self.n_steps - 1 - (self.episode_length or 1)
+            start = int(self.np_random.integers(0, max(last_start, 0) + 1))
+        self.current_step = start
+        self.episode_end = (
+            self.n_steps
+            if self.episode_length is None
+            else min(self.n_steps, start + self.episode_length)
+        )
+        self.balance = self.initial_balance
+        self.position = 0
+        self.entry_price = 0.0
+        return self.features[start], {}
+
+    def step(self, action):
+        step = self.current_step
+        if step >= self.n_steps:
+            raise IndexError("Step is out of bounds, check the size of your data.")
+
+        current_price = float(self.close[step])
+        reward = 0.0
+        if action == 0:  # Buy
+            if self.position == 0:
+                self.position = 1
+                self.entry_price = current_price
+        elif action == 2:  # Sell
+            if self.position == 1:
+                profit = current_price - self.entry_price
+                reward = (
+                    self.reward_multiplier * profit
+                    if profit > 0
+                    else self.penalty * abs(profit)
+                )
+                self.balance += self.reward_multiplier * profit
+                self.position = 0
+
+        # Penalty for holding too long or having no position
+        reward -= 0.001 * abs(self.position)
+
+        step += 1
+        self.current_step = step
+        terminated = step >= self.n_steps - 1
+        truncated = not terminated and step >= self.episode_end
+        obs = self.features[min(step, self.n_steps - 1)]
+        return obs, reward, terminated, truncated, {}
+
+    def render(self):
+        print(
+            f"Step: {self.current_step}, Balance: {self.balance}, Position: {self.position}"
+        )
+
+
+class PandasTradingEnv(gym.Env):
+    """The original DataFrame-backed env, kept as the benchmark baseline."""
+
+    def __init__(self, data: pd.DataFrame):
+        super().__init__()
+        self.data = data
+        self.current_step = 0
+        self.action_space = gym.spaces.Discrete(3)  # Buy, Hold, Sell
+        self.observation_space = gym.spaces.Box(
+            low=-np.inf, high=np.inf, shape=(data.shape[1],), dtype=np.float32
+        )
+        self.balance = 10000
+        self.position = 0
+        self.entry_price = 0
+        self.penalty = -0.002
+        self.reward_multiplier = 0.01
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        super().reset(seed=seed)
+        self.current_step = 0
+        self.balance = 10000
+        self.position = 0
+        self.entry_price = 0
+        return self.data.iloc[self.current_step].values, {}
+
+    def step(self, action):
+        if self.current_step >= len(self.data):
+            raise IndexError("Step is out of bounds, check the size of your data.")
+
+        current_price = self.data.iloc[self.current_step]["Close"]
+        reward = 0
+        if action == 0:
+            if self.position == 0:
+                self.position = 1
+                self.entry_price = current_price
+        elif action == 2:
+            if self.position == 1:
+                profit = current_price - self.entry_price
+                reward = (
+                    self.reward_multiplier * profit
+                    if profit > 0
+                    else self.penalty * abs(profit)
+                )
+                self.balance += self.reward_multiplier * profit
+                self.position = 0
+        reward -= 0.001 * abs(self.position)
+        self.current_step += 1
+        done = self.current_step >= len(self.data) - 1
+        if done:
+            obs = self.data.iloc[-1].values
+        else:
+            obs = self.data.iloc[self.current_step].values
+        return obs, reward, done, False, {}
+
+
+def synthetic_features(bars: int = 50000, columns: int = 16, seed: int = 0):
+    """Random bars shaped like v76's feature frame (OHLC, volumes, indicators)."""
+    rng = np.random.default_rng(seed)
+    close = 500000 + np.cumsum(rng.normal(0, 300, bars))
+    data = pd.DataFrame(
+        rng.normal(size=(bars, columns - 1)),
+        columns=[f"feature_{i}" for i in range(columns - 1)],
+        index=pd.date_range("2024-01-01", periods=bars, freq="15min"),
+    )
+    data.insert(3, "Close", close)
+    return data
+
+
+def _run(env: gym.Env, actions: np.ndarray):
+    rewards = np.empty(len(actions))
+    obs, _ = env.reset(seed=0)
+    started = time.perf_counter()
+    for i, action in enumerate(actions):
+        obs, rewards[i], terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            obs, _ = env.reset()
+    return time.perf_counter() - started, rewards
+
+
+def benchmark(
+    data: pd.DataFrame, steps: int = 20000, seed: int = 0
+) -> Dict[str, float]:
+    """Step both envs with the same random actions and compare speed and rewards."""
+    actions = np.random.default_rng(seed).integers(0, 3, steps)
+    pandas_seconds, pandas_rewards = _run(PandasTradingEnv(data), actions)
+    array_seconds, array_rewards = _run(TradingEnv(data), actions)
+    return {
+        "steps": steps,
+        "pandas_steps_per_sec": steps / pandas_seconds,
+        "array_steps_per_sec": steps / array_seconds,
+        "speedup": pandas_seconds / array_seconds,
+        "max_reward_diff": float(np.abs(pandas_rewards - array_rewards).max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark TradingEnv step throughput against the pandas env"
+    )
+    parser.add_argument("--data", default=None, help="Feature CSV; synthetic if unset")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = (
+        pd.read_csv(args.data, index_col=0, parse_dates=True)
+        if args.data
+        else synthetic_features(seed=args.seed)
+    )
+    print(json.dumps(benchmark(frame, args.steps, args.seed), indent=2))
@@ -1,12 +1,17 @@
+import os
 import pandas as pd
-import numpy as np
-import gym
 import pandas_ta as ta
 from stable_baselines3 import PPO
 from stable_baselines3.common.vec_env import DummyVecEnv
 from stable_baselines3.common.vec_env import VecNormalize
 from sklearn.model_selection import train_test_split
-import quantstats as qs
+from model_registry import ModelRegistry
+from tearsheet import render_tearsheets
+from forex.mql5.shared_env import make_shared_vec_env
+from forex.mql5.trading_env import TradingEnv
+
+N_ENVS = max(1, (os.cpu_count() or 1) - 1)  # Rollout worker processes
+NORMALIZE_PATH = "ppo_15m_VIX75_vecnormalize.pkl"
 
 
 # Step 1: Load and clean the data
@@ -105,128 +110,14 @@ def RSI(series, period=14):
     return 100 - (100 / (1 + RS))
 
 
-# Load and preprocess the data
-data = load_and_clean_data("Vix75.csv")
-print(data.info())
-test_data = load_and_clean_data("vixy.csv")
-
-# Add technical indicators
-data = add_technical_indicators(data)
-print(data.head())
-
-
-# Step 3: Create custom trading environment
-class TradingEnv(gym.Env):
-    def __init__(self, data):
-        super(TradingEnv, self).__init__()
-        self.data = data
-        self.current_step = 0
-        self.action_space = gym.spaces.Discrete(3)  # Buy, Hold, Sell
-
-        # Define observation space explicitly
-        self.observation_space = gym.spaces.Box(
-            low=-np.inf, high=np.inf, shape=(data.shape[1],), dtype=np.float32
-        )
-
-        self.balance = 10000  # Initial balance
-        self.position = 0  # No position (1 = Long, -1 = Short)
-        self.entry_price = 0
-        self.penalty = -0.002  # Penalty for losing trades
-        self.reward_multiplier = 0.01  # Reward multiplier for profits
-
-    def reset(self):
-        self.current_step = 0
-        self.balance = 10000
-        self.position = 0
-        self.entry_price = 0
-
-        # Check if the dataset has enough rows
-        if len(self.data) == 0:
-            raise ValueError("The data is empty. Unable to reset the environment.")
-
-        # Ensure current_step is within valid range
-        if self.current_step >= len(self.data):
-            raise IndexError(
-                "Initial step is out of bounds, check the size of your data."
-            )
-
-        return self.data.iloc[self.current_step].values
-
-    def step(self, action):
-        # Ensure current_step is within valid range
-        if self.current_step >= len(self.data):
-            raise IndexError("Step is out of bounds, check the size of your data.")
-
-        current_price = self.data.iloc[self.current_step]["Close"]
-        reward = 0
-
-        if action == 0:  # Buy
-            if self.position == 0:
-                self.position = 1
-                self.entry_price = current_price
-        elif action == 2:  # Sell
-            if self.position == 1:
-                profit = current_price - self.entry_price
-                reward = (
-                    self.reward_multiplier * profit
-                    if profit > 0
-                    else self.penalty * abs(profit)
-                )
-                self.balance += self.reward_multiplier * profit
-                self.position = 0
-
-        # Penalty for holding too long or having no position
-        reward -= 0.001 * abs(self.position)
-
-        # Move to the next step
-        self.current_step += 1
-
-        # Check if we're at the end of the data
-        done = self.current_step >= len(self.data) - 1
-
-        # Ensure valid observation
-        if done:
-            obs = self.data.iloc[
-                -1
-            ].values  # Return the last valid observation when done
-        else:
-            obs = self.data.iloc[self.current_step].values
-
-        return obs, reward, done, {}
-
-    def render(self, mode="human"):
-        print(
-            f"Step: {self.current_step}, Balance: {self.balance}, Position: {self.position}"
-        )
-
-
-# Step 4: Wrap the environment with DummyVecEnv and VecNormalize
-env = DummyVecEnv([lambda: TradingEnv(data)])  # Dummy vectorized environment
-env = VecNormalize(env, norm_obs=True, norm_reward=True)
-
-
-# Step 5: Train the PPO model with default hyperparameters
-model = PPO(
-    "MlpPolicy",
-    env,
-    verbose=1,
-    policy_kwargs=dict(net_arch=[dict(pi=[64, 64], vf=[64, 64])]),
-    learning_rate=3e-4,  # Default value
-    n_steps=2048,  # Default value
-    batch_size=64,  # Default value
-    gamma=0.99,  # Default value
-    gae_lambda=0.95,  # Default value
-    clip_range=0.2,  # Default value
-)
-
-# Train the model
-model.learn(total_timesteps=100000)
-model.save("ppo_15m_VIX75_model")
-
-
-# Step 6: Model evaluation using Quantstats
-def evaluate_rl_model(model, test_data):
+# Model evaluation with the lightweight tear sheet
+def evaluate_rl_model(model, test_data, normalize_path=None, full_report=False):
     env = DummyVecEnv([lambda: TradingEnv(test_data)])  # Wrap test env
+    if normalize_path is not None:
+        # Reuse the training statistics, frozen, and report raw rewards
+        env = VecNormalize.load(normalize_path, env)
+        env.training = False
+        env.norm_reward = False
     obs = env.reset()
     total_reward = 0
     rewards = []
@@ -248,23 +139,72 @@ def evaluate_rl_model(model, test_data):
         rewards, index=dates[: len(rewards)]
     )  # Align rewards with dates
 
-    # Calculate cumulative returns from rewards
-    returns = (
-        rewards_series.cumsum() / 10000
-    )  # Assuming initial balance is 10000 for normalization
-
-    # Ensure that the returns are correctly formatted and have the same length
-    returns = returns[
-        : len(test_data)
-    ]  # Ensure the length matches the test data length
+    # Per-step returns, assuming an initial balance of 10000 for normalization
+    returns = rewards_series / 10000
 
-    # Use quantstats to generate report
-    qs.reports.html(returns, output="report_VIX75.html", title="RL Trading Strategy")
+    # JSON + small HTML summary; the QuantStats report only when asked for
+    render_tearsheets(
+        {"RL_VIX75": returns},
+        output_dir="reports",
+        finalists=1 if full_report else 0,
+    )
 
     return total_reward
 
 
-# Step 7: Load test data and evaluate the model
-# train_data, test_data = train_test_split(data, test_size=0.2, shuffle=False)
-total_reward = evaluate_rl_model(model, test_data)
-print(f"Total reward: {total_reward}")
+def main():
+    # Load and preprocess the data
+    data = load_and_clean_data("Vix75.csv")
+    print(data.info())
+    test_data = load_and_clean_data("vixy.csv")
+
+    # Add technical indicators (the test set needs the same observation columns)
+    data = add_technical_indicators(data)
+    test_data = add_technical_indicators(test_data)
+    print(data.head())
+
+    # Step 3: Rollout workers attached to one shared-memory copy of the features,
+    # starting at random offsets; VecNormalize sees all of them in this process
+    env, shared_data = make_shared_vec_env(data, n_envs=N_ENVS, seed=0)
+
+    # Step 4: Train the PPO model with default hyperparameters
+    model = PPO(
+        "MlpPolicy",
+        env,
+        verbose=1,
+        policy_kwargs=dict(net_arch=[dict(pi=[64, 64], vf=[64, 64])]),
+        learning_rate=3e-4,  # Default value
+        n_steps=2048,  # Default value
+        batch_size=64,  # Default value
+        gamma=0.99,  # Default value
+        gae_lambda=0.95,  # Default value
+        clip_range=0.2,  # Default value
+    )
+
+    # Train the model
+    model.learn(total_timesteps=100000)
+    model.save("ppo_15m_VIX75_model")
+    env.save(NORMALIZE_PATH)  # Observation/reward statistics for evaluation
+    env.close()
+    shared_data.close()
+
+    # Step 5: Evaluate the model on the test data
+    # train_data, test_data = train_test_split(data, test_size=0.2, shuffle=False)
+    total_reward = evaluate_rl_model(model, test_data, NORMALIZE_PATH)
+    print(f"Total reward: {total_reward}")
+
+    # Version the policy with its normalization statistics and promote it; the
+    # registry serves the .pkl as a path for VecNormalize.load(path, venv)
+    ModelRegistry().register(
+        "ppo_15m_VIX75",
+        "ppo_15m_VIX75_model.zip",
+        kind="sb3-ppo",
+        artifacts={"normalize": NORMALIZE_PATH},
+        data=data,
+        metrics={"test_total_reward": total_reward},
+        promote=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+import ta
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from episode_recorder import EpisodeRecorder
+from window_obs import StridedWindows
+
+# Action and position codes of the notebook's Actions/Positions enums
+SELL, BUY, HOLD = 0, 1, 2
+SHORT, LONG = 0, 1
+PIP_FACTOR = 10000
+
+
+def forex_features(
+    df: pd.DataFrame, window_size: int, frame_bound: Tuple[int, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Prices and signal features exactly as ``ForexEnv._process_data`` builds them."""
+    if not (0 <= frame_bound[0] - window_size < len(df)):
+        raise ValueError("frame_bound and window_size combination is out of range.")
+    if not (frame_bound[1] <= len(df)):
+        raise ValueError("frame_bound end is out of range.")
+    frame = slice(frame_bound[0] - window_size, frame_bound[1])
+
+    prices = df["Close"].to_numpy()[frame]
+    normalized_prices = (prices - np.mean(prices)) / np.std(prices)
+
+    close = df["Close"]
+    bollinger = ta.volatility.BollingerBands(close=close, window=20)
+    indicators = [
+        ta.trend.SMAIndicator(close=close, window=50).sma_indicator(),
+        ta.trend.SMAIndicator(close=close, window=200).sma_indicator(),
+        ta.momentum.RSIIndicator(close=close, window=14).rsi(),
+        bollinger.bollinger_hband(),
+        bollinger.bollinger_lband(),
+        ta.trend.MACD(
+            close=close, window_fast=12, window_slow=26, window_sign=9
+        ).macd(),
+    ]
+    signal_features = np.column_stack(
+        [normalized_prices] + [series.to_numpy()[frame] for series in indicators]
+    )
+    signal_features = (
+        signal_features - np.nanmean(signal_features, axis=0)
+    ) / np.nanstd(signal_features, axis=0)
+    signal_features = np.nan_to_num(signal_features)
+    return normalized_prices.astype(np.float32), signal_features.astype(np.float32)
+
+
+class VecForexEnv(VecEnv):
+    """``num_envs`` notebook ForexEnvs advanced together with array operations.
+
+    Each env keeps its tick, position, entry price (the price at its last
+    trade tick), total reward and total profit in a slot of a per-env array,
+    so one :meth:`step` is a handful of numpy operations whatever
+    ``num_envs`` is. Rewards and profit follow ``ForexEnv``: closing a
+    position pays the pip move scaled by lot size and leverage, minus spread
+    and fee, and ``total_profit`` compounds on the side given by
+    ``unit_side``. As in the notebook, ``stop_loss`` and ``take_profit`` are
+    kept as attributes but not applied.
+
+    ``data`` is the bar frame (with the ``frame_bound`` slice used for the
+    features) or a ``(prices, signal_features)`` pair of arrays.
+    Observations are the last ``window_size`` feature rows, gathered from a
+    strided view of one feature matrix. Episodes end, truncated, at the last
+    bar; finished envs reset on the spot with ``terminal_observation`` and
+    their episode totals in ``infos``. With ``random_start`` they begin at
+    random bars, and ``episode_length`` caps their length.
+
+    Pass an :class:`EpisodeRecorder` as ``recorder`` to keep every step of
+    every env (numbered by ``episode_count``) in its columnar arrays.
+    """
+
+    metadata = {"render_modes": []}
+    render_mode = None
+
+    def __init__(
+        self,
+        data: Union[pd.DataFrame, Tuple[np.ndarray, np.ndarray]],
+        window_size: int,
+        frame_bound: Optional[Tuple[int, int]] = None,
+        num_envs: int = 64,
+        unit_side: str = "left",
+        trade_fee: float = 0.0003,
+        spread: float = 0.0001,
+        lot_size: float = 0.01,
+        leverage: float = 50,
+        stop_loss: float = 0.001,
+        take_profit: float = 0.002,
+        random_start: bool = False,
+        episode_length: Optional[int] = None,
+        seed: Optional[int] = None,
+        recorder: Optional[EpisodeRecorder] = None,
+    ):
+        assert unit_side.lower() in ["left", "right"]
+        if isinstance(data, pd.DataFrame):
+            if frame_bound is None:
+                frame_bound = (window_size, len(data))
+            prices, signal_features = forex_features(data, window_size, frame_bound)
+        else:
+            prices, signal_features = data
+        if len(prices) <= window_size + 1:
+            raise ValueError("Not enough bars for one step after the first window.")
+
+        self.window_size = window_size
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self._windows = StridedWindows(signal_features, window_size)
+        self.signal_features = self._windows.features
+
+        self.unit_side = unit_side.lower()
+        self.trade_fee = trade_fee
+        self.spread = spread
+        self.lot_size = lot_size
+        self.leverage = leverage
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.random_start = random_start
+        self.episode_length = episode_length
+        self._start_tick = window_size
+        self._end_tick = len(self.prices) - 1
+
+        self.current_tick = np.full(num_envs, self._start_tick, dtype=np.int64)
+        self.end_tick = np.full(num_envs, self._end_tick, dtype=np.int64)
+        self.position = np.full(num_envs, SHORT, dtype=np.int8)
+        self.entry_price = np.zeros(num_envs)
+        self.total_reward = np.zeros(num_envs)
+        self.total_profit = np.ones(num_envs)
+        self._actions = np.full(num_envs, HOLD, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+        self.recorder = recorder
+        self.episode_count = np.zeros(num_envs, dtype=np.int32)
+        self._stepped = False
+
+        observation_space = spaces.Box(
+            low=-np.inf,
+            high=np.inf,
+            shape=(window_size, self.signal_features.shape[1]),
+            dtype=np.float32,
+        )
+        super().__init__(num_envs, observation_space, spaces.Discrete(3))
+
+    def _observations(self) -> np.ndarray:
+        return self._windows.batch(self.current_tick)
+
+    def _reset_envs(self, envs: np.ndarray) -> None:
+        count = len(envs)
+        start = np.full(count, self._start_tick, dtype=np.int64)
+        if self.random_start:
+            last_start = max(
+                self._end_tick - (self.episode_length or 1), self._start_tick
+            )
+            start = self._rng.integers(self._start_tick, last_start + 1, size=count)
+        end = np.full(count, self._end_tick, dtype=np.int64)
+        if self.episode_length is not None:
+            end = np.minimum(end, start + self.episode_length)
+        self.current_tick[envs] = start
+        self.end_tick[envs] = end
+        self.position[envs] = SHORT
+        self.entry_price[envs] = self.prices[start - 1]  # Last trade tick is start - 1
+        self.total_reward[envs] = 0.0
+        self.total_profit[envs] = 1.0
+
+    def reset(self) -> np.ndarray:
+        if self._stepped:
+            self.episode_count += 1
+            self._stepped = False
+        self._reset_envs(np.arange(self.num_envs))
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self._observations()
+
+    def seed(self, seed: Optional[int] = None) -> Sequence[Optional[int]]:
+        self._rng = np.random.default_rng(seed)
+        return [None if seed is None else seed + i for i in range(self.num_envs)]
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        actions = self._actions
+        position = self.position
+        self._stepped = True
+        self.current_tick += 1
+        truncated = self.current_tick >= self.end_tick
+        current_price = self.prices[self.current_tick]
+        entry_price = self.entry_price
+        long = position == LONG
+        trade = np.where(long, actions == SELL, actions == BUY)
+
+        # _calculate_reward: signed pip move less spread and fee, on closing trades
+        factor = self.lot_size * self.leverage * PIP_FACTOR
+        move = np.where(long, 1.0, -1.0) * (current_price - entry_price)
+        rewards = np.where(trade, (move - self.spread - self.trade_fee) * factor, 0.0)
+        self.total_reward += rewards
+
+        # _update_profit: compound on trades and at the end of the episode
+        settle = trade | truncated
+        if self.unit_side == "left":
+            settle &= ~long
+            profit = self.total_profit * (entry_price - self.trade_fee) / current_price
+        else:
+            settle &= long
+            profit = self.total_profit / entry_price * (current_price - self.trade_fee)
+        self.total_profit = np.where(settle, profit, self.total_profit)
+
+        self.position = np.where(trade, 1 - position, position).astype(np.int8)
+        self.entry_price = np.where(trade, current_price, entry_price)
+        if self.recorder is not None:
+            self.recorder.record_batch(
+                episode=self.episode_count,
+                tick=self.current_tick,
+                action=actions,
+                position=self.position,
+                reward=rewards,
+                price=current_price,
+                total_reward=self.total_reward,
+                total_profit=self.total_profit,
+            )
+
+        infos: List[Dict] = [{} for _ in range(self.num_envs)]
+        done = np.flatnonzero(truncated)
+        if len(done):
+            terminal_obs = self._windows.batch(self.current_tick[done])
+            for i, env in enumerate(done):
+                infos[env] = {
+                    "terminal_observation": terminal_obs[i],
+                    "TimeLimit.truncated": True,
+                    "total_reward": float(self.total_reward[env]),
+                    "total_profit": float(self.total_profit[env]),
+                }
+            self.episode_count[done] += 1
+            self._reset_envs(done)
+        return self._observations(), rewards.astype(np.float32), truncated, infos
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> List:
+        return [getattr(self, attr_name)] * len(self._indices(indices))
+
+    def set_attr(self, attr_name: str, value, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False] * len(self._indices(indices))
+
+    def _indices(self, indices) -> Sequence[int]:
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+
+class LoopForexEnv:
+    """One notebook ForexEnv stepped in Python, kept as the benchmark baseline."""
+
+    def __init__(
+        self,
+        prices: np.ndarray,
+        signal_features: np.ndarray,
+        window_size: int,
+        unit_side: str = "left",
+        trade_fee: float = 0.0003,
+        spread: float = 0.0001,
+        lot_size: float = 0.01,
+        leverage: float = 50,
+    ):
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.signal_features = signal_features
+        self.window_size = window_size
+        self.unit_side = unit_side
+        self.trade_fee = trade_fee
+        self.spread = spread
+        self.lot_size = lot_size
+        self.leverage = leverage
+        self._start_tick = window_size
+        self._end_tick = len(self.prices) - 1
+
+    def reset(self):
+        self._truncated = False
+        self._current_tick = self._start_tick
+        self._last_trade_tick = self._current_tick - 1
+        self._position = SHORT
+        self._total_reward = 0.0
+        self._total_profit = 1.0
+        return self._get_observation(), {}
+
+    def step(self, action):
+        self._truncated = False
+        self._current_tick += 1
+        if self._current_tick == self._end_tick:
+            self._truncated = True
+
+        trade = (action == BUY and self._position == SHORT) or (
+            action == SELL and self._position == LONG
+        )
+        step_reward = 0.0
+        current_price = self.prices[self._current_tick]
+        last_trade_price = self.prices[self._last_trade_tick]
+        if trade:
+            factor = self.lot_size * self.leverage * PIP_FACTOR
+            price_diff = current_price - last_trade_price
+            if self._position == SHORT:
+                step_reward += -price_diff * factor
+            else:
+                step_reward += price_diff * factor
+            step_reward -= self.spread * factor
+            step_reward -= self.trade_fee * factor
+        self._total_reward += step_reward
+
+        if trade or self._truncated:
+            if self.unit_side == "left" and self._position == SHORT:
+                quantity = self._total_profit * (last_trade_price - self.trade_fee)
+                self._total_profit = quantity / current_price
+            elif self.unit_side == "right" and self._position == LONG:
+                quantity = self._total_profit / last_trade_price
+                self._total_profit = quantity * (current_price - self.trade_fee)
+
+        if trade:
+            self._position = 1 - self._position
+            self._last_trade_tick = self._current_tick
+
+        info = {"total_reward": self._total_reward, "total_profit": self._total_profit}
+        return self._get_observation(), step_reward, False, self._truncated, info
+
+    def _get_observation(self):
+        return self.signal_features[
+            (self._current_tick - self.window_size + 1) : self._current_tick + 1
+        ]
+
+
+def synthetic_prices(
+    bars: int = 5000, columns: int = 7, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalized random-walk prices and features shaped like ForexEnv's."""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0005, bars))
+    prices = (close - close.mean()) / close.std()
+    features = np.column_stack([prices, rng.normal(size=(bars, columns - 1))])
+    return prices.astype(np.float32), features.astype(np.float32)
+
+
+def benchmark(
+    prices: np.ndarray,
+    signal_features: np.ndarray,
+    window_size: int = 20,
+    num_envs: int = 256,
+    steps: int = 200,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Step ``num_envs`` looped envs and the batched env with the same actions."""
+    actions = np.random.default_rng(seed).integers(0, 3, size=(steps, num_envs))
+
+    envs = [LoopForexEnv(prices, signal_features, window_size) for _ in range(num_envs)]
+    loop_rewards = np.empty((steps, num_envs))
+    for env in envs:
+        env.reset()
+    started = time.perf_counter()
+    for t, batch in enumerate(actions):
+        for i, env in enumerate(envs):
+            _, loop_rewards[t, i], _, truncated, _ = env.step(batch[i])
+            if truncated:
+                env.reset()
+    loop_seconds = time.perf_counter() - started
+
+    vec_env = VecForexEnv((prices, signal_features), window_size, num_envs=num_envs)
+    vec_rewards = np.empty((steps, num_envs))
+    vec_env.reset()
+    started = time.perf_counter()
+    for t, batch in enumerate(actions):
+        _, vec_rewards[t], _, _ = vec_env.step(batch)
+    vec_seconds = time.perf_counter() - started
+
+    loop_profit = np.array([env._total_profit for env in envs])
+    return {
+        "num_envs": num_envs,
+        "env_steps": steps * num_envs,
+        "loop_steps_per_sec": steps * num_envs / loop_seconds,
+        "vec_steps_per_sec": steps * num_envs / vec_seconds,
+        "speedup": loop_seconds / vec_seconds,
+        "max_reward_diff": float(np.abs(loop_rewards - vec_rewards).max()),
+        "max_profit_diff": float(np.abs(loop_profit - vec_env.total_profit).max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the batched ForexEnv against per-env Python stepping"
+    )
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--window-size", type=int, default=20)
+    parser.add_argument("--envs", type=int, nargs="+", default=[16, 256, 4096])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    prices, features = synthetic_prices(args.bars, seed=args.seed)
+    results = [
+        benchmark(prices, features, args.window_size, n, args.steps, args.seed)
+        for n in args.envs
+    ]
+    print(json.dumps(results, indent=2))
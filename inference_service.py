@@ -0,0 +1,532 @@
+import argparse
+import functools
+import itertools
+import json
+import os
+import platform
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from model_registry import PRODUCTION, ModelRegistry
+from online_inference import fast_predict_fn
+from onnx_export import OHLC_COLUMNS
+
+DEFAULT_SOCKET = "/tmp/forex_inference.sock"
+_CLOSE = object()
+
+
+class MicroBatcher:
+    """Collects single-window requests and runs them as one batched predict.
+
+    A worker thread takes the first queued request, then waits at most
+    ``max_delay`` seconds (the latency budget) for up to ``max_batch - 1``
+    more, copies the windows into a preallocated batch array and calls
+    ``predict`` once. Every :meth:`submit` returns a ``Future`` that gets
+    its row of the scores, or the exception ``predict`` raised. One model
+    call per batch instead of per request is where the throughput comes
+    from; ``max_batch=1`` disables batching for comparison.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        window_shape: Tuple[int, ...],
+        max_batch: int = 64,
+        max_delay: float = 0.002,
+        name: str = "micro-batcher",
+    ):
+        self.predict = predict
+        self.window_shape = tuple(window_shape)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batch_sizes = deque(maxlen=10000)
+        self._batch = np.empty((max_batch,) + self.window_shape, dtype=np.float32)
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, window) -> Future:
+        future = Future()
+        window = np.asarray(window, dtype=np.float32)
+        if window.shape != self.window_shape:
+            future.set_exception(
+                ValueError(f"Window shape {window.shape} != {self.window_shape}")
+            )
+        else:
+            self._queue.put((window, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+            pending = [item]
+            deadline = time.perf_counter() + self.max_delay
+            closing = False
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = (
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                pending.append(item)
+            self._execute(pending)
+            if closing:
+                return
+
+    def _execute(self, pending) -> None:
+        pending = [
+            (window, future)
+            for window, future in pending
+            if future.set_running_or_notify_cancel()
+        ]
+        if not pending:
+            return
+        batch = self._batch[: len(pending)]
+        for row, (window, _) in zip(batch, pending):
+            row[...] = window
+        try:
+            scores = np.asarray(self.predict(batch))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        self.batch_sizes.append(len(pending))
+        for row, (_, future) in zip(scores, pending):
+            future.set_result(row)
+
+    def close(self) -> None:
+        """Finish the queued requests and stop the worker."""
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+
+class _RegistryRunner:
+    """Batched predict of a served registry model, rebuilt on promotion."""
+
+    def __init__(self, served):
+        self.served = served
+        self.version = None
+
+    def _load(self, current) -> None:
+        seq_length = current.params.get("seq_length", 60)
+        n_features = len(current.params.get("columns", OHLC_COLUMNS))
+        self.forward = fast_predict_fn(current.model, (None, seq_length, n_features))
+        scaler = current.artifacts.get("scaler")
+        self.scale = self.offset = None
+        if scaler is not None:
+            self.scale = np.asarray(scaler["scale"], dtype=np.float32)
+            self.offset = np.asarray(scaler["offset"], dtype=np.float32)
+        self.version = current.version
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        current = self.served.current
+        if current.version != self.version:
+            self._load(current)
+        if self.scale is not None:  # Raw OHLC in, training scaling applied here
+            batch *= self.scale
+            batch += self.offset
+        return self.forward(batch)
+
+
+class InferenceService:
+    """One micro-batcher per model, shared by every symbol and strategy.
+
+    Registry models are loaded once per process (see
+    :meth:`model_registry.ModelRegistry.load`) on first use, and requests
+    carry raw OHLC windows: the registered scaler is applied to the whole
+    batch. A promoted version is picked up without restarting the service.
+    :meth:`add` serves any other batched predict function under a name.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[ModelRegistry] = None,
+        max_batch: int = 64,
+        max_delay: float = 0.002,
+        stage: str = PRODUCTION,
+    ):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stage = stage
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()  # One registry load per model name
+
+    def add(
+        self,
+        name: str,
+        predict: Callable[[np.ndarray], np.ndarray],
+        window_shape: Tuple[int, ...],
+    ) -> MicroBatcher:
+        with self._lock:
+            batcher = self._batchers[name] = MicroBatcher(
+                predict,
+                window_shape,
+                self.max_batch,
+                self.max_delay,
+                name=f"micro-batcher-{name}",
+            )
+        return batcher
+
+    def batcher(self, name: str) -> MicroBatcher:
+        with self._lock:
+            batcher = self._batchers.get(name)
+        if batcher is not None:
+            return batcher
+        with self._loading:
+            if name in self._batchers:  # Another thread loaded it meanwhile
+                return self._batchers[name]
+            self.registry = self.registry or ModelRegistry()
+            served = self.registry.serve(name, self.stage)
+            params = served.current.params
+            window_shape = (
+                params.get("seq_length", 60),
+                len(params.get("columns", OHLC_COLUMNS)),
+            )
+            return self.add(name, _RegistryRunner(served), window_shape)
+
+    def submit(self, name: str, window) -> Future:
+        return self.batcher(name).submit(window)
+
+    def predict(self, name: str, window, timeout: Optional[float] = None):
+        return self.submit(name, window).result(timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            batchers = list(self._batchers.values())
+            self._batchers.clear()
+        for batcher in batchers:
+            batcher.close()
+
+
+# Frames: header and payload lengths, a JSON header, then float32 bytes
+_FRAME = struct.Struct("!II")
+
+
+def _send(sock: socket.socket, header: Dict, payload: bytes = b"") -> None:
+    encoded = json.dumps(header).encode()
+    sock.sendall(_FRAME.pack(len(encoded), len(payload)) + encoded + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock: socket.socket) -> Optional[Tuple[Dict, bytes]]:
+    lengths = _recv_exact(sock, _FRAME.size)
+    if lengths is None:
+        return None
+    header_size, payload_size = _FRAME.unpack(lengths)
+    header = _recv_exact(sock, header_size)
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    if header is None or payload is None:
+        return None
+    return json.loads(header), payload
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """One client connection; replies are sent as batches finish, by request id."""
+
+    def handle(self) -> None:
+        write_lock = threading.Lock()
+        while True:
+            message = _recv(self.request)
+            if message is None:
+                return
+            header, payload = message
+            window = np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+            future = self.server.service.submit(header["model"], window)
+            future.add_done_callback(
+                functools.partial(self._reply, header["id"], write_lock)
+            )
+
+    def _reply(self, request_id: int, write_lock: threading.Lock, future: Future):
+        header, payload = {"id": request_id}, b""
+        try:
+            scores = np.asarray(future.result(), dtype=np.float32)
+            header["shape"] = list(scores.shape)
+            payload = scores.tobytes()
+        except Exception as e:
+            header["error"] = repr(e)
+        with write_lock:
+            try:
+                _send(self.request, header, payload)
+            except OSError:
+                pass  # Client went away
+
+
+def serve_unix(
+    service: InferenceService, path: str = DEFAULT_SOCKET
+) -> socketserver.ThreadingUnixStreamServer:
+    """A Unix socket server for ``service``; run ``serve_forever`` on it."""
+    if os.path.exists(path):
+        os.unlink(path)  # Stale socket of an earlier run
+    server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+class InferenceClient:
+    """Connection to :func:`serve_unix`; many requests may be in flight at once."""
+
+    def __init__(self, path: str = DEFAULT_SOCKET):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def submit(self, model: str, window) -> Future:
+        window = np.ascontiguousarray(window, dtype=np.float32)
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            _send(
+                self._sock,
+                {"id": request_id, "model": model, "shape": list(window.shape)},
+                window.tobytes(),
+            )
+        return future
+
+    def predict(self, model: str, window, timeout: Optional[float] = None):
+        return self.submit(model, window).result(timeout)
+
+    def _read(self) -> None:
+        while True:
+            try:
+                message = _recv(self._sock)
+            except OSError:
+                message = None
+            if message is None:
+                break
+            header, payload = message
+            with self._lock:
+                future = self._pending.pop(header["id"])
+            if "error" in header:
+                future.set_exception(RuntimeError(header["error"]))
+            else:
+                scores = np.frombuffer(payload, dtype=np.float32)
+                future.set_result(scores.reshape(header["shape"]))
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError("Inference service disconnected"))
+
+    def close(self) -> None:
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)  # Wakes the reader's recv
+        except OSError:
+            pass
+        self._sock.close()
+        self._reader.join()
+
+
+class SyntheticModel:
+    """Stand-in for a compiled model: fixed cost per call plus cost per window.
+
+    ``call_ms`` models the framework's dispatch overhead, which batching
+    amortizes; ``sample_us`` the per-window compute, which it does not.
+    Both sleep, so like TensorFlow the call releases the GIL.
+    """
+
+    def __init__(self, call_ms: float = 2.0, sample_us: float = 30.0, classes: int = 3):
+        self.call_seconds = call_ms / 1000.0
+        self.sample_seconds = sample_us / 1e6
+        self.classes = classes
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        time.sleep(self.call_seconds + len(batch) * self.sample_seconds)
+        logits = batch.reshape(len(batch), -1)[:, : self.classes]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_test(
+    submit: Callable[[np.ndarray], Future],
+    window_shape: Tuple[int, ...],
+    clients: int = 32,
+    requests: int = 200,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Closed-loop load: ``clients`` threads (symbols) each send ``requests``.
+
+    Every client waits for its result before sending the next window, like
+    a strategy deciding once per bar. Returns requests per second and the
+    latency percentiles in milliseconds.
+    """
+    rng = np.random.default_rng(seed)
+    windows = rng.normal(size=(64,) + tuple(window_shape)).astype(np.float32)
+    latencies = np.empty((clients, requests))
+    errors = []
+    start = threading.Barrier(clients + 1)
+
+    def client(index: int) -> None:
+        start.wait()
+        try:
+            for i in range(requests):
+                sent = time.perf_counter()
+                submit(windows[(index + i) % len(windows)]).result()
+                latencies[index, i] = time.perf_counter() - sent
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    ms = latencies.ravel() * 1000.0
+    return {
+        "requests": int(ms.size),
+        "requests_per_sec": ms.size / seconds,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def run_load_tests(
+    service_factory: Callable[[int, float], Tuple[InferenceService, str]],
+    clients: List[int],
+    delays: List[float],
+    requests: int = 200,
+    max_batch: int = 64,
+    socket_path: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Unbatched baseline and each latency budget, for each client count."""
+    results = {}
+    configs = [("unbatched", 1, 0.0)] + [
+        (f"budget_{delay * 1000:g}ms", max_batch, delay) for delay in delays
+    ]
+    for n_clients in clients:
+        for label, batch, delay in configs:
+            service, name = service_factory(batch, delay)
+            batcher = service.batcher(name)
+            server = client = None
+            try:
+                if socket_path:
+                    server = serve_unix(service, socket_path)
+                    threading.Thread(target=server.serve_forever, daemon=True).start()
+                    client = InferenceClient(socket_path)
+                    submit = functools.partial(client.submit, name)
+                else:
+                    submit = functools.partial(service.submit, name)
+                result = load_test(submit, batcher.window_shape, n_clients, requests)
+            finally:
+                if client is not None:
+                    client.close()
+                if server is not None:
+                    server.shutdown()
+                    server.server_close()
+                service.close()
+            result["mean_batch"] = float(np.mean(batcher.batch_sizes))
+            results[f"{label}/clients_{n_clients}"] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Micro-batching inference service and its load generator"
+    )
+    parser.add_argument("--model", default="cnn_zone", help="Registered model name")
+    parser.add_argument("--registry", default="registry")
+    parser.add_argument(
+        "--serve", action="store_true", help="Serve --model on --socket until killed"
+    )
+    parser.add_argument("--socket", default=None, help=f"e.g. {DEFAULT_SOCKET}")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument(
+        "--delays", type=float, nargs="+", default=[0.0005, 0.002, 0.005]
+    )
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="Load-test a SyntheticModel instead of the registry model",
+    )
+    parser.add_argument("--call-ms", type=float, default=2.0)
+    parser.add_argument("--sample-us", type=float, default=30.0)
+    parser.add_argument("--seq-length", type=int, default=60)
+    parser.add_argument("--output", default="reports/inference_service.json")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.serve:
+        service = InferenceService(registry, args.max_batch, args.delays[0])
+        server = serve_unix(service, args.socket or DEFAULT_SOCKET)
+        print(f"Serving {args.model} on {server.server_address}")
+        server.serve_forever()
+        return
+
+    def service_factory(max_batch: int, delay: float):
+        if args.synthetic:
+            service = InferenceService(None, max_batch, delay)
+            model = SyntheticModel(args.call_ms, args.sample_us)
+            service.add("synthetic", model, (args.seq_length, len(OHLC_COLUMNS)))
+            return service, "synthetic"
+        return InferenceService(registry, max_batch, delay), args.model
+
+    results = run_load_tests(
+        service_factory,
+        args.clients,
+        args.delays,
+        args.requests,
+        args.max_batch,
+        args.socket,
+    )
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    for name, metrics in results.items():
+        print(name, {key: round(value, 3) for key, value in metrics.items()})
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
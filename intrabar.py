@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from barriers import first_touch, touch_price
+
+
+class FineData:
+    """Bid/ask prices of M1 bars or ticks on one sorted time axis.
+
+    Each row carries bid and ask open/high/low so M1 bars and ticks (where
+    open, high and low coincide) are drilled into with the same code.
+    """
+
+    def __init__(self, times, bid_open, bid_high, bid_low, ask_open, ask_high, ask_low):
+        self.times = np.asarray(times, dtype="datetime64[ns]").astype(np.int64)
+        self.bid_open = np.asarray(bid_open, dtype=np.float64)
+        self.bid_high = np.asarray(bid_high, dtype=np.float64)
+        self.bid_low = np.asarray(bid_low, dtype=np.float64)
+        self.ask_open = np.asarray(ask_open, dtype=np.float64)
+        self.ask_high = np.asarray(ask_high, dtype=np.float64)
+        self.ask_low = np.asarray(ask_low, dtype=np.float64)
+
+    @classmethod
+    def from_bars(cls, bars: pd.DataFrame, point: float) -> "FineData":
+        """M1 bars with the MT5 ``Spread`` column (points) applied to the ask side."""
+        spread = (
+            bars["Spread"].to_numpy(dtype=np.float64) * point
+            if "Spread" in bars
+            else 0.0
+        )
+        o, h, l = (
+            bars[col].to_numpy(dtype=np.float64) for col in ("Open", "High", "Low")
+        )
+        return cls(bars.index.values, o, h, l, o + spread, h + spread, l + spread)
+
+    @classmethod
+    def from_ticks(
+        cls, ticks: pd.DataFrame, point: Optional[float] = None
+    ) -> "FineData":
+        """Ticks with ``Bid`` and ``Ask`` columns; a missing ask is rebuilt from ``Spread``."""
+        bid = ticks["Bid"].to_numpy(dtype=np.float64)
+        if "Ask" in ticks:
+            ask = ticks["Ask"].to_numpy(dtype=np.float64)
+        else:
+            ask = bid + ticks["Spread"].to_numpy(dtype=np.float64) * (point or 0.0)
+        # MT5 tick exports leave bid or ask empty when only the other side changed
+        bid = pd.Series(bid).ffill().to_numpy()
+        ask = pd.Series(ask).ffill().to_numpy()
+        return cls(ticks.index.values, bid, bid, bid, ask, ask, ask)
+
+
+def _bar_period(times: np.ndarray) -> int:
+    diffs = np.diff(times)
+    return int(np.median(diffs)) if len(diffs) else 0
+
+
+def simulate_exits(
+    bars: pd.DataFrame,
+    entry_bar: np.ndarray,
+    direction: np.ndarray,
+    stop: np.ndarray,
+    target: np.ndarray,
+    point: float = 0.0,
+    fine: Optional[FineData] = None,
+    entry_time: Optional[np.ndarray] = None,
+    bar_period: Optional[pd.Timedelta] = None,
+) -> pd.DataFrame:
+    """Resolve the SL/TP exit of many positions, drilling into finer data when given.
+
+    The first bar that could trigger each position's stop or target is found
+    on bar data, with longs closing on the bid and shorts on the ask (bid
+    plus the recorded ``Spread`` in points). Only those bars are then
+    replayed on ``fine`` data (M1 bars or ticks) to learn which level was
+    really hit first and at what price. When the finer data shows no touch,
+    the scan moves on to the next candidate bar. ``entry_time`` restricts
+    the entry bar to the part after the fill.
+
+    Returns one row per position with ``exit_bar``, ``exit_time``,
+    ``exit_price``, ``reason`` ("stop", "target" or "open"),
+    ``resolved_by`` ("bar" or "fine") and ``ambiguous``, which is set when
+    the finest data available still had both levels inside one row. Those
+    are counted as stops.
+    """
+    entry_bar = np.asarray(entry_bar, dtype=np.int64)
+    direction = np.asarray(direction)
+    stop = np.asarray(stop, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    n_events = len(entry_bar)
+
+    times = bars.index.values.astype("datetime64[ns]").astype(np.int64)
+    period = (
+        _bar_period(times)
+        if bar_period is None
+        else int(pd.Timedelta(bar_period).value)
+    )
+    spread = (
+        bars["Spread"].to_numpy(dtype=np.float64) * point if "Spread" in bars else 0.0
+    )
+    bid = {col: bars[col].to_numpy(dtype=np.float64) for col in ("Open", "High", "Low")}
+    ask = {col: values + spread for col, values in bid.items()}
+    entry_ns = (
+        None
+        if entry_time is None
+        else np.asarray(entry_time, dtype="datetime64[ns]").astype(np.int64)
+    )
+
+    long = direction > 0
+    upper = np.where(long, target, stop)
+    lower = np.where(long, stop, target)
+    exit_bar = np.full(n_events, -1, dtype=np.int64)
+    exit_time = np.full(n_events, np.iinfo(np.int64).min, dtype=np.int64)
+    exit_price = np.full(n_events, np.nan)
+    side = np.zeros(n_events, dtype=np.int8)
+    by_fine = np.zeros(n_events, dtype=bool)
+    ambiguous = np.zeros(n_events, dtype=bool)
+
+    cursor = entry_bar.copy()
+    pending = np.arange(n_events)
+    while len(pending):
+        hit_bar = np.full(len(pending), -1, dtype=np.int64)
+        hit_side = np.zeros(len(pending), dtype=np.int8)
+        hit_both = np.zeros(len(pending), dtype=bool)
+        for is_long, prices in ((True, bid), (False, ask)):
+            rows = np.flatnonzero(long[pending] == is_long)
+            events = pending[rows]
+            hit_bar[rows], hit_side[rows], hit_both[rows] = first_touch(
+                prices["High"],
+                prices["Low"],
+                cursor[events],
+                upper[events],
+                lower[events],
+            )
+        touched = hit_bar >= 0
+        pending, hit_bar, hit_side, hit_both = (
+            pending[touched],
+            hit_bar[touched],
+            hit_side[touched],
+            hit_both[touched],
+        )
+        if not len(pending):
+            break
+
+        retry = np.zeros(len(pending), dtype=bool)
+        coarse = np.ones(len(pending), dtype=bool)
+        if fine is not None:
+            bar_start = times[hit_bar]
+            lo = np.searchsorted(fine.times, bar_start)
+            hi = np.searchsorted(fine.times, bar_start + period)
+            covered = hi > lo
+            on_entry = hit_bar == entry_bar[pending]
+            if entry_ns is not None:
+                lo = np.where(
+                    on_entry, np.searchsorted(fine.times, entry_ns[pending]), lo
+                )
+            for is_long, (f_open, f_high, f_low) in (
+                (True, (fine.bid_open, fine.bid_high, fine.bid_low)),
+                (False, (fine.ask_open, fine.ask_high, fine.ask_low)),
+            ):
+                rows = np.flatnonzero(covered & (long[pending] == is_long))
+                events = pending[rows]
+                f_idx, f_side, f_both = first_touch(
+                    f_high, f_low, lo[rows], upper[events], lower[events], end=hi[rows]
+                )
+                f_side = np.where(f_both, np.where(is_long, -1, 1), f_side)
+                found = f_idx >= 0
+                done, idx = events[found], f_idx[found]
+                side[done] = f_side[found]
+                exit_price[done] = touch_price(
+                    f_open,
+                    idx,
+                    f_side[found],
+                    upper[done],
+                    lower[done],
+                    lo[rows][found] - 1 + on_entry[rows][found],
+                )
+                exit_time[done] = fine.times[idx]
+                exit_bar[done] = hit_bar[rows][found]
+                by_fine[done] = True
+                ambiguous[done] = f_both[found]
+                retry[rows[~found]] = True
+            coarse = ~covered
+
+        # Bars without finer data keep the bar-level answer, stop first on ties
+        rows = np.flatnonzero(coarse)
+        events = pending[rows]
+        bar_side = np.where(
+            hit_both[rows], np.where(long[events], -1, 1), hit_side[rows]
+        )
+        for is_long, prices in ((True, bid), (False, ask)):
+            pick = long[events] == is_long
+            done = events[pick]
+            exit_price[done] = touch_price(
+                prices["Open"],
+                hit_bar[rows][pick],
+                bar_side[pick],
+                upper[done],
+                lower[done],
+                entry_bar[done],
+            )
+        side[events] = bar_side
+        exit_bar[events] = hit_bar[rows]
+        exit_time[events] = times[hit_bar[rows]]
+        ambiguous[events] = hit_both[rows]
+
+        cursor[pending[retry]] = hit_bar[retry] + 1
+        pending = pending[retry]
+
+    is_stop = np.where(long, side < 0, side > 0)
+    reason = np.where(side == 0, "open", np.where(is_stop, "stop", "target"))
+    return pd.DataFrame(
+        {
+            "exit_bar": exit_bar,
+            "exit_time": pd.to_datetime(exit_time),
+            "exit_price": exit_price,
+            "reason": reason,
+            "resolved_by": np.where(by_fine, "fine", "bar"),
+            "ambiguous": ambiguous,
+        }
+    )
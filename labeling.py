@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Union
+
+from barriers import first_touch
+
+ArrayLike = Union[np.ndarray, pd.Series]
+
+# Class ids used by the CNN zone classifiers (mod_cnn.py, new_cnn.py, predictions.py)
+DEMAND, SUPPLY, NEUTRAL = 0, 1, 2
+
+
+def average_true_range(
+    high: ArrayLike, low: ArrayLike, close: ArrayLike, period: int = 14
+) -> np.ndarray:
+    """Wilder ATR, matching ``ta.volatility.AverageTrueRange`` up to the warm-up."""
+    high, low, close = (np.asarray(x, dtype=np.float64) for x in (high, low, close))
+    prev_close = np.concatenate([[close[0]], close[:-1]])
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    return pd.Series(true_range).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+
+def barrier_widths(
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    method: str = "atr",
+    upper: float = 2.0,
+    lower: float = 1.0,
+    atr_period: int = 14,
+    pip_value: float = 0.0001,
+) -> Dict[str, np.ndarray]:
+    """Distance of the upper and lower barrier from each bar's close.
+
+    With ``method="atr"`` the widths are ``upper``/``lower`` multiples of the
+    ATR; with ``method="pips"`` they are fixed ``upper``/``lower`` pips.
+    """
+    n = len(close)
+    if method == "atr":
+        atr = average_true_range(high, low, close, atr_period)
+        return {"upper": atr * upper, "lower": atr * lower}
+    if method == "pips":
+        return {
+            "upper": np.full(n, upper * pip_value),
+            "lower": np.full(n, lower * pip_value),
+        }
+    raise ValueError(f"Unknown barrier method {method!r}")
+
+
+def triple_barrier(
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    upper_width: ArrayLike,
+    lower_width: ArrayLike,
+    horizon: int,
+    tie_label: int = -1,
+) -> pd.DataFrame:
+    """First barrier hit after every bar: +1 upper, -1 lower, 0 time limit.
+
+    The trade of bar ``t`` enters at its close and is watched on bars
+    ``t+1 .. t+horizon``. When one bar spans both barriers the order is
+    unknown and ``tie_label`` is used. ``ret`` is the return to the barrier
+    price (or to the close at the time limit), ``bars`` the holding time and
+    ``complete`` is False for the final bars whose window runs past the data.
+    """
+    high, low, close = (np.asarray(x, dtype=np.float64) for x in (high, low, close))
+    n = len(close)
+    start = np.arange(n) + 1
+    end = np.minimum(start + horizon, n)
+    upper = close + np.asarray(upper_width, dtype=np.float64)
+    lower = close - np.asarray(lower_width, dtype=np.float64)
+    # NaN widths (indicator warm-up) never trigger
+    upper = np.where(np.isnan(upper), np.inf, upper)
+    lower = np.where(np.isnan(lower), -np.inf, lower)
+
+    index, side, both = first_touch(high, low, start, upper, lower, end=end)
+    label = np.where(both, tie_label, side).astype(np.int8)
+    hit = index >= 0
+    last = np.maximum(end - 1, 0)
+    exit_bar = np.where(hit, index, last)
+    exit_price = np.where(
+        hit,
+        np.where(label > 0, upper, np.where(label < 0, lower, close[last])),
+        close[last],
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(close > 0, exit_price / close - 1.0, 0.0)
+    return pd.DataFrame(
+        {
+            "label": label,
+            "ret": ret,
+            "bars": exit_bar - np.arange(n),
+            "complete": (start + horizon <= n) | hit,
+        }
+    )
+
+
+def zone_labels(
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    horizon: int = 96,
+    method: str = "atr",
+    tp: float = 2.0,
+    sl: float = 1.0,
+    atr_period: int = 14,
+    pip_value: float = 0.0001,
+) -> np.ndarray:
+    """Demand/supply/neutral classes from the trade each bar would have produced.
+
+    A bar is DEMAND when a long entered at its close reaches its take profit
+    before its stop loss within ``horizon`` bars, SUPPLY when a short does,
+    and NEUTRAL otherwise. ``tp``/``sl`` are ATR multiples or pips depending
+    on ``method``. Ties count as stops, and if both trades win the earlier
+    one decides.
+    """
+    widths = barrier_widths(high, low, close, method, tp, sl, atr_period, pip_value)
+    long = triple_barrier(high, low, close, widths["upper"], widths["lower"], horizon)
+    short = triple_barrier(
+        high, low, close, widths["lower"], widths["upper"], horizon, tie_label=1
+    )
+    long_win = long["label"].to_numpy() > 0
+    short_win = short["label"].to_numpy() < 0
+    both = long_win & short_win
+    long_first = long["bars"].to_numpy() <= short["bars"].to_numpy()
+    labels = np.full(len(long), NEUTRAL, dtype=np.int64)
+    labels[long_win & (~both | long_first)] = DEMAND
+    labels[short_win & (~both | ~long_first)] = SUPPLY
+    return labels
@@ -0,0 +1,178 @@
+import numpy as np
+from typing import Dict, Optional, Union
+
+ArrayLike = Union[np.ndarray, list]
+
+
+def _as_curves(values: ArrayLike) -> np.ndarray:
+    """Return a float (bars x curves) array; 1-D input becomes a single column."""
+    arr = np.asarray(values, dtype=np.float64)
+    return arr[:, None] if arr.ndim == 1 else arr
+
+
+def _squeeze(result: np.ndarray, like: ArrayLike):
+    """Give 1-D callers a scalar back instead of a one-element array."""
+    return result[0] if np.ndim(like) == 1 else result
+
+
+def returns_from_equity(equity: ArrayLike) -> np.ndarray:
+    """Simple per-bar returns of one or many equity curves (time on axis 0)."""
+    eq = _as_curves(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = eq[1:] / eq[:-1] - 1.0
+    rets = np.where(np.isfinite(rets), rets, 0.0)
+    return rets[:, 0] if np.ndim(equity) == 1 else rets
+
+
+def drawdown_series(equity: ArrayLike, relative: bool = True) -> np.ndarray:
+    """Drawdown from the running peak, as a fraction or in account currency."""
+    eq = _as_curves(equity)
+    peak = np.maximum.accumulate(eq, axis=0)
+    if relative:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dd = np.where(peak > 0, (peak - eq) / peak, 0.0)
+    else:
+        dd = peak - eq
+    return dd[:, 0] if np.ndim(equity) == 1 else dd
+
+
+def max_drawdown(equity: ArrayLike, relative: bool = True):
+    """Maximum drawdown of one or many equity curves."""
+    if len(equity) == 0:
+        return 0.0
+    dd = _as_curves(drawdown_series(equity, relative=relative))
+    return _squeeze(dd.max(axis=0), equity)
+
+
+def sharpe_ratio(
+    returns: ArrayLike, periods_per_year: int = 252, risk_free_rate: float = 0.0
+):
+    """Annualised Sharpe ratio; 0 where the returns have no variance."""
+    rets = _as_curves(returns) - risk_free_rate / periods_per_year
+    std = rets.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(
+            std > 0, np.sqrt(periods_per_year) * rets.mean(axis=0) / std, 0.0
+        )
+    return _squeeze(ratio, returns)
+
+
+def sortino_ratio(
+    returns: ArrayLike, periods_per_year: int = 252, risk_free_rate: float = 0.0
+):
+    """Annualised Sortino ratio using downside deviation below zero excess return."""
+    rets = _as_curves(returns) - risk_free_rate / periods_per_year
+    downside = np.sqrt(np.mean(np.minimum(rets, 0.0) ** 2, axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(
+            downside > 0, np.sqrt(periods_per_year) * rets.mean(axis=0) / downside, 0.0
+        )
+    return _squeeze(ratio, returns)
+
+
+def annualized_return(equity: ArrayLike, periods_per_year: int = 252):
+    """Compound annual growth rate implied by the first and last equity values."""
+    eq = _as_curves(equity)
+    years = max(len(eq) - 1, 1) / periods_per_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(eq[0] > 0, eq[-1] / eq[0], np.nan)
+        cagr = np.where(growth > 0, growth ** (1.0 / years) - 1.0, -1.0)
+    return _squeeze(cagr, equity)
+
+
+def calmar_ratio(equity: ArrayLike, periods_per_year: int = 252):
+    """Annualised return divided by maximum drawdown; 0 without a drawdown."""
+    cagr = np.atleast_1d(annualized_return(equity, periods_per_year))
+    mdd = np.atleast_1d(max_drawdown(equity))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(mdd > 0, cagr / mdd, 0.0)
+    return _squeeze(ratio, equity)
+
+
+def win_rate(trade_pnl: ArrayLike):
+    """Share of winning trades; NaN entries pad ragged per-curve trade lists."""
+    pnl = _as_curves(trade_pnl)
+    counted = np.isfinite(pnl)
+    wins = np.sum(np.where(counted, pnl > 0, False), axis=0)
+    total = counted.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(total > 0, wins / total, 0.0)
+    return _squeeze(rate, trade_pnl)
+
+
+def profit_factor(trade_pnl: ArrayLike):
+    """Gross profit over gross loss; inf with no losing trades, 0 with no trades."""
+    pnl = np.nan_to_num(_as_curves(trade_pnl))
+    gross_profit = np.where(pnl > 0, pnl, 0.0).sum(axis=0)
+    gross_loss = -np.where(pnl < 0, pnl, 0.0).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(
+            gross_loss > 0,
+            gross_profit / gross_loss,
+            np.where(gross_profit > 0, np.inf, 0.0),
+        )
+    return _squeeze(factor, trade_pnl)
+
+
+def exposure(positions: ArrayLike):
+    """Fraction of bars spent holding a position."""
+    pos = _as_curves(positions)
+    return _squeeze((np.nan_to_num(pos) != 0).mean(axis=0), positions)
+
+
+def compute_metrics(
+    equity: ArrayLike,
+    positions: Optional[ArrayLike] = None,
+    trade_pnl: Optional[ArrayLike] = None,
+    periods_per_year: int = 252,
+    risk_free_rate: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """Compute the standard metric set for one curve or a (bars x curves) batch.
+
+    Returns and the running peak are derived once and shared by every metric,
+    so a whole parameter sweep can be scored with a single call.
+    """
+    eq = _as_curves(equity)
+    n_curves = eq.shape[1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = eq[1:] / eq[:-1] - 1.0
+    rets = np.where(np.isfinite(rets), rets, 0.0)
+    peak = np.maximum.accumulate(eq, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak > 0, (peak - eq) / peak, 0.0)
+    mdd = dd.max(axis=0) if len(eq) else np.zeros(n_curves)
+
+    excess = rets - risk_free_rate / periods_per_year
+    mean = excess.mean(axis=0) if len(excess) else np.zeros(n_curves)
+    std = excess.std(axis=0) if len(excess) else np.zeros(n_curves)
+    downside = (
+        np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2, axis=0))
+        if len(excess)
+        else np.zeros(n_curves)
+    )
+    scale = np.sqrt(periods_per_year)
+    years = max(len(eq) - 1, 1) / periods_per_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_return = np.where(eq[0] > 0, eq[-1] / eq[0] - 1.0, 0.0)
+        cagr = np.where(
+            total_return > -1.0, (1.0 + total_return) ** (1.0 / years) - 1.0, -1.0
+        )
+        result = {
+            "total_return": total_return,
+            "cagr": cagr,
+            "max_drawdown": mdd,
+            "sharpe": np.where(std > 0, scale * mean / std, 0.0),
+            "sortino": np.where(downside > 0, scale * mean / downside, 0.0),
+            "calmar": np.where(mdd > 0, cagr / mdd, 0.0),
+        }
+
+    if positions is not None:
+        result["exposure"] = np.atleast_1d(exposure(positions))
+    if trade_pnl is not None:
+        result["win_rate"] = np.atleast_1d(win_rate(trade_pnl))
+        result["profit_factor"] = np.atleast_1d(profit_factor(trade_pnl))
+        result["trades"] = np.isfinite(_as_curves(trade_pnl)).sum(axis=0)
+
+    if np.ndim(equity) == 1:
+        return {key: value[0].item() for key, value in result.items()}
+    return result
@@ -2,12 +2,13 @@ import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Conv1D, MaxPooling1D, Flatten, Dropout
-from keras_tuner.tuners import BayesianOptimization
 import logging
 
+from labeling import zone_labels
+from model_registry import ModelRegistry
+from onnx_export import save_scaler
+from tuning import tune
+
 
 # Parameters
 pair = 'EURUSD'
@@ -16,6 +17,8 @@ start_date = '2020-01-01'
 end_date = '2024-09-30'
 sl_pips = 200
 tp_ratio = 2
+label_source = 'triple_barrier'  # 'zones' keeps the price-proximity labels from label_zones
+label_horizon = 96  # Bars a labelled trade may stay open (one day of M15)
 
 # Initialize MT5 and login
 def initialize_mt5():
@@ -91,49 +94,46 @@ def create_sequences_and_labels(data, seq_length, labels):
         sequence_labels.append(labels[i])
     return np.array(sequences), np.array(sequence_labels)
 
-# Identify zones
-demand_zones, supply_zones = identify_zones(data)
+if label_source == 'triple_barrier':
+    # Label each bar by which trade (long, short or none) would reach TP before SL,
+    # with an ATR stop and a TP of tp_ratio ATRs
+    labels = zone_labels(data['high'], data['low'], data['close'],
+                         horizon=label_horizon, method='atr', tp=tp_ratio, sl=1.0)
+else:
+    # Identify zones
+    demand_zones, supply_zones = identify_zones(data)
 
-# Label the entire dataset based on zones
-labels = label_zones(data, demand_zones, supply_zones)
+    # Label the entire dataset based on zones
+    labels = label_zones(data, demand_zones, supply_zones)
 
 # Prepare training and test data
 seq_length = 60
 X_train, y_train = create_sequences_and_labels(train_data, seq_length, labels[:train_size])
 X_test, y_test = create_sequences_and_labels(test_data, seq_length, labels[train_size:])
 
-# Build the CNN model
-def build_cnn_model(hp):
-    model = Sequential()
-    model.add(Conv1D(filters=hp.Int('filters', 32, 128, step=32),
-                     kernel_size=hp.Choice('kernel_size', [3, 5]),
-                     activation='relu', input_shape=(X_train.shape[1], X_train.shape[2])))
-    model.add(MaxPooling1D(pool_size=hp.Choice('pool_size', [2, 3])))
-    model.add(Flatten())
-    model.add(Dense(hp.Int('dense_units', 32, 128, step=32), activation='relu'))
-    model.add(Dropout(hp.Float('dropout', 0.2, 0.5, step=0.1)))
-    model.add(Dense(3, activation='softmax'))  # 3 classes: demand, supply, neutral
-    model.compile(optimizer=tf.keras.optimizers.Adam(hp.Float('learning_rate', 1e-4, 1e-2, sampling='log')),
-                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-    return model
-
-# Bayesian Optimization tuner
-tuner = BayesianOptimization(
-    build_cnn_model,
-    objective='val_loss',
-    max_trials=10,
-    executions_per_trial=2,
-    directory='cnn_tuner_dir',
-    project_name='cnn_zone_prediction'
-)
-
-# Perform tuning
-tuner.search(X_train, y_train, epochs=5, validation_split=0.2)
+# Search space, search and final-fit callbacks come from tuning.tune
+tuning_mode = 'bayesian'  # or 'hyperband'
+tuning_workers = 1  # > 1 runs trials in that many processes
+model, best_hps, callbacks = tune('cnn', X_train, y_train, outputs=3, mode=tuning_mode, workers=tuning_workers,
+                                  directory='cnn_tuner_dir', project_name='cnn_zone_prediction')
 
 # Train the best model
-best_hps = tuner.get_best_hyperparameters(num_trials=1)[0]
-model = tuner.hypermodel.build(best_hps)
-history = model.fit(X_train, y_train, epochs=20, validation_split=0.2, batch_size=32)
+history = model.fit(X_train, y_train, epochs=20, validation_split=0.2, batch_size=32,
+                    callbacks=callbacks)
 
 # Save the model in HDF5 format
 model.save("cnn_forex_model.h5")
+
+# Save the scaler next to it; onnx_export.py folds it into the ONNX graph
+save_scaler(scaler, "cnn_forex_scaler.json")
+
+# Register both with the training settings and promote them; ForexTrader serves
+# the promoted version
+ModelRegistry().register('cnn_zone', 'cnn_forex_model.h5', kind='keras',
+                         artifacts={'scaler': 'cnn_forex_scaler.json'},
+                         params={'seq_length': seq_length, 'columns': ['open', 'high', 'low', 'close'],
+                                 'label_source': label_source, 'label_horizon': label_horizon,
+                                 'label_tp': tp_ratio},
+                         data=data,
+                         metrics={key: values[-1] for key, values in history.history.items()},
+                         promote=True)
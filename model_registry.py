@@ -0,0 +1,360 @@
+import argparse
+import errno
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from result_cache import data_fingerprint
+
+DEFAULT_REGISTRY_DIR = "registry"
+PRODUCTION = "production"
+MAX_VERSION_RETRIES = 100  # Concurrent registrations racing for a version number
+
+
+def _load_keras(path: Path):
+    from tensorflow.keras.models import load_model
+
+    return load_model(path, compile=False)
+
+
+def _load_sb3(algo: str) -> Callable[[Path], Any]:
+    def load(path: Path):
+        import stable_baselines3
+
+        return getattr(stable_baselines3, algo.upper()).load(path, device="cpu")
+
+    return load
+
+
+def _load_onnx(path: Path):
+    from onnx_export import OnnxPredictor
+
+    return OnnxPredictor(path)
+
+
+# Model kinds and how to load them; heavy frameworks are imported on first use
+LOADERS: Dict[str, Callable[[Path], Any]] = {
+    "keras": _load_keras,
+    "sb3-ppo": _load_sb3("ppo"),
+    "sb3-a2c": _load_sb3("a2c"),
+    "sb3-dqn": _load_sb3("dqn"),
+    "onnx": _load_onnx,
+}
+
+
+def _load_artifact(path: Path) -> Any:
+    if path.suffix == ".json":
+        return json.loads(path.read_text())
+    # Anything else is handed over as a path: a VecNormalize .pkl, for one, needs
+    # VecNormalize.load(path, venv) with the env it wraps
+    return path
+
+
+def _copy(source: Path, target: Path) -> None:
+    if source.is_dir():  # TF SavedModel directories
+        shutil.copytree(source, target)
+    else:
+        shutil.copy2(source, target)
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class LoadedModel:
+    """A registered version in memory: the model plus its preprocessing.
+
+    ``artifacts`` holds the extras by name (parsed JSON such as scaler
+    parameters, otherwise paths), ``params`` the training settings such as
+    ``seq_length``, and ``manifest`` everything that was registered.
+    """
+
+    def __init__(self, manifest: Dict[str, Any], model: Any, artifacts: Dict[str, Any]):
+        self.manifest = manifest
+        self.model = model
+        self.artifacts = artifacts
+
+    @property
+    def name(self) -> str:
+        return self.manifest["name"]
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.manifest["params"]
+
+    def scale(self, values) -> np.ndarray:
+        """Apply the saved MinMax ``scaler`` artifact, as ``scaler.transform``."""
+        scaler = self.artifacts["scaler"]
+        values = np.asarray(values, dtype=np.float64)
+        return values * np.asarray(scaler["scale"]) + np.asarray(scaler["offset"])
+
+    def __repr__(self) -> str:
+        return f"LoadedModel({self.name!r}, {self.version!r})"
+
+
+# Process-wide warm cache: each version is loaded at most once per process
+_CACHE: Dict[Path, LoadedModel] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+class ModelRegistry:
+    """Versioned models on disk with their scaler, settings, data hash and metrics.
+
+    Layout: ``<root>/<name>/<version>/`` holds copies of the model file and
+    its artifacts plus ``manifest.json``; ``<root>/<name>/production``
+    names the promoted version. Versions are written to a temporary
+    directory and renamed into place, and promotion replaces the pointer
+    file atomically, so a reader never sees a half-written version and a
+    running trader can pick up a promotion without a restart (see
+    :meth:`serve`).
+    """
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_REGISTRY_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def versions(self, name: str) -> List[str]:
+        directory = self.root / name
+        if not directory.is_dir():
+            return []
+        return sorted(
+            path.name
+            for path in directory.iterdir()
+            if not path.name.startswith(".") and (path / "manifest.json").exists()
+        )
+
+    def register(
+        self,
+        name: str,
+        model_path: Union[str, Path],
+        kind: str,
+        artifacts: Optional[Dict[str, Union[str, Path]]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Any = None,
+        metrics: Optional[Dict[str, float]] = None,
+        promote: bool = False,
+    ) -> str:
+        """Copy a trained model and its artifacts in as the next version.
+
+        ``data`` is the training data (fingerprinted with
+        :func:`result_cache.data_fingerprint`) or an existing fingerprint
+        string. Returns the new version, e.g. ``"v0003"``.
+        """
+        if kind not in LOADERS:
+            raise ValueError(
+                f"Unknown model kind {kind!r}; expected one of {list(LOADERS)}"
+            )
+        model_path = Path(model_path)
+        directory = self.root / name
+        directory.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=directory, prefix=".staging-"))
+        try:
+            _copy(model_path, staging / model_path.name)
+            copied = {}
+            for key, path in (artifacts or {}).items():
+                path = Path(path)
+                _copy(path, staging / path.name)
+                copied[key] = path.name
+            fingerprint = (
+                data
+                if isinstance(data, str) or data is None
+                else data_fingerprint(data)
+            )
+            for _ in range(MAX_VERSION_RETRIES):
+                existing = self.versions(name)
+                version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+                manifest = {
+                    "name": name,
+                    "version": version,
+                    "kind": kind,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "model": model_path.name,
+                    "artifacts": copied,
+                    "params": params or {},
+                    "data_fingerprint": fingerprint,
+                    "metrics": {
+                        key: float(value) for key, value in (metrics or {}).items()
+                    },
+                }
+                (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+                try:
+                    staging.rename(directory / version)
+                    break
+                except OSError as e:
+                    # Another process took this version number; anything else is real
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+            else:
+                raise RuntimeError(
+                    f"No free version of {name!r} after {MAX_VERSION_RETRIES} attempts"
+                )
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logging.info(f"Registered {name} {version}")
+        if promote:
+            self.promote(name, version)
+        return version
+
+    def manifest(self, name: str, version: Optional[str] = None) -> Dict[str, Any]:
+        version = version or self.resolve(name)
+        return json.loads((self.root / name / version / "manifest.json").read_text())
+
+    def resolve(self, name: str, stage: str = PRODUCTION) -> str:
+        """The version a stage points to; ``"latest"`` is the newest registered."""
+        if stage == "latest":
+            versions = self.versions(name)
+            if not versions:
+                raise LookupError(f"No versions of {name!r} in {self.root}")
+            return versions[-1]
+        pointer = self.root / name / stage
+        if not pointer.exists():
+            raise LookupError(f"No {stage} version of {name!r} in {self.root}")
+        return pointer.read_text().strip()
+
+    def promote(self, name: str, version: str, stage: str = PRODUCTION) -> None:
+        if version not in self.versions(name):
+            raise LookupError(f"{name!r} has no version {version!r}")
+        _write_atomic(self.root / name / stage, version)
+        logging.info(f"Promoted {name} {version} to {stage}")
+
+    def load(self, name: str, version: Optional[str] = None) -> LoadedModel:
+        """A version (default: production) from the process-wide cache."""
+        version = version or self.resolve(name)
+        directory = (self.root / name / version).resolve()
+        with _CACHE_LOCK:
+            loaded = _CACHE.get(directory)
+            if loaded is None:
+                manifest = json.loads((directory / "manifest.json").read_text())
+                model = LOADERS[manifest["kind"]](directory / manifest["model"])
+                artifacts = {
+                    key: _load_artifact(directory / filename)
+                    for key, filename in manifest["artifacts"].items()
+                }
+                loaded = _CACHE[directory] = LoadedModel(manifest, model, artifacts)
+        return loaded
+
+    def serve(
+        self, name: str, stage: str = PRODUCTION, check_interval: float = 5.0
+    ) -> "ServedModel":
+        return ServedModel(self, name, stage, check_interval)
+
+
+class ServedModel:
+    """The currently promoted version of a model, swapped in on promotion.
+
+    :attr:`current` re-reads the stage pointer at most every
+    ``check_interval`` seconds; when it names another version, that
+    version is loaded (once per process) and then replaces the served one
+    in a single assignment, so callers see either the old or the new
+    model, never a mix.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        name: str,
+        stage: str = PRODUCTION,
+        check_interval: float = 5.0,
+    ):
+        self.registry = registry
+        self.name = name
+        self.stage = stage
+        self.check_interval = check_interval
+        self._current = registry.load(name, registry.resolve(name, stage))
+        self._checked = time.monotonic()
+
+    def refresh(self) -> bool:
+        """Swap to the stage's version if it changed; True when it did."""
+        self._checked = time.monotonic()
+        version = self.registry.resolve(self.name, self.stage)
+        if version == self._current.version:
+            return False
+        loaded = self.registry.load(self.name, version)
+        logging.info(f"Serving {self.name} {version} (was {self._current.version})")
+        self._current = loaded
+        return True
+
+    @property
+    def current(self) -> LoadedModel:
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.refresh()
+        return self._current
+
+    @property
+    def model(self) -> Any:
+        return self.current.model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List, register and promote models")
+    parser.add_argument("--root", default=DEFAULT_REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list")
+    listing.add_argument("name")
+
+    register = commands.add_parser("register")
+    register.add_argument("name")
+    register.add_argument("model")
+    register.add_argument("--kind", choices=list(LOADERS), default="keras")
+    register.add_argument(
+        "--artifact", action="append", default=[], help="key=path, repeatable"
+    )
+    register.add_argument(
+        "--param", action="append", default=[], help="key=json value, repeatable"
+    )
+    register.add_argument("--promote", action="store_true")
+
+    promote = commands.add_parser("promote")
+    promote.add_argument("name")
+    promote.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        production = None
+        try:
+            production = registry.resolve(args.name)
+        except LookupError:
+            pass
+        for version in registry.versions(args.name):
+            manifest = registry.manifest(args.name, version)
+            marker = "*" if version == production else " "
+            print(marker, version, manifest["created"], manifest["metrics"])
+    elif args.command == "register":
+        artifacts = dict(item.split("=", 1) for item in args.artifact)
+        params = {
+            key: json.loads(value)
+            for key, value in (item.split("=", 1) for item in args.param)
+        }
+        version = registry.register(
+            args.name,
+            args.model,
+            args.kind,
+            artifacts=artifacts,
+            params=params,
+            promote=args.promote,
+        )
+        print(version)
+    else:
+        registry.promote(args.name, args.version)
+
+
+if __name__ == "__main__":
+    main()
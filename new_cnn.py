@@ -4,12 +4,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Conv1D, MaxPooling1D, Flatten, Dropout
-from keras_tuner.tuners import BayesianOptimization
 import math
 import time
+from tuning import tune
 
 # Parameters
 pair = 'EURUSD'
@@ -102,38 +99,15 @@ seq_length = 60
 X_train, y_train = create_sequences_and_labels(train_data, seq_length, labels[:train_size])
 X_test, y_test = create_sequences_and_labels(test_data, seq_length, labels[train_size:])
 
-# Build the CNN model
-def build_cnn_model(hp):
-    model = Sequential()
-    model.add(Conv1D(filters=hp.Int('filters', 32, 128, step=32),
-                     kernel_size=hp.Choice('kernel_size', [3, 5]),
-                     activation='relu', input_shape=(X_train.shape[1], X_train.shape[2])))
-    model.add(MaxPooling1D(pool_size=hp.Choice('pool_size', [2, 3])))
-    model.add(Flatten())
-    model.add(Dense(hp.Int('dense_units', 32, 128, step=32), activation='relu'))
-    model.add(Dropout(hp.Float('dropout', 0.2, 0.5, step=0.1)))
-    model.add(Dense(3, activation='softmax'))  # 3 classes: demand, supply, neutral
-    model.compile(optimizer=tf.keras.optimizers.Adam(hp.Float('learning_rate', 1e-4, 1e-2, sampling='log')),
-                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-    return model
-
-# Bayesian Optimization tuner
-tuner = BayesianOptimization(
-    build_cnn_model,
-    objective='val_loss',
-    max_trials=10,
-    executions_per_trial=2,
-    directory='cnn_tuner_dir',
-    project_name='cnn_zone_prediction'
-)
-
-# Perform tuning
-tuner.search(X_train, y_train, epochs=5, validation_split=0.2)
+# Search space, search and final-fit callbacks come from tuning.tune
+tuning_mode = 'bayesian'  # or 'hyperband'
+tuning_workers = 1  # > 1 runs trials in that many processes
+model, best_hps, callbacks = tune('cnn', X_train, y_train, outputs=3, mode=tuning_mode, workers=tuning_workers,
+                                  directory='cnn_tuner_dir', project_name='cnn_zone_prediction')
 
 # Train the best model
-best_hps = tuner.get_best_hyperparameters(num_trials=1)[0]
-model = tuner.hypermodel.build(best_hps)
-history = model.fit(X_train, y_train, epochs=20, validation_split=0.2, batch_size=32)
+history = model.fit(X_train, y_train, epochs=20, validation_split=0.2, batch_size=32,
+                    callbacks=callbacks)
 
 # Predict zones on the test set
 predicted_zones = model.predict(X_test)
@@ -3,12 +3,11 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Conv1D, MaxPooling1D, LSTM, Flatten, Dropout, Attention
-from keras_tuner.tuners import BayesianOptimization
 import backtrader as bt
 import math
+from metrics import max_drawdown
+from bracket_sim import simulate_brackets
+from tuning import tune
 
 # Parameters
 pair = 'EURUSD_M15.csv'  # Forex pair
@@ -19,6 +18,7 @@ risk_per_trade = 0.01  # Risk 1% per trade
 sl_pips = 25  # Stop-loss in pips
 tp_ratio = 2  # Take profit is 2x stop-loss
 pip_value = 0.0001  # Pip value for EUR/USD
+use_backtrader = False  # The array engine in bracket_sim reproduces the Cerebro run much faster
 
 # Function to get historical data from the CSV file and clean it up
 def get_data(pair):
@@ -38,7 +38,7 @@ def get_data(pair):
     # Drop rows with missing (NaN) values
     data = data.dropna()
     
-    return data[['Open', 'High', 'Low', 'Close', 'TickVol']]  # Return only relevant columns
+    return data[['Open', 'High', 'Low', 'Close', 'TickVol', 'Spread']]  # Spread is kept for intrabar fills
 
 # Load the data
 data = get_data(pair)
@@ -65,56 +65,14 @@ def calculate_metrics(y_true, y_pred):
     rmse = math.sqrt(mean_squared_error(y_true, y_pred))
     return mae, rmse
 
-# Build the model with Attention mechanism
-def build_cnn_lstm_model(hp):
-    model = Sequential()
-
-    # CNN layers for pattern recognition
-    model.add(Conv1D(filters=hp.Int('filters', 32, 128, step=32),
-                     kernel_size=hp.Choice('kernel_size', [3, 5]),
-                     activation='relu', input_shape=(X.shape[1], X.shape[2])))
-    model.add(MaxPooling1D(pool_size=hp.Choice('pool_size', [2, 3])))
-
-    # LSTM for temporal dependencies
-    lstm_output = LSTM(units=hp.Int('lstm_units', 32, 128, step=32), return_sequences=True)(model.output)
-    
-    # Attention mechanism: Pass LSTM output as both query and value
-    attention_output = tf.keras.layers.Attention()([lstm_output, lstm_output])
-    
-    # Flatten the output for Dense layers
-    flatten_output = Flatten()(attention_output)
-
-    # Additional Dense layers for learning
-    model.add(Dense(hp.Int('dense_units', 32, 128, step=32), activation='relu'))
-    model.add(Dropout(hp.Float('dropout', 0.2, 0.5, step=0.1)))
-    
-    # Output layer (predicting the next closing price)
-    model.add(Dense(1))
-    
-    model.compile(optimizer=tf.keras.optimizers.Adam(hp.Float('learning_rate', 1e-4, 1e-2, sampling='log')),
-                  loss='mean_squared_error')
-
-    return model
-
-# Bayesian Optimization tuner
-tuner = BayesianOptimization(
-    build_cnn_lstm_model,
-    objective='val_loss',
-    max_trials=10,
-    executions_per_trial=2,
-    directory='my_dir',
-    project_name='cnn_lstm_optimization'
-)
-
-# Perform tuning
-tuner.search(X, y, epochs=5, validation_split=0.2)
-
-# Get the best hyperparameters
-best_hps = tuner.get_best_hyperparameters(num_trials=1)[0]
-model = tuner.hypermodel.build(best_hps)
+# Search space, search and final-fit callbacks come from tuning.tune
+tuning_mode = 'bayesian'  # or 'hyperband'
+tuning_workers = 1  # > 1 runs trials in that many processes
+model, best_hps, callbacks = tune('cnn_lstm', X, y, outputs=1, mode=tuning_mode, workers=tuning_workers,
+                                  directory='my_dir', project_name='cnn_lstm_optimization')
 
 # Train the optimized model
-history = model.fit(X, y, epochs=20, validation_split=0.2, batch_size=32)
+history = model.fit(X, y, epochs=20, validation_split=0.2, batch_size=32, callbacks=callbacks)
 
 # Predict the next prices
 predicted_prices = model.predict(X)
@@ -165,7 +123,7 @@ class CNNLSTMStrategy(bt.Strategy):
         self.losses = 0
         self.total_profit = 0
         self.max_drawdown = 0
-        self.highest_balance = initial_balance
+        self.balance_history = [initial_balance]
 
     def next(self):
         if self.zone_index < len(self.zones):
@@ -201,26 +159,34 @@ class CNNLSTMStrategy(bt.Strategy):
                 self.losses += 1
 
             self.balance += pnl
-            self.highest_balance = max(self.highest_balance, self.balance)
-            drawdown = self.highest_balance - self.balance
-            self.max_drawdown = max(self.max_drawdown, drawdown)
+            self.balance_history.append(self.balance)
+
+    def stop(self):
+        # Drawdown in account currency over the closed-trade balance curve
+        self.max_drawdown = max_drawdown(self.balance_history, relative=False)
 
 # Add Data Feed to Cerebro
 class CustomPandasData(bt.feeds.PandasData):
     lines = ('TickVol',)
     params = (('datetime', None), ('open', 'Open'), ('high', 'High'), ('low', 'Low'), ('close', 'Close'), ('volume', 'TickVol'), ('openinterest', None))
 
-datafeed = CustomPandasData(dataname=data)  # Use the custom data feed
-cerebro = bt.Cerebro()
-cerebro.adddata(datafeed)
-
-# Add strategy
-cerebro.addstrategy(CNNLSTMStrategy)
-
-# Set starting cash
-cerebro.broker.set_cash(initial_balance)
-
-# Run backtest
-print(f'Starting Portfolio Value: {initial_balance}')
-cerebro.run()
-print(f'Final Portfolio Value: {cerebro.broker.getvalue()}')
+if use_backtrader:
+    datafeed = CustomPandasData(dataname=data)  # Use the custom data feed
+    cerebro = bt.Cerebro()
+    cerebro.adddata(datafeed)
+
+    # Add strategy
+    cerebro.addstrategy(CNNLSTMStrategy)
+
+    # Set starting cash
+    cerebro.broker.set_cash(initial_balance)
+
+    # Run backtest
+    print(f'Starting Portfolio Value: {initial_balance}')
+    cerebro.run()
+    print(f'Final Portfolio Value: {cerebro.broker.getvalue()}')
+else:
+    result = simulate_brackets(data, zones, initial_balance, sl_pips, tp_ratio, pip_value)
+    print(f'Starting Portfolio Value: {initial_balance}')
+    print(f'Final Portfolio Value: {result["final_value"]}')
+    print(f'Wins: {result["wins"]}, Losses: {result["losses"]}, Max Drawdown: {result["max_drawdown"]:.2f}')
@@ -0,0 +1,109 @@
+import time
+import numpy as np
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from window_obs import RingWindow
+
+
+def fast_predict_fn(model, input_shape) -> Callable[[np.ndarray], np.ndarray]:
+    """A predict function with the least per-call overhead for small batches.
+
+    ``model.predict`` builds a data pipeline on every call, which costs far
+    more than the forward pass of a single window. Keras models are
+    called through one traced ``tf.function`` instead (a ``None`` batch
+    axis in ``input_shape`` serves any batch size without retracing); ONNX
+    predictors (see :class:`onnx_export.OnnxPredictor`) already run a
+    session directly.
+    """
+    if hasattr(model, "layers"):
+        import tensorflow as tf
+
+        forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec(input_shape, tf.float32)],
+        )
+        return lambda x: forward(x).numpy()
+    return model.predict
+
+
+class OnlineWindowPredictor:
+    """Per-bar predictions on the latest ``seq_length`` scaled bars.
+
+    Each closed bar is scaled with the training ``scaler`` (parameters as
+    saved by :func:`onnx_export.scaler_params`) into a preallocated row and
+    pushed into a :class:`window_obs.RingWindow`; the window is copied into
+    a preallocated ``(1, seq_length, n_features)`` input, so a bar costs one
+    forward pass and no allocations of its own. The latency of every
+    prediction is kept for :meth:`latency_stats`. Batch ``predict`` over a
+    whole test set remains the tool for backtests.
+    """
+
+    def __init__(
+        self,
+        model,
+        seq_length: int,
+        scaler: Optional[Dict[str, list]] = None,
+        n_features: int = 4,
+        history: int = 10000,
+    ):
+        self.seq_length = seq_length
+        self.ring = RingWindow(seq_length, n_features)
+        self._input = np.zeros((1, seq_length, n_features), dtype=np.float32)
+        self._row = np.empty(n_features, dtype=np.float32)
+        if scaler is not None:
+            self._scale = np.asarray(scaler["scale"], dtype=np.float32)
+            self._offset = np.asarray(scaler["offset"], dtype=np.float32)
+        else:
+            self._scale = self._offset = None
+        self._predict = fast_predict_fn(model, self._input.shape)
+        self.latencies = deque(maxlen=history)  # Seconds, most recent last
+
+    @property
+    def ready(self) -> bool:
+        return self.ring.ready
+
+    @property
+    def window(self) -> np.ndarray:
+        """The scaled window the next prediction sees, oldest bar first."""
+        return self.ring.window()
+
+    def push(self, bar) -> None:
+        """Add one closed bar (raw OHLC) without predicting."""
+        row = self._row
+        row[:] = bar
+        if self._scale is not None:
+            np.multiply(row, self._scale, out=row)
+            np.add(row, self._offset, out=row)
+        self.ring.push(row)
+
+    def prime(self, bars) -> Optional[np.ndarray]:
+        """Fill the window from recent bars; scores of the newest window if full."""
+        for bar in np.asarray(bars)[-self.seq_length :]:
+            self.push(bar)
+        return self.predict() if self.ready else None
+
+    def update(self, bar) -> np.ndarray:
+        """Push the bar that just closed and score the window ending with it."""
+        self.push(bar)
+        return self.predict()
+
+    def predict(self) -> np.ndarray:
+        started = time.perf_counter()
+        np.copyto(self._input[0], self.ring.window())
+        scores = self._predict(self._input)[0]
+        self.latencies.append(time.perf_counter() - started)
+        return scores
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Mean, median, p99 and worst per-bar inference time in milliseconds."""
+        if not self.latencies:
+            return {"bars": 0}
+        ms = np.asarray(self.latencies) * 1000.0
+        return {
+            "bars": len(ms),
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
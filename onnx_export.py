@@ -0,0 +1,276 @@
+import argparse
+import json
+import pickle
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+
+
+def scaler_params(scaler, columns: Sequence[str] = OHLC_COLUMNS) -> Dict[str, list]:
+    """The numbers of a fitted MinMaxScaler: ``x * scale + offset``."""
+    return {
+        "type": "minmax",
+        "columns": list(columns),
+        "scale": scaler.scale_.tolist(),
+        "offset": scaler.min_.tolist(),
+        "data_min": scaler.data_min_.tolist(),
+        "data_max": scaler.data_max_.tolist(),
+    }
+
+
+def save_scaler(scaler, path: str, columns: Sequence[str] = OHLC_COLUMNS) -> None:
+    Path(path).write_text(json.dumps(scaler_params(scaler, columns), indent=2))
+
+
+def load_scaler(path: str) -> Dict[str, list]:
+    return json.loads(Path(path).read_text())
+
+
+def _add_metadata(onnx_model, metadata: Dict[str, object]) -> None:
+    for key, value in metadata.items():
+        entry = onnx_model.metadata_props.add()
+        entry.key = key
+        entry.value = value if isinstance(value, str) else json.dumps(value)
+
+
+class OnnxPredictor:
+    """onnxruntime session for an exported model, with Keras-like ``predict``.
+
+    Sessions run on the CPU provider with ``threads`` intra-op threads (one
+    is fastest for single windows) and every graph optimization enabled.
+    Export metadata (input columns, sequence length, scaler) is in
+    :attr:`metadata`.
+    """
+
+    def __init__(self, path: str, threads: int = 1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = model_input.shape
+        self.metadata = {
+            key: json.loads(value) if value.startswith(("[", "{")) else value
+            for key, value in self.session.get_modelmeta().custom_metadata_map.items()
+        }
+
+    def predict(self, x) -> np.ndarray:
+        """Scores for a batch; a single sample (no batch axis) is batched."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == len(self.input_shape) - 1:
+            x = x[None]
+        return self.session.run(None, {self.input_name: x})[0]
+
+    def predict_class(self, x) -> np.ndarray:
+        return np.argmax(self.predict(x), axis=-1)
+
+
+def _check_parity(
+    path: str, sample: np.ndarray, expected: np.ndarray, atol: float
+) -> Dict[str, float]:
+    actual = OnnxPredictor(path).predict(sample)
+    max_diff = float(np.abs(actual - expected).max())
+    same_class = float(np.mean(actual.argmax(-1) == expected.argmax(-1)))
+    if max_diff > atol:
+        raise ValueError(f"ONNX output differs by {max_diff:.3g} (> {atol}) in {path}")
+    return {"max_abs_diff": max_diff, "argmax_agreement": same_class}
+
+
+def export_keras(
+    model_path: str,
+    output_path: str,
+    scaler: Optional[Dict[str, list]] = None,
+    opset: int = 13,
+    samples: int = 64,
+    atol: float = 1e-4,
+    seed: int = 0,
+) -> Dict[str, object]:
+    """Convert a Keras zone model (CNN or CNN-LSTM) to ONNX and check parity.
+
+    With ``scaler`` (see :func:`scaler_params`) the MinMax scaling becomes
+    the first op of the graph, so callers, MQL5 EAs included, feed raw
+    OHLC windows of shape ``(batch, seq_length, features)``.
+    """
+    import onnx
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    seq_length, n_features = model.input_shape[1:]
+    inputs = tf.keras.Input(shape=(seq_length, n_features), name="bars")
+    x = inputs
+    if scaler is not None:
+        x = tf.keras.layers.Rescaling(
+            scale=np.asarray(scaler["scale"], dtype=np.float32),
+            offset=np.asarray(scaler["offset"], dtype=np.float32),
+        )(x)
+    wrapped = tf.keras.Model(inputs, model(x))
+    signature = (
+        tf.TensorSpec((None, seq_length, n_features), tf.float32, name="bars"),
+    )
+    onnx_model, _ = tf2onnx.convert.from_keras(
+        wrapped, input_signature=signature, opset=opset
+    )
+    _add_metadata(
+        onnx_model,
+        {
+            "source": "keras",
+            "seq_length": str(seq_length),
+            "columns": scaler["columns"] if scaler else OHLC_COLUMNS[:n_features],
+            "scaler": scaler or {},
+            "classes": ["demand", "supply", "neutral"],
+        },
+    )
+    onnx.save(onnx_model, output_path)
+
+    rng = np.random.default_rng(seed)
+    low, high = (
+        (np.asarray(scaler["data_min"]), np.asarray(scaler["data_max"]))
+        if scaler
+        else (np.zeros(n_features), np.ones(n_features))
+    )
+    sample = rng.uniform(low, high, size=(samples, seq_length, n_features))
+    sample = sample.astype(np.float32)
+    expected = wrapped.predict(sample, verbose=0)
+    report = {"output": output_path, "input_shape": [None, seq_length, n_features]}
+    report.update(_check_parity(output_path, sample, expected, atol))
+    return report
+
+
+def export_sb3(
+    model_path: str,
+    output_path: str,
+    algo: str = "ppo",
+    normalize_path: Optional[str] = None,
+    opset: int = 17,
+    samples: int = 64,
+    atol: float = 1e-4,
+    seed: int = 0,
+) -> Dict[str, object]:
+    """Convert an SB3 policy to ONNX returning one score per discrete action.
+
+    PPO/A2C export the actor's logits, DQN its Q-values; the action is the
+    argmax either way, the same as ``predict(..., deterministic=True)``.
+    Saved ``VecNormalize`` statistics are folded in as the first ops, so the
+    graph takes raw observations.
+    """
+    import onnx
+    import torch as th
+    from stable_baselines3 import A2C, DQN, PPO
+
+    model = {"ppo": PPO, "a2c": A2C, "dqn": DQN}[algo].load(model_path, device="cpu")
+    stats = None
+    if normalize_path:
+        with open(normalize_path, "rb") as f:
+            stats = pickle.load(f)  # VecNormalize; only its obs statistics are used
+
+    class PolicyScores(th.nn.Module):
+        def __init__(self, policy):
+            super().__init__()
+            self.policy = policy
+            self.normalize = stats is not None and stats.norm_obs
+            if self.normalize:
+                self.register_buffer(
+                    "mean", th.as_tensor(stats.obs_rms.mean, dtype=th.float32)
+                )
+                self.register_buffer(
+                    "std",
+                    th.as_tensor(
+                        np.sqrt(stats.obs_rms.var + stats.epsilon), dtype=th.float32
+                    ),
+                )
+                self.clip = float(stats.clip_obs)
+
+        def forward(self, obs):
+            if self.normalize:
+                obs = th.clamp((obs - self.mean) / self.std, -self.clip, self.clip)
+            if algo == "dqn":
+                return self.policy.q_net(obs)
+            features = self.policy.pi_features_extractor(obs)
+            latent = self.policy.mlp_extractor.forward_actor(features)
+            return self.policy.action_net(latent)
+
+    module = PolicyScores(model.policy).eval()
+    obs_shape = model.observation_space.shape
+    rng = np.random.default_rng(seed)
+    sample = rng.normal(size=(samples,) + obs_shape).astype(np.float32)
+    if stats is not None and stats.norm_obs:
+        sample = sample * np.sqrt(stats.obs_rms.var + stats.epsilon).astype(
+            np.float32
+        ) + stats.obs_rms.mean.astype(np.float32)
+    with th.no_grad():
+        expected = module(th.as_tensor(sample)).numpy()
+        th.onnx.export(
+            module,
+            th.as_tensor(sample[:1]),
+            output_path,
+            opset_version=opset,
+            input_names=["obs"],
+            output_names=["scores"],
+            dynamic_axes={"obs": {0: "batch"}, "scores": {0: "batch"}},
+        )
+    onnx_model = onnx.load(output_path)
+    _add_metadata(
+        onnx_model,
+        {
+            "source": f"sb3-{algo}",
+            "obs_shape": list(obs_shape),
+            "normalized": "1" if stats else "0",
+        },
+    )
+    onnx.save(onnx_model, output_path)
+
+    # The graph's argmax must be the action SB3 itself would take
+    policy_obs = stats.normalize_obs(sample) if stats is not None else sample
+    actions, _ = model.predict(policy_obs, deterministic=True)
+    report = {"output": output_path, "input_shape": [None, *obs_shape]}
+    report.update(_check_parity(output_path, sample, expected, atol))
+    report["sb3_action_agreement"] = float(np.mean(expected.argmax(-1) == actions))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export Keras zone models and SB3 policies to ONNX"
+    )
+    parser.add_argument("kind", choices=["keras", "sb3"])
+    parser.add_argument("model", help="Keras .h5/.keras file or SB3 .zip")
+    parser.add_argument("--output", default=None, help="Defaults to <model>.onnx")
+    parser.add_argument("--scaler", default=None, help="Scaler JSON (keras)")
+    parser.add_argument("--algo", choices=["ppo", "a2c", "dqn"], default="ppo")
+    parser.add_argument("--normalize", default=None, help="VecNormalize .pkl (sb3)")
+    parser.add_argument("--opset", type=int, default=None)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    output = args.output or str(Path(args.model).with_suffix(".onnx"))
+    if args.kind == "keras":
+        report = export_keras(
+            args.model,
+            output,
+            scaler=load_scaler(args.scaler) if args.scaler else None,
+            opset=args.opset or 13,
+            atol=args.atol,
+        )
+    else:
+        report = export_sb3(
+            args.model,
+            output,
+            algo=args.algo,
+            normalize_path=args.normalize,
+            opset=args.opset or 17,
+            atol=args.atol,
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
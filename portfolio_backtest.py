@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, Optional
+
+
+class PortfolioBacktester:
+    """Backtest a basket of symbols against one shared equity curve.
+
+    Signals and prices are (bars x symbols) matrices. A positive signal asks for
+    a long entry, a negative one for a short entry and zero leaves the symbol
+    alone; the absolute value ranks competing entries when the global cap is
+    reached. An opposite signal closes every open entry on that symbol before
+    the new one is added, mirroring the one-direction-per-symbol EAs. Each
+    entry carries its own stop, checked against every later bar's range;
+    with ``exit_on_flat`` a zero signal also closes the symbol.
+    """
+
+    def __init__(
+        self,
+        initial_balance: float = 10000,
+        risk_per_trade: float = 0.01,
+        stop_loss_pct: float = 0.01,
+        max_positions_per_symbol: int = 1,
+        max_total_positions: int = 5,
+        commission: float = 0.0,
+        exit_on_flat: bool = False,
+    ):
+        self.initial_balance = initial_balance
+        self.risk_per_trade = risk_per_trade  # Fraction of equity risked per entry
+        self.stop_loss_pct = stop_loss_pct  # Default stop distance as price fraction
+        self.max_positions_per_symbol = max_positions_per_symbol
+        self.max_total_positions = max_total_positions  # BreakoutGuard maxTotalTrades
+        self.commission = commission  # Cost per unit of notional traded
+        self.exit_on_flat = exit_on_flat  # Close a symbol when its signal is zero
+
+    def run(
+        self,
+        signals: pd.DataFrame,
+        prices: pd.DataFrame,
+        stop_distance: Optional[pd.DataFrame] = None,
+        highs: Optional[pd.DataFrame] = None,
+        lows: Optional[pd.DataFrame] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """Run the backtest and return equity, per-symbol PnL and attribution.
+
+        Signals are acted on at the close of their bar, so a signal on bar t
+        earns the move from t to t+1. ``stop_distance`` (price units, same shape
+        as ``prices``) sets each entry's stop and drives risk-based sizing; it
+        defaults to ``stop_loss_pct`` of the price. A stop is hit when a later
+        bar's ``lows`` (longs) or ``highs`` (shorts) reach it, and the entry
+        closes at the stop, or at the bar's best price when the whole bar
+        gapped past it. Without ``highs``/``lows`` stops are checked on closes.
+        """
+        if signals.shape != prices.shape:
+            raise ValueError(
+                f"signals {signals.shape} and prices {prices.shape} must have the same shape"
+            )
+        signals = signals.reindex(columns=prices.columns)
+        sig = np.nan_to_num(signals.to_numpy(dtype=np.float64))
+        px = prices.to_numpy(dtype=np.float64)
+        if stop_distance is None:
+            stop = px * self.stop_loss_pct
+        else:
+            stop = stop_distance.reindex(columns=prices.columns).to_numpy(
+                dtype=np.float64
+            )
+        hi, lo = (
+            (
+                px
+                if frame is None
+                else frame.reindex(columns=prices.columns).to_numpy(dtype=np.float64)
+            )
+            for frame in (highs, lows)
+        )
+        if hi.shape != px.shape or lo.shape != px.shape:
+            raise ValueError("highs and lows must have the same shape as prices")
+
+        n_bars, n_symbols = px.shape
+        slots = self.max_positions_per_symbol
+        units = np.zeros((n_symbols, slots))  # Signed units of each open entry
+        stop_px = np.full((n_symbols, slots), np.nan)  # Stop level of each entry
+        equity = np.empty(n_bars)
+        pnl = np.zeros((n_bars, n_symbols))
+        costs = np.zeros((n_bars, n_symbols))
+        held = np.zeros((n_bars, n_symbols))
+        trades = np.zeros(n_symbols, dtype=np.int64)
+        stopped = np.zeros(n_symbols, dtype=np.int64)
+        balance = float(self.initial_balance)
+
+        for t in range(n_bars):
+            if t > 0:
+                # Stops hit inside this bar exit there, the rest mark to the close
+                long_hit = (units > 0) & (lo[t, :, None] <= stop_px)
+                short_hit = (units < 0) & (hi[t, :, None] >= stop_px)
+                hit = long_hit | short_hit
+                fill = np.where(
+                    long_hit,
+                    np.minimum(stop_px, hi[t, :, None]),
+                    np.maximum(stop_px, lo[t, :, None]),
+                )
+                exit_px = np.where(hit, fill, px[t, :, None])
+                move = np.nan_to_num(exit_px - px[t - 1, :, None])
+                pnl[t] = (units * move).sum(axis=1)
+                balance += pnl[t].sum()
+                if hit.any():
+                    costs[t] += np.where(hit, np.abs(units) * fill, 0.0).sum(axis=1)
+                    stopped += hit.sum(axis=1)
+                    units[hit] = 0.0
+                    stop_px[hit] = np.nan
+
+            direction = np.sign(sig[t])
+            tradable = np.isfinite(px[t]) & (stop[t] > 0)
+            net = np.sign(units.sum(axis=1))
+
+            # Opposite signals flatten the symbol first, as may a flat signal
+            close = (direction != 0) & tradable & (net == -direction)
+            if self.exit_on_flat:
+                close |= (direction == 0) & np.isfinite(px[t]) & (net != 0)
+            if close.any():
+                costs[t, close] += np.abs(units[close]).sum(axis=1) * px[t, close]
+                units[close] = 0.0
+                stop_px[close] = np.nan
+            direction[~tradable] = 0
+
+            # Per-symbol cap, then the global cap ranked by signal strength
+            entries = (units != 0).sum(axis=1)
+            wants = (direction != 0) & (entries < slots)
+            free_slots = self.max_total_positions - entries.sum()
+            if wants.sum() > free_slots:
+                candidates = np.flatnonzero(wants)
+                ranked = candidates[
+                    np.argsort(-np.abs(sig[t, candidates]), kind="stable")
+                ]
+                wants[:] = False
+                wants[ranked[: max(free_slots, 0)]] = True
+
+            if wants.any():
+                symbols = np.flatnonzero(wants)
+                slot = np.argmax(units[symbols] == 0, axis=1)  # First free slot
+                size = balance * self.risk_per_trade / stop[t, symbols]
+                units[symbols, slot] = direction[symbols] * size
+                stop_px[symbols, slot] = (
+                    px[t, symbols] - direction[symbols] * stop[t, symbols]
+                )
+                trades[symbols] += 1
+                costs[t, symbols] += size * px[t, symbols]
+
+            if self.commission:
+                fees = costs[t] * self.commission
+                pnl[t] -= fees
+                balance -= fees.sum()
+
+            held[t] = units.sum(axis=1)
+            equity[t] = balance
+
+        index = prices.index
+        pnl_df = pd.DataFrame(pnl, index=index, columns=prices.columns)
+        positions_df = pd.DataFrame(held, index=index, columns=prices.columns)
+        attribution = pd.DataFrame(
+            {
+                "pnl": pnl.sum(axis=0),
+                "trades": trades,
+                "stopped": stopped,
+                "exposure": (held != 0).mean(axis=0),
+                "contribution": pnl.sum(axis=0) / self.initial_balance,
+            },
+            index=prices.columns,
+        )
+        logging.info(
+            f"Portfolio final equity: {equity[-1]:.2f} across {n_symbols} symbols"
+        )
+        return {
+            "equity": pd.Series(equity, index=index, name="equity"),
+            "pnl": pnl_df,
+            "positions": positions_df,
+            "attribution": attribution,
+        }
+
+
+if __name__ == "__main__":
+    # Three symbols, room for two positions: the weaker signal is capped out,
+    # then B falls through its 1% stop while A and C ride their signals.
+    index = pd.date_range("2024-01-01", periods=4, freq="D")
+    prices = pd.DataFrame(
+        {"A": [100, 101, 102, 103], "B": [50, 50.2, 49, 48], "C": [20, 20, 20, 21]},
+        index=index,
+    )
+    lows = prices - [0.5, 0.6, 0.1]
+    lows.iloc[1, 1] = 49.4  # B trades through its stop at 49.5 on day two
+    signals = pd.DataFrame(
+        {"A": [2.0, 0, 0, 0], "B": [3.0, 0, 0, 0], "C": [1.0, 1.0, 1.0, 0]},
+        index=index,
+    )
+    results = PortfolioBacktester(max_total_positions=2).run(
+        signals, prices, highs=prices, lows=lows
+    )
+    attribution = results["attribution"]
+    print(results["positions"].to_string())
+    print(attribution.to_string())
+    assert list(attribution["trades"]) == [1, 1, 1]  # C only once B's slot frees
+    assert list(attribution["stopped"]) == [0, 1, 0]
+    assert np.isclose(attribution.loc["B", "pnl"], -100.0)  # 1% of 10000 risked
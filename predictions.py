@@ -1,16 +1,35 @@
 import MetaTrader5 as mt5
 import pandas as pd
 import logging
+import threading
+import time
 import numpy as np
+from contextlib import contextmanager
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from tensorflow.keras.models import load_model
+
+from labeling import zone_labels
+from model_registry import ModelRegistry
+from online_inference import OnlineWindowPredictor
+from result_cache import ResultCache, code_version, data_fingerprint
 
 
 class ForexTrader:
     def __init__(
-        self, pair, timeframe, start_date, end_date, lot_size, sl_pips, tp_ratio
+        self,
+        pair,
+        timeframe,
+        start_date,
+        end_date,
+        lot_size,
+        sl_pips,
+        tp_ratio,
+        model_name="cnn_zone",
+        registry=None,
+        fast_start=False,
     ):
+        self._started = time.perf_counter()
+        self.timings = {}  # Seconds per startup phase, see _timed
         self.pair = pair
         self.timeframe = timeframe
         self.start_date = start_date
@@ -19,31 +38,119 @@ class ForexTrader:
         self.sl_pips = sl_pips
         self.tp_ratio = tp_ratio
         self.active_trade = False
+        self.data = None
+        self.X_test, self.y_test = None, None
+        self.online = None  # OnlineWindowPredictor of the served version
+        self.online_version = None
+        self._last_bar_time = None
+        self._mt5_lock = threading.Lock()  # The MT5 terminal link is not thread-safe
+        self._history_lock = threading.Lock()
 
         # Initialize logging
         logging.basicConfig(filename="trading.log", level=logging.INFO)
 
         # Initialize MT5
-        self.initialize_mt5()
-
-        # Load data
-        self.data = self.get_data()
-
-        # Identify zones and labels
-        self.demand_zones, self.supply_zones = self.identify_zones()
-        self.labels = self.label_zones()
+        with self._timed("mt5_login"):
+            self.initialize_mt5()
+
+        # Serve the promoted model; a newer promotion is picked up without a restart
+        with self._timed("model_load"):
+            self.registry = registry or ModelRegistry()
+            self.served = self.registry.serve(model_name)
+
+        # A fast start trades from the latest bars only (see decide); the
+        # history, zones and test windows are built when evaluation needs them
+        if not fast_start:
+            self.load_history()
+
+    @property
+    def model(self):
+        return self.served.model
+
+    @contextmanager
+    def _timed(self, phase):
+        started = time.perf_counter()
+        yield
+        self.timings[phase] = time.perf_counter() - started
+        logging.info("Startup %s took %.3fs", phase, self.timings[phase])
+
+    # Fetch the history and build zones, labels and test windows
+    def load_history(self):
+        with self._history_lock:
+            if self.X_test is not None:
+                return
+            with self._timed("history"):
+                self.data = self.get_data()
+            with self._timed("zones"):
+                self.demand_zones, self.supply_zones, self.labels = (
+                    self.cached_zones_and_labels()
+                )
+            with self._timed("windows"):
+                self.X_test, self.y_test = self.prepare_data()
+
+    # Zones and labels from the on-disk cache when the history is unchanged
+    def cached_zones_and_labels(self, lookback=100):
+        cache = ResultCache()
+        key = cache.key(
+            "ForexTrader.zones",
+            {"lookback": lookback, **self.label_params()},
+            data_fingerprint(self.data),
+            code_version(ForexTrader, zone_labels),
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        self.demand_zones, self.supply_zones = self.identify_zones(lookback)
+        result = (self.demand_zones, self.supply_zones, self.label_zones())
+        cache.put(key, result)
+        return result
+
+    # Closed bars needed for the next window, without the full history
+    def get_recent_bars(self, count):
+        with self._mt5_lock:
+            rates = mt5.copy_rates_from_pos(self.pair, self.timeframe, 1, count)
+        if rates is None or len(rates) < count:
+            raise RuntimeError(f"Got too few recent bars: {mt5.last_error()}")
+        bars = pd.DataFrame(rates)
+        bars.index = pd.to_datetime(bars["time"], unit="s")
+        return bars[["open", "high", "low", "close"]]
+
+    # Zone class (0 demand, 1 supply, 2 neutral) of the latest closed window;
+    # (re)fills the online window from recent bars
+    def decide(self):
+        current = self.served.current
+        if "scaler" not in current.artifacts:
+            raise LookupError(
+                f"{current.name} {current.version} was registered without a scaler"
+            )
+        seq_length = current.params.get("seq_length", 60)
+        self.online = OnlineWindowPredictor(
+            current.model, seq_length, current.artifacts["scaler"]
+        )
+        self.online_version = current.version
+        bars = self.get_recent_bars(seq_length)
+        self._last_bar_time = bars.index[-1]
+        prediction = int(np.argmax(self.online.prime(bars.to_numpy())))
+        if "time_to_first_decision" not in self.timings:
+            self.timings["time_to_first_decision"] = time.perf_counter() - self._started
+            logging.info(
+                "Time to first decision: %.3fs",
+                self.timings["time_to_first_decision"],
+            )
+        return prediction
 
-        # Prepare training and test data
-        self.X_test, self.y_test = self.prepare_data()
+    # Evaluate in a daemon thread so trading starts without waiting for it
+    def start_background_evaluation(self):
+        thread = threading.Thread(
+            target=self.evaluate_model, name="evaluate_model", daemon=True
+        )
+        thread.start()
+        return thread
 
-        # Load the model
-        self.model = load_model("cnn_forex_model.h5")
-        
     # Evaluate the model performance
     def evaluate_model(self):
         try:
-            predicted_zones = self.model.predict(self.X_test)
-            predicted_classes = np.argmax(predicted_zones, axis=1)
+            predicted_classes = self.predict_history()
 
             # Calculate evaluation metrics
             mae = mean_absolute_error(self.y_test, predicted_classes)
@@ -79,7 +186,10 @@ class ForexTrader:
         try:
             utc_from = pd.to_datetime(self.start_date).to_pydatetime()
             utc_to = pd.to_datetime(self.end_date).to_pydatetime()
-            rates = mt5.copy_rates_range(self.pair, self.timeframe, utc_from, utc_to)
+            with self._mt5_lock:
+                rates = mt5.copy_rates_range(
+                    self.pair, self.timeframe, utc_from, utc_to
+                )
             if rates is None:
                 logging.error("No data retrieved, error code = %s", mt5.last_error())
                 quit()
@@ -113,9 +223,30 @@ class ForexTrader:
             logging.error("Error identifying zones: %s", e)
             return [], []
 
-    # Label data as supply, demand, or neutral zones
+    # How the served model's training labels were made, as registered with it
+    def label_params(self):
+        params = self.served.current.params
+        return {
+            "label_source": params.get("label_source", "zones"),
+            "label_horizon": params.get("label_horizon", 96),
+            "label_tp": params.get("label_tp", self.tp_ratio),
+        }
+
+    # Label data as demand, supply, or neutral the way the model was trained
     def label_zones(self):
         try:
+            params = self.label_params()
+            if params["label_source"] == "triple_barrier":
+                # Which trade (long, short or none) reaches an ATR-sized TP before SL
+                return zone_labels(
+                    self.data["high"],
+                    self.data["low"],
+                    self.data["close"],
+                    horizon=params["label_horizon"],
+                    method="atr",
+                    tp=params["label_tp"],
+                    sl=1.0,
+                )
             labels = []
             for i in range(len(self.data)):
                 close_price = self.data.iloc[i][
@@ -133,12 +264,16 @@ class ForexTrader:
             return np.array([])
 
     # Prepare training and test data
-    def prepare_data(self, seq_length=60):
+    def prepare_data(self, seq_length=None):
         try:
-            scaler = MinMaxScaler()
-            scaled_data = scaler.fit_transform(
-                self.data[["open", "high", "low", "close"]]
-            )
+            current = self.served.current
+            seq_length = seq_length or current.params.get("seq_length", 60)
+            prices = self.data[["open", "high", "low", "close"]]
+            if "scaler" in current.artifacts:
+                # The scaler fitted in training, so inputs match what the model saw
+                scaled_data = current.scale(prices.to_numpy())
+            else:
+                scaled_data = MinMaxScaler().fit_transform(prices)
             train_size = int(len(scaled_data) * 0.8)
             test_data = scaled_data[train_size:]
 
@@ -248,6 +383,10 @@ class ForexTrader:
 
     # Place trades based on predicted zones (0: demand zone, 1: supply zone, 2: neutral)
     def place_trade_based_on_zone(self, prediction):
+        with self._mt5_lock:
+            self._place_trade_based_on_zone(prediction)
+
+    def _place_trade_based_on_zone(self, prediction):
         self.check_trade_status()  # Check if there's an active trade before placing a new one
 
         # Only place a trade if no active trade exists
@@ -263,16 +402,48 @@ class ForexTrader:
                 "Waiting for the current trade to close before placing a new one."
             )
 
-    # Execute trades based on predictions
-    def execute_trades(self):
+    # Zone class of the newest closed bar, fetching only bars not seen yet
+    def next_decision(self, catch_up=8):
+        if self.online is None or self.served.current.version != self.online_version:
+            return self.decide()  # First bar, or a newly promoted model
+        bars = self.get_recent_bars(catch_up)
+        new_bars = bars[bars.index > self._last_bar_time]
+        if new_bars.empty:
+            return None
+        if len(new_bars) == len(bars):  # Missed too many bars to catch up
+            return self.decide()
+        self._last_bar_time = new_bars.index[-1]
+        values = new_bars.to_numpy()
+        for bar in values[:-1]:
+            self.online.push(bar)
+        return int(np.argmax(self.online.update(values[-1])))
+
+    # Trade each closed bar on its newest window
+    def execute_trades(self, poll_seconds=1.0, max_bars=None):
+        traded = 0
         try:
-            predicted_zones = self.model.predict(self.X_test)
-            predicted_zones = np.argmax(predicted_zones, axis=1)
-
-            for prediction in predicted_zones:
+            while max_bars is None or traded < max_bars:
+                prediction = self.next_decision()
+                if prediction is None:
+                    time.sleep(poll_seconds)
+                    continue
                 self.place_trade_based_on_zone(prediction)
+                traded += 1
+                logging.info(
+                    "Bar %s: zone %d, inference %.2f ms",
+                    self._last_bar_time,
+                    prediction,
+                    self.online.latencies[-1] * 1000.0,
+                )
         except Exception as e:
             logging.error("Error executing trades: %s", e)
+        if self.online is not None:
+            logging.info("Inference latency: %s", self.online.latency_stats())
+
+    # Zone classes of every test window in one batch, for backtests
+    def predict_history(self):
+        self.load_history()
+        return np.argmax(self.model.predict(self.X_test), axis=1)
 
     # Shutdown MT5 after trading is done
     def shutdown(self):
@@ -293,12 +464,17 @@ if __name__ == "__main__":
         lot_size=0.01,
         sl_pips=200,
         tp_ratio=2,
+        fast_start=True,
     )
-    # Evaluate the trained model
-    trader.evaluate_model()
-
-    # Execute trades
-    trader.execute_trades()
+    # Evaluate the trained model on the history while trading starts
+    evaluation = trader.start_background_evaluation()
+
+    # Trade every closed bar on its newest window until interrupted
+    try:
+        trader.execute_trades()
+    except KeyboardInterrupt:
+        pass
+    logging.info("Startup timings: %s", trader.timings)
 
     # Shutdown after trading is done
     trader.shutdown()
@@ -0,0 +1,318 @@
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+
+from barriers import first_touch, touch_price
+from forex.mql5.cci_bot import load_bars
+
+# Must match the #defines and Action enum in q-learning.mq5
+RSI_BUCKETS, MA_BUCKETS, ACTIONS = 10, 10, 3
+BUY, SELL, HOLD = 0, 1, 2
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI with Wilder smoothing, as MT5's iRSI computes it."""
+    delta = np.diff(close, prepend=close[0])
+    gain = (
+        pd.Series(np.maximum(delta, 0.0)).ewm(alpha=1.0 / period, adjust=False).mean()
+    )
+    loss = (
+        pd.Series(np.maximum(-delta, 0.0)).ewm(alpha=1.0 / period, adjust=False).mean()
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), 100.0)
+    value[:period] = np.nan
+    return value
+
+
+def market_states(
+    close: np.ndarray,
+    rsi_period: int = 14,
+    ma_period: int = 50,
+    ma_scale: float = 10000.0,
+) -> np.ndarray:
+    """Flat state id ``rsi_index * MA_BUCKETS + ma_index`` per bar, -1 during warm-up.
+
+    Buckets follow GetMarketState: ``int(rsi / 100 * RSI_BUCKETS)`` and
+    ``int(ma / ma_scale * MA_BUCKETS)``, both capped at the last bucket.
+    """
+    rsi_value = rsi(close, rsi_period)
+    ma_value = pd.Series(close).rolling(ma_period).mean().to_numpy()
+    valid = np.isfinite(rsi_value) & np.isfinite(ma_value)
+    rsi_index = np.clip(
+        np.nan_to_num(rsi_value / 100.0 * RSI_BUCKETS), 0, RSI_BUCKETS - 1
+    )
+    ma_index = np.clip(
+        np.nan_to_num(ma_value / ma_scale * MA_BUCKETS), 0, MA_BUCKETS - 1
+    )
+    state = rsi_index.astype(np.int64) * MA_BUCKETS + ma_index.astype(np.int64)
+    return np.where(valid, state, -1)
+
+
+def shaped_reward(price_change: np.ndarray) -> np.ndarray:
+    """GetReward from the EA: gains weigh 1.5x, losses 0.5x."""
+    return np.where(price_change > 0, price_change * 1.5, price_change * 0.5)
+
+
+def trade_outcomes(
+    bars: pd.DataFrame,
+    point: float,
+    sl_pips: float = 400,
+    risk_reward_ratio: float = 2,
+) -> Dict[str, np.ndarray]:
+    """Reward and resume bar of BUY, SELL and HOLD for a decision at every bar close.
+
+    Buys open at the ask (close plus recorded spread) and close on the bid,
+    sells the other way round, with the EA's SL and TP in points; a bar
+    spanning both counts as a stop. Trades still open at the end of the
+    data close at the last bar.
+    """
+    close = bars["Close"].to_numpy(dtype=np.float64)
+    spread = (
+        bars["Spread"].to_numpy(dtype=np.float64) * point if "Spread" in bars else 0.0
+    )
+    spread = np.broadcast_to(spread, close.shape)
+    bid = {col: bars[col].to_numpy(dtype=np.float64) for col in ("Open", "High", "Low")}
+    ask = {col: values + spread for col, values in bid.items()}
+    n = len(close)
+    start = np.arange(n) + 1
+    sl, tp = sl_pips * point, sl_pips * risk_reward_ratio * point
+
+    reward = np.zeros((n, ACTIONS))
+    resume = np.empty((n, ACTIONS), dtype=np.int64)
+    resume[:, HOLD] = start
+    for action, direction, entry, prices in (
+        (BUY, 1, close + spread, bid),
+        (SELL, -1, close, ask),
+    ):
+        upper = entry + (tp if direction > 0 else sl)
+        lower = entry - (sl if direction > 0 else tp)
+        index, side, both = first_touch(
+            prices["High"], prices["Low"], start, upper, lower
+        )
+        side = np.where(both, -direction, side)
+        exit_price = touch_price(prices["Open"], index, side, upper, lower, start - 1)
+        still_open = index < 0
+        exit_price[still_open] = close[-1] + (spread[-1] if direction < 0 else 0.0)
+        reward[:, action] = shaped_reward((exit_price - entry) * direction)
+        resume[:, action] = np.where(still_open, n, index)
+    return {"reward": reward, "resume": resume}
+
+
+def trading_hours(
+    index: pd.DatetimeIndex, start_hour: int = 7, end_hour: int = 20
+) -> np.ndarray:
+    """Bars inside the EA's trading_start_hour..trading_end_hour filter."""
+    hours = np.asarray(index.hour)
+    return (hours >= start_hour) & (hours < end_hour)
+
+
+class QTableTrainer:
+    """Train many q-learning.mq5 Q-tables at once on historical bars.
+
+    The history is cut into episodes of ``episode_bars`` and every
+    (seed, episode) pair is a lane that steps in lockstep with all others,
+    so one numpy step advances thousands of agents. Lanes of one seed share
+    its table; their updates to the same cell within a step are averaged.
+    ``method`` is ``"sarsa"`` (the EA's stated algorithm) or
+    ``"q_learning"``. Exploration follows the EA: a random BUY or SELL with
+    probability ``epsilon / (1 + trades * 0.01)``.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.1,
+        gamma: float = 0.9,
+        epsilon: float = 0.1,
+        seeds: int = 8,
+        episode_bars: int = 2000,
+        method: str = "sarsa",
+        random_state: Optional[int] = None,
+    ):
+        if method not in ("sarsa", "q_learning"):
+            raise ValueError(f"Unknown method {method!r}")
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.seeds = seeds
+        self.episode_bars = episode_bars
+        self.method = method
+        self.rng = np.random.default_rng(random_state)
+        self.q_tables = np.zeros((seeds, RSI_BUCKETS * MA_BUCKETS, ACTIONS))
+        self.trades = np.zeros(seeds, dtype=np.int64)
+        self.history = []
+
+    def _prepare(self, states, outcomes, tradable):
+        n = len(states)
+        decide = tradable & (states >= 0)
+        # Next bar at or after t where the EA would take a decision (n when none)
+        positions = np.where(decide, np.arange(n), n)
+        next_decision = np.minimum.accumulate(positions[::-1])[::-1]
+        next_decision = np.concatenate([next_decision, [n]])
+        first = next_decision[0]
+        bounds = np.arange(first, n, self.episode_bars)
+        return next_decision, bounds, np.minimum(bounds + self.episode_bars, n)
+
+    def _act(self, q, seed, state, greedy: bool):
+        best = q[seed, state].argmax(axis=1)
+        if greedy:
+            return best
+        eps = self.epsilon / (1.0 + self.trades[seed] * 0.01)
+        explore = self.rng.random(len(seed)) < eps
+        return np.where(explore, self.rng.integers(0, 2, len(seed)), best)
+
+    def _run(self, states, outcomes, tradable, learn: bool) -> np.ndarray:
+        """Play every lane through its episode once and return reward per seed."""
+        next_decision, starts, ends = self._prepare(states, outcomes, tradable)
+        reward, resume = outcomes["reward"], outcomes["resume"]
+        q = self.q_tables
+        seed = np.repeat(np.arange(self.seeds), len(starts))
+        pos = np.tile(next_decision[starts], self.seeds)
+        end = np.tile(ends, self.seeds)
+        totals = np.zeros(self.seeds)
+
+        active = pos < end
+        seed, pos, end = seed[active], pos[active], end[active]
+        state = states[pos]
+        action = self._act(q, seed, state, greedy=not learn)
+        while len(pos):
+            r = reward[pos, action]
+            nxt = next_decision[resume[pos, action]]
+            done = nxt >= end
+            next_state = states[np.minimum(nxt, len(states) - 1)]
+            next_action = self._act(q, seed, next_state, greedy=not learn)
+            totals += np.bincount(seed, weights=r, minlength=self.seeds)
+
+            if learn:
+                if self.method == "sarsa":
+                    bootstrap = q[seed, next_state, next_action]
+                else:
+                    bootstrap = q[seed, next_state].max(axis=1)
+                target = r + self.gamma * np.where(done, 0.0, bootstrap)
+                cell = (seed * q.shape[1] + state) * ACTIONS + action
+                delta = target - q.reshape(-1)[cell]
+                sums = np.bincount(cell, weights=delta, minlength=q.size)
+                counts = np.bincount(cell, minlength=q.size)
+                touched = counts > 0
+                q.reshape(-1)[touched] += self.alpha * sums[touched] / counts[touched]
+                self.trades += np.bincount(seed[action != HOLD], minlength=self.seeds)
+
+            keep = ~done
+            seed, pos, end = seed[keep], nxt[keep], end[keep]
+            state, action = next_state[keep], next_action[keep]
+        return totals
+
+    def fit(
+        self,
+        states: np.ndarray,
+        outcomes: Dict[str, np.ndarray],
+        tradable: np.ndarray,
+        epochs: int = 50,
+    ) -> "QTableTrainer":
+        """Run ``epochs`` exploring passes over the history for every seed."""
+        for epoch in range(epochs):
+            totals = self._run(states, outcomes, tradable, learn=True)
+            self.history.append(totals)
+            logging.info(
+                f"Epoch {epoch + 1}/{epochs}: mean reward {totals.mean():.5f}, "
+                f"best seed {totals.max():.5f}"
+            )
+        return self
+
+    def evaluate(
+        self, states: np.ndarray, outcomes: Dict[str, np.ndarray], tradable: np.ndarray
+    ) -> np.ndarray:
+        """Total reward of each seed's greedy policy, without learning."""
+        return self._run(states, outcomes, tradable, learn=False)
+
+    def best_table(
+        self, states: np.ndarray, outcomes: Dict[str, np.ndarray], tradable: np.ndarray
+    ) -> np.ndarray:
+        """The (RSI_BUCKETS, MA_BUCKETS, ACTIONS) table of the best greedy seed."""
+        scores = self.evaluate(states, outcomes, tradable)
+        best = int(scores.argmax())
+        logging.info(f"Best seed {best} with greedy reward {scores[best]:.5f}")
+        return self.q_tables[best].reshape(RSI_BUCKETS, MA_BUCKETS, ACTIONS)
+
+
+def export_q_table(q_table: np.ndarray, path: str) -> str:
+    """Write the table as the CSV that LoadQTable in q-learning.mq5 reads."""
+    q_table = np.asarray(q_table).reshape(RSI_BUCKETS, MA_BUCKETS, ACTIONS)
+    rsi_index, ma_index = np.meshgrid(
+        np.arange(RSI_BUCKETS), np.arange(MA_BUCKETS), indexing="ij"
+    )
+    frame = pd.DataFrame(
+        {
+            "rsi_index": rsi_index.ravel(),
+            "ma_index": ma_index.ravel(),
+            "buy": q_table[..., BUY].ravel(),
+            "sell": q_table[..., SELL].ravel(),
+            "hold": q_table[..., HOLD].ravel(),
+        }
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame.to_csv(path, index=False, float_format="%.10g")
+    return str(path)
+
+
+def load_q_table(path: str) -> np.ndarray:
+    frame = pd.read_csv(path)
+    q_table = np.zeros((RSI_BUCKETS, MA_BUCKETS, ACTIONS))
+    q_table[frame["rsi_index"], frame["ma_index"]] = frame[
+        ["buy", "sell", "hold"]
+    ].to_numpy()
+    return q_table
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the q-learning.mq5 Q-table offline"
+    )
+    parser.add_argument("--data", required=True, help="MT5 bar export (tab separated)")
+    parser.add_argument(
+        "--out", default="q_table.csv", help="Copy into MQL5/Files for the EA"
+    )
+    parser.add_argument("--point", type=float, default=0.00001)
+    parser.add_argument("--sl-pips", type=float, default=400)
+    parser.add_argument("--risk-reward", type=float, default=2)
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--ma-scale", type=float, default=10000.0)
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--seeds", type=int, default=8)
+    parser.add_argument("--episode-bars", type=int, default=2000)
+    parser.add_argument("--method", choices=["sarsa", "q_learning"], default="sarsa")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    bars = load_bars(args.data)
+    states = market_states(
+        bars["Close"].to_numpy(dtype=np.float64), ma_scale=args.ma_scale
+    )
+    outcomes = trade_outcomes(bars, args.point, args.sl_pips, args.risk_reward)
+    tradable = trading_hours(bars.index)
+
+    trainer = QTableTrainer(
+        alpha=args.alpha,
+        gamma=args.gamma,
+        epsilon=args.epsilon,
+        seeds=args.seeds,
+        episode_bars=args.episode_bars,
+        method=args.method,
+        random_state=args.seed,
+    )
+    trainer.fit(states, outcomes, tradable, epochs=args.epochs)
+    path = export_q_table(trainer.best_table(states, outcomes, tradable), args.out)
+    logging.info(f"Q-table written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+DEFAULT_CACHE_DIR = ".backtest_cache"
+DEFAULT_MAX_BYTES = 2 * 1024**3  # Evict least recently used results above 2 GB
+_MISSING = object()
+
+
+def _update(h, value: Any) -> None:
+    """Feed a canonical byte representation of ``value`` into the hash."""
+    if isinstance(value, pd.DataFrame):
+        h.update(b"df")
+        h.update(repr(list(value.columns)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(b"series")
+        h.update(repr(value.name).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(f"nd{value.dtype.str}{value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b"dict")
+        for key in sorted(value, key=repr):
+            _update(h, key)
+            _update(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f"seq{len(value)}".encode())
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, np.generic):
+        h.update(repr(value.item()).encode())
+    else:
+        h.update(repr(value).encode())
+
+
+def data_fingerprint(data: Any) -> str:
+    """Content hash of a DataFrame, array or nested container of them."""
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, data)
+    return h.hexdigest()
+
+
+def _source(obj: Any) -> str:
+    module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+    try:
+        return inspect.getsource(module if module is not None else obj)
+    except (OSError, TypeError):
+        return getattr(obj, "__qualname__", repr(obj))
+
+
+def code_version(obj: Any, *dependencies: Any) -> str:
+    """Hash of the source of the module defining ``obj`` and of each dependency.
+
+    Only that one module is read, so edits to helpers it defines count but
+    helpers imported from elsewhere (``barriers``, ``labeling``, another
+    bot) do not unless they are passed as ``dependencies``: modules, or
+    functions and classes whose defining module is hashed.
+    """
+    sources = {}
+    for item in (obj,) + dependencies:
+        module = item if inspect.ismodule(item) else inspect.getmodule(item)
+        sources.setdefault(module.__name__ if module else repr(item), _source(item))
+    h = hashlib.blake2b(digest_size=8)
+    for source in sources.values():
+        h.update(source.encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """On-disk memoization of backtest results with size-based eviction.
+
+    Entries are keyed by strategy name, a hash of the parameters, the input
+    data fingerprint and the strategy version, and hold whatever the
+    backtest returned (trades, equity, metrics). Reading an entry refreshes
+    its timestamp; once the directory grows past ``max_bytes`` the least
+    recently used entries are deleted.
+    """
+
+    def __init__(
+        self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size: Optional[int] = None  # Running total, rescanned on eviction
+
+    def key(self, strategy: str, params: Any, data: str, version: str = "") -> str:
+        """Cache key; ``data`` is a fingerprint from :func:`data_fingerprint`."""
+        h = hashlib.blake2b(digest_size=20)
+        _update(h, (strategy, params, data, version))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pkl"
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+        os.utime(path)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self.directory.glob("*/*.pkl"))
+        replaced = path.stat().st_size if path.exists() else 0
+        # Write to a temp file and rename so concurrent readers never see partial entries
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._size += path.stat().st_size - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for path in self.directory.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            logging.info(f"Evicted {removed} cached backtests from {self.directory}")
+        return removed
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*/*.pkl"):
+            path.unlink(missing_ok=True)
+        self._size = 0
+
+    def wrap(
+        self,
+        func: Callable,
+        name: Optional[str] = None,
+        version: Optional[str] = None,
+        dependencies: Sequence[Any] = (),
+    ) -> Callable:
+        """Memoize ``func`` on its arguments, which are fingerprinted by content.
+
+        The key's code version covers ``func``'s module and the modules of
+        ``dependencies`` (see :func:`code_version`).
+        """
+        name = name or f"{func.__module__}.{func.__qualname__}"
+        version = version or code_version(func, *dependencies)
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = self.key(name, {}, data_fingerprint(dict(bound.arguments)), version)
+            result = self.get(key, _MISSING)
+            if result is not _MISSING:
+                logging.info(f"Cache hit for {name}")
+                return result
+            result = func(*args, **kwargs)
+            self.put(key, result)
+            return result
+
+        return wrapper
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from typing import Dict, List, Optional
+
+from forex.mql5.shared_env import make_shared_vec_env, rollout_rate
+from forex.mql5.trading_env import PandasTradingEnv, TradingEnv, synthetic_features
+from forex_vec_env import LoopForexEnv, VecForexEnv, synthetic_prices
+
+# Rates where higher is better; everything else in a result is informational
+RATE_KEYS = ("steps_per_sec", "timesteps_per_sec")
+
+
+def env_step_rate(env, steps: int = 20000, seed: int = 0) -> Dict[str, float]:
+    """Steps per second of one env with seeded random actions, resetting at ends."""
+    actions = np.random.default_rng(seed).integers(0, 3, steps)
+    env.reset()
+    started = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    return {"steps_per_sec": steps / (time.perf_counter() - started)}
+
+
+class _PhaseTimer(BaseCallback):
+    """Wall time of PPO's rollout collection and of the updates between them."""
+
+    def __init__(self):
+        super().__init__()
+        self.rollout_seconds: List[float] = []
+        self.update_seconds: List[float] = []
+        self._mark: Optional[float] = None
+
+    def _on_rollout_start(self) -> None:
+        now = time.perf_counter()
+        if self._mark is not None:  # Previous rollout end to now was the update
+            self.update_seconds.append(now - self._mark)
+        self._mark = now
+
+    def _on_rollout_end(self) -> None:
+        now = time.perf_counter()
+        self.rollout_seconds.append(now - self._mark)
+        self._mark = now
+
+    def _on_training_end(self) -> None:
+        self.update_seconds.append(time.perf_counter() - self._mark)
+
+    def _on_step(self) -> bool:
+        return True
+
+
+def ppo_throughput(
+    vec_env, total_timesteps: int = 8192, n_steps: int = 512, seed: int = 0
+) -> Dict[str, float]:
+    """PPO rollout and update time per iteration, and end-to-end timesteps per second."""
+    model = PPO(
+        "MlpPolicy",
+        vec_env,
+        n_steps=n_steps,
+        batch_size=64,
+        seed=seed,
+        device="cpu",
+        verbose=0,
+    )
+    timer = _PhaseTimer()
+    started = time.perf_counter()
+    model.learn(total_timesteps=total_timesteps, callback=timer)
+    seconds = time.perf_counter() - started
+    return {
+        "timesteps_per_sec": model.num_timesteps / seconds,
+        "rollout_seconds_per_iter": float(np.mean(timer.rollout_seconds)),
+        "update_seconds_per_iter": float(np.mean(timer.update_seconds)),
+        "iterations": len(timer.rollout_seconds),
+    }
+
+
+def run_suite(
+    bars: int = 50000,
+    steps: int = 20000,
+    env_counts: List[int] = (1, 4, 16),
+    ppo_timesteps: int = 8192,
+    subprocess: bool = True,
+    seed: int = 0,
+) -> Dict[str, Dict[str, float]]:
+    """Every benchmark on synthetic bars, keyed by a stable name for comparisons."""
+    results: Dict[str, Dict[str, float]] = {}
+    frame = synthetic_features(bars, seed=seed)
+    prices, features = synthetic_prices(bars, seed=seed)
+    window_size = 20
+
+    results["trading_env/pandas"] = env_step_rate(
+        PandasTradingEnv(frame), min(steps, 5000), seed
+    )
+    results["trading_env/array"] = env_step_rate(TradingEnv(frame), steps, seed)
+    results["forex_env/loop"] = env_step_rate(
+        LoopForexEnv(prices, features, window_size), steps, seed
+    )
+
+    for n_envs in env_counts:
+        modes = [("dummy", False)] + ([("subproc", True)] if subprocess else [])
+        for mode, use_subprocess in modes:
+            if use_subprocess and n_envs == 1:
+                continue
+            vec_env, shared = make_shared_vec_env(
+                frame, n_envs, seed, normalize=False, subprocess=use_subprocess
+            )
+            try:
+                rate = rollout_rate(vec_env, steps, seed)
+            finally:
+                vec_env.close()
+                shared.close()
+            results[f"trading_env/{mode}_vec_{n_envs}"] = {"steps_per_sec": rate}
+
+        vec_env = VecForexEnv((prices, features), window_size, num_envs=n_envs)
+        vec_env.seed(seed)
+        results[f"forex_env/batched_{n_envs}"] = {
+            "steps_per_sec": rollout_rate(vec_env, steps, seed)
+        }
+
+    if ppo_timesteps:
+        n_envs = max(env_counts)
+        vec_env, shared = make_shared_vec_env(
+            frame, n_envs, seed, normalize=False, subprocess=False
+        )
+        try:
+            results[f"ppo/trading_env_{n_envs}"] = ppo_throughput(
+                vec_env, ppo_timesteps, seed=seed
+            )
+        finally:
+            vec_env.close()
+            shared.close()
+        vec_env = VecForexEnv((prices, features), window_size, num_envs=n_envs)
+        vec_env.seed(seed)
+        results[f"ppo/forex_env_batched_{n_envs}"] = ppo_throughput(
+            vec_env, ppo_timesteps, seed=seed
+        )
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = 0.2,
+) -> List[str]:
+    """Rates that fell more than ``tolerance`` (a fraction) below the baseline."""
+    regressions = []
+    for name, metrics in results.items():
+        for key in RATE_KEYS:
+            old = baseline.get(name, {}).get(key)
+            new = metrics.get(key)
+            if old and new is not None and new < old * (1.0 - tolerance):
+                regressions.append(f"{name} {key}: {new:.0f} < {old:.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Env step and PPO training throughput on synthetic bars"
+    )
+    parser.add_argument("--bars", type=int, default=50000)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument(
+        "--ppo-timesteps", type=int, default=8192, help="0 skips the PPO runs"
+    )
+    parser.add_argument("--no-subprocess", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="reports/rl_benchmark.json")
+    parser.add_argument("--baseline", default=None, help="Earlier output to compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_suite(
+        args.bars,
+        args.steps,
+        args.envs,
+        args.ppo_timesteps,
+        not args.no_subprocess,
+        args.seed,
+    )
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    for name, metrics in results.items():
+        print(name, {key: round(value, 3) for key, value in metrics.items()})
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
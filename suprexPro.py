@@ -7,6 +7,9 @@ import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Conv1D, MaxPooling1D, LSTM, Flatten, Dropout
 
+from intrabar import simulate_exits
+from result_cache import ResultCache
+
 # Parameters
 pair = 'EURUSD=X'  # Forex pair
 start_date = '2023-12-01'
@@ -89,44 +92,37 @@ def identify_zones(predictions, threshold=0.005):
 zones = identify_zones(predicted_prices_rescaled)
 
 # Backtesting the strategy
-def backtest(zones, data, initial_balance, risk_per_trade, sl_pips, tp_ratio):
+def backtest(zones, data, initial_balance, risk_per_trade, sl_pips, tp_ratio, fine=None):
+    """Compound a fixed-risk trade at every zone and return the final balance.
+
+    Exits are resolved for all zones at once. Without ``fine`` the stop is
+    assumed to come first when a bar spans both levels; with ``fine`` (an
+    ``intrabar.FineData`` of M1 bars or ticks) those bars are replayed on the
+    finer data, starting after the entry bar closes.
+    """
     balance = initial_balance
-    for zone in zones:
-        zone_type, idx = zone
-        entry_price = data['Close'].iloc[idx]
-        
-        if zone_type == 'Demand':  # Buy trade at demand zone
-            sl_price = entry_price - sl_pips * pip_value
-            tp_price = entry_price + (sl_pips * tp_ratio) * pip_value
-            risk_amount = balance * risk_per_trade
-            
-            # Simulate the trade outcome
-            for j in range(idx, len(data)):
-                if data['Low'].iloc[j] <= sl_price:  # SL hit
-                    balance -= risk_amount
-                    break
-                elif data['High'].iloc[j] >= tp_price:  # TP hit
-                    balance += risk_amount * tp_ratio
-                    break
-
-        elif zone_type == 'Supply':  # Sell trade at supply zone
-            sl_price = entry_price + sl_pips * pip_value
-            tp_price = entry_price - (sl_pips * tp_ratio) * pip_value
-            risk_amount = balance * risk_per_trade
-            
-            # Simulate the trade outcome
-            for j in range(idx, len(data)):
-                if data['High'].iloc[j] >= sl_price:  # SL hit
-                    balance -= risk_amount
-                    break
-                elif data['Low'].iloc[j] <= tp_price:  # TP hit
-                    balance += risk_amount * tp_ratio
-                    break
+    if not zones:
+        return balance
+
+    idx = np.array([i for _, i in zones])
+    direction = np.array([1 if zone_type == 'Demand' else -1 for zone_type, _ in zones])
+    entry_price = data['Close'].to_numpy().ravel()[idx]
+    sl_price = entry_price - direction * sl_pips * pip_value
+    tp_price = entry_price + direction * (sl_pips * tp_ratio) * pip_value
+    entry_time = data.index[idx] + pd.Timedelta(hours=1) if fine is not None else None
+    exits = simulate_exits(data, idx, direction, sl_price, tp_price, fine=fine, entry_time=entry_time)
+
+    for reason in exits['reason']:
+        risk_amount = balance * risk_per_trade
+        if reason == 'stop':  # SL hit
+            balance -= risk_amount
+        elif reason == 'target':  # TP hit
+            balance += risk_amount * tp_ratio
 
     return balance
 
-# Run backtest on the strategy
-final_balance = backtest(zones, data, initial_balance, risk_per_trade, sl_pips, tp_ratio)
+# Run backtest on the strategy; repeat runs on the same zones and data are read from disk
+final_balance = ResultCache().wrap(backtest, dependencies=[simulate_exits])(zones, data, initial_balance, risk_per_trade, sl_pips, tp_ratio)
 
 # Print results
 print(f"Initial Balance: ${initial_balance}")
@@ -0,0 +1,171 @@
+import json
+import html
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from metrics import compute_metrics, drawdown_series
+
+SVG_POINTS = 400  # Equity curves are downsampled to this many points in the HTML page
+
+
+def summarize(
+    returns: Dict[str, pd.Series], periods_per_year: int = 252
+) -> pd.DataFrame:
+    """Score every strategy in one batched metrics call.
+
+    Returns are aligned on a common index (missing bars count as flat) and
+    turned into a (bars x strategies) equity matrix before scoring.
+    """
+    raw = pd.DataFrame(returns).sort_index()
+    frame = raw.fillna(0.0)
+    equity = np.vstack(
+        [np.ones(frame.shape[1]), np.cumprod(1.0 + frame.to_numpy(), axis=0)]
+    )
+    positions = frame.to_numpy() != 0
+    scores = compute_metrics(
+        equity, positions=positions, periods_per_year=periods_per_year
+    )
+    summary = pd.DataFrame(scores, index=frame.columns)
+    summary["bars"] = raw.notna().sum().to_numpy()
+    summary["start"] = str(frame.index[0]) if len(frame) else ""
+    summary["end"] = str(frame.index[-1]) if len(frame) else ""
+    return summary
+
+
+def _polyline(values: np.ndarray, width: int, height: int) -> str:
+    """Scale a curve into SVG polyline coordinates."""
+    if len(values) > SVG_POINTS:
+        values = values[np.linspace(0, len(values) - 1, SVG_POINTS).astype(int)]
+    low, high = float(np.min(values)), float(np.max(values))
+    span = high - low or 1.0
+    xs = np.linspace(0, width, len(values))
+    ys = height - (values - low) / span * height
+    return " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+
+
+def _render_html(name: str, stats: Dict[str, object], equity: np.ndarray) -> str:
+    """Build a small self-contained HTML page with a metrics table and two charts."""
+    rows = "".join(
+        f"<tr><th>{html.escape(str(key))}</th><td>{html.escape(str(value))}</td></tr>"
+        for key, value in stats.items()
+    )
+    drawdown = -drawdown_series(equity)
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(name)}</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse}}
+th,td{{padding:2px 12px;text-align:left;border-bottom:1px solid #ddd}}</style></head>
+<body><h2>{html.escape(name)}</h2>
+<svg width="800" height="200"><polyline fill="none" stroke="steelblue" points="{_polyline(equity, 800, 200)}"/></svg>
+<svg width="800" height="100"><polyline fill="none" stroke="firebrick" points="{_polyline(drawdown, 800, 100)}"/></svg>
+<table>{rows}</table></body></html>
+"""
+
+
+def _clean(value):
+    """Make numpy scalars and non-finite floats JSON friendly."""
+    if isinstance(value, (np.floating, float)):
+        return float(value) if np.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def write_tearsheet(
+    name: str,
+    returns: pd.Series,
+    stats: Dict[str, object],
+    output_dir: str = "reports",
+    html_page: bool = True,
+) -> str:
+    """Write the JSON summary (and optionally the HTML page) for one strategy."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stats = {key: _clean(value) for key, value in stats.items()}
+    json_path = output_dir / f"{name}.json"
+    json_path.write_text(json.dumps({"name": name, **stats}, indent=2))
+    if html_page:
+        equity = np.concatenate(
+            [[1.0], np.cumprod(1.0 + returns.fillna(0.0).to_numpy())]
+        )
+        (output_dir / f"{name}.html").write_text(_render_html(name, stats, equity))
+    return str(json_path)
+
+
+def _write_job(args) -> str:
+    return write_tearsheet(*args)
+
+
+def render_tearsheets(
+    returns: Dict[str, pd.Series],
+    output_dir: str = "reports",
+    html_page: bool = True,
+    workers: Optional[int] = None,
+    periods_per_year: int = 252,
+    finalists: int = 0,
+    rank_by: str = "sharpe",
+    benchmark: Optional[pd.Series] = None,
+) -> pd.DataFrame:
+    """Score many strategies at once and write a compact tear sheet for each.
+
+    Metrics are computed once for the whole batch, then the per-strategy
+    files are written in parallel worker processes. Only the top
+    ``finalists`` strategies by ``rank_by`` also get a full QuantStats report.
+    """
+    summary = summarize(returns, periods_per_year=periods_per_year)
+    summary = summary.sort_values(rank_by, ascending=False)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = [
+        (name, returns[name], summary.loc[name].to_dict(), str(output_dir), html_page)
+        for name in summary.index
+    ]
+    if workers == 1 or len(jobs) < 2:
+        paths: List[str] = [_write_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = list(pool.map(_write_job, jobs, chunksize=8))
+
+    records = [
+        {"name": name, **{k: _clean(v) for k, v in row.items()}}
+        for name, row in summary.to_dict(orient="index").items()
+    ]
+    (output_dir / "summary.json").write_text(json.dumps(records, indent=2))
+    logging.info(f"Wrote {len(paths)} tear sheets to {output_dir}")
+
+    if finalists:
+        write_full_reports(
+            {name: returns[name] for name in summary.index[:finalists]},
+            output_dir=output_dir,
+            benchmark=benchmark,
+        )
+    return summary
+
+
+def write_full_reports(
+    returns: Dict[str, pd.Series],
+    output_dir: str = "reports",
+    benchmark: Optional[pd.Series] = None,
+) -> List[str]:
+    """Generate heavyweight QuantStats HTML reports for a shortlist of strategies."""
+    import quantstats as qs
+
+    paths = []
+    for name, series in returns.items():
+        output_file = str(Path(output_dir) / f"{name}_quantstats.html")
+        if benchmark is not None:
+            common_dates = series.index.intersection(benchmark.index)
+            qs.reports.html(
+                series[common_dates],
+                benchmark=benchmark[common_dates],
+                output=output_file,
+                title=f"{name} Analysis",
+            )
+        else:
+            qs.reports.html(series, output=output_file, title=f"{name} Analysis")
+        paths.append(output_file)
+    return paths
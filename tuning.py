@@ -0,0 +1,488 @@
+import argparse
+import functools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional
+
+# Search spaces a worker process rebuilds by name
+MODELS = ("cnn", "cnn_lstm")
+ALGORITHMS = ("bayesian", "hyperband")
+
+
+def _head(hp, outputs: int):
+    """Output layer, loss and metrics: regression for 1 output, else classes."""
+    import tensorflow as tf
+
+    optimizer = tf.keras.optimizers.Adam(
+        hp.Float("learning_rate", 1e-4, 1e-2, sampling="log")
+    )
+    if outputs == 1:
+        return tf.keras.layers.Dense(1), optimizer, "mean_squared_error", None
+    return (
+        tf.keras.layers.Dense(outputs, activation="softmax"),
+        optimizer,
+        "sparse_categorical_crossentropy",
+        ["accuracy"],
+    )
+
+
+def build_cnn(hp, input_shape, outputs: int = 1):
+    """The Conv1D search space of cnn.py, mod_cnn.py and new_cnn.py.
+
+    ``outputs=1`` is cnn.py's next-close regression; 3 is the softmax zone
+    classifier of mod_cnn.py and new_cnn.py.
+    """
+    from tensorflow.keras.layers import Conv1D, Dense, Dropout, Flatten, MaxPooling1D
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential()
+    model.add(
+        Conv1D(
+            filters=hp.Int("filters", 32, 128, step=32),
+            kernel_size=hp.Choice("kernel_size", [3, 5]),
+            activation="relu",
+            input_shape=tuple(input_shape),
+        )
+    )
+    model.add(MaxPooling1D(pool_size=hp.Choice("pool_size", [2, 3])))
+    model.add(Flatten())
+    model.add(Dense(hp.Int("dense_units", 32, 128, step=32), activation="relu"))
+    model.add(Dropout(hp.Float("dropout", 0.2, 0.5, step=0.1)))
+    output, optimizer, loss, metrics = _head(hp, outputs)
+    model.add(output)
+    model.compile(optimizer=optimizer, loss=loss, metrics=metrics)
+    return model
+
+
+def build_cnn_lstm(hp, input_shape, outputs: int = 1):
+    """The Conv1D + LSTM + attention search space of new_test.py."""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    inputs = tf.keras.Input(shape=tuple(input_shape))
+    x = layers.Conv1D(
+        filters=hp.Int("filters", 32, 128, step=32),
+        kernel_size=hp.Choice("kernel_size", [3, 5]),
+        activation="relu",
+    )(inputs)
+    x = layers.MaxPooling1D(pool_size=hp.Choice("pool_size", [2, 3]))(x)
+    x = layers.LSTM(hp.Int("lstm_units", 32, 128, step=32), return_sequences=True)(x)
+    x = layers.Attention()([x, x])
+    x = layers.Flatten()(x)
+    x = layers.Dense(hp.Int("dense_units", 32, 128, step=32), activation="relu")(x)
+    x = layers.Dropout(hp.Float("dropout", 0.2, 0.5, step=0.1))(x)
+    output, optimizer, loss, metrics = _head(hp, outputs)
+    model = tf.keras.Model(inputs, output(x))
+    model.compile(optimizer=optimizer, loss=loss, metrics=metrics)
+    return model
+
+
+def save_dataset(directory, X: np.ndarray, y: np.ndarray) -> Path:
+    """Write the prepared arrays once; every worker memory-maps the same files."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "X.npy", np.ascontiguousarray(X, dtype=np.float32))
+    np.save(directory / "y.npy", np.ascontiguousarray(y))
+    return directory
+
+
+def load_dataset(directory):
+    directory = Path(directory)
+    return (
+        np.load(directory / "X.npy", mmap_mode="r"),
+        np.load(directory / "y.npy", mmap_mode="r"),
+    )
+
+
+def early_stopping(patience: int = 3, monitor: str = "val_loss"):
+    """Stop a fit once ``monitor`` stalls, keeping the best epoch's weights."""
+    import tensorflow as tf
+
+    return tf.keras.callbacks.EarlyStopping(
+        monitor=monitor, patience=patience, restore_best_weights=True
+    )
+
+
+def _tuner(
+    hypermodel,
+    algorithm: str = "bayesian",
+    objective: str = "val_loss",
+    max_trials: int = 10,
+    executions_per_trial: int = 2,
+    max_epochs: int = 20,
+    factor: int = 3,
+    seed: Optional[int] = None,
+    directory: str = "tuner_dir",
+    project_name: str = "search",
+):
+    import keras_tuner as kt
+
+    if algorithm == "hyperband":
+        return kt.Hyperband(
+            hypermodel,
+            objective=objective,
+            max_epochs=max_epochs,
+            factor=factor,
+            hyperband_iterations=1,
+            seed=seed,
+            directory=directory,
+            project_name=project_name,
+            overwrite=False,
+        )
+    if algorithm != "bayesian":
+        raise ValueError(f"Unknown algorithm {algorithm!r}; expected {ALGORITHMS}")
+    return kt.BayesianOptimization(
+        hypermodel,
+        objective=objective,
+        max_trials=max_trials,
+        executions_per_trial=executions_per_trial,
+        seed=seed,
+        directory=directory,
+        project_name=project_name,
+        overwrite=False,
+    )
+
+
+def halving_search(
+    build_model,
+    X: np.ndarray,
+    y: np.ndarray,
+    max_epochs: int = 20,
+    factor: int = 3,
+    patience: int = 2,
+    validation_split: float = 0.2,
+    batch_size: int = 32,
+    objective: str = "val_loss",
+    seed: Optional[int] = None,
+    directory: str = "tuner_dir",
+    project_name: str = "halving_search",
+):
+    """Hyperband search with early stopping; returns ``(model, best_hps)``.
+
+    Hyperband runs brackets of successive halving: many configurations get
+    a few epochs, and only the best ``1 / factor`` of each rung is trained
+    further, up to ``max_epochs``. Early stopping also ends a trial inside
+    its budget once ``objective`` stops improving for ``patience`` epochs.
+    The returned model carries the best trial's checkpointed weights, so
+    callers fine-tune it rather than retraining from scratch.
+    """
+    tuner = _tuner(
+        build_model,
+        "hyperband",
+        objective=objective,
+        max_epochs=max_epochs,
+        factor=factor,
+        seed=seed,
+        directory=directory,
+        project_name=project_name,
+    )
+    tuner.search(
+        X,
+        y,
+        validation_split=validation_split,
+        batch_size=batch_size,
+        callbacks=[early_stopping(patience, objective)],
+    )
+    best_hps = tuner.get_best_hyperparameters(num_trials=1)[0]
+    return tuner.get_best_models(num_models=1)[0], best_hps
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _hypermodel(model: str, input_shape, outputs: int):
+    """The named search space bound to one input shape and output head."""
+    builder = {"cnn": build_cnn, "cnn_lstm": build_cnn_lstm}[model]
+    return functools.partial(builder, input_shape=input_shape, outputs=outputs)
+
+
+def _make_tuner(config: Dict[str, object]):
+    return _tuner(
+        _hypermodel(config["model"], config["input_shape"], config["outputs"]),
+        config["algorithm"],
+        objective=config["objective"],
+        max_trials=config["max_trials"],
+        executions_per_trial=config["executions_per_trial"],
+        max_epochs=config["max_epochs"],
+        factor=config["factor"],
+        seed=config["seed"],
+        directory=config["directory"],
+        project_name=config["project_name"],
+    )
+
+
+def _run_process(config_path: str) -> None:
+    """Body of a chief or worker; KERASTUNER_* and thread env vars are already set."""
+    import tensorflow as tf
+
+    threads = int(os.environ.get("TF_NUM_INTRAOP_THREADS", "1"))
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    config = json.loads(Path(config_path).read_text())
+    _search(config, *load_dataset(config["data_dir"]), verbose=0)
+
+
+def _search(config: Dict[str, object], X, y, verbose: int = 1):
+    """Run the search ``config`` describes; in a worker, that tuner's share of it."""
+    tuner = _make_tuner(config)  # The chief serves the oracle here until done
+    patience = config["patience"]
+    tuner.search(
+        X,
+        y,
+        epochs=config["epochs"],  # Hyperband sets each trial's own budget
+        validation_split=config["validation_split"],
+        batch_size=config["batch_size"],
+        callbacks=[early_stopping(patience, config["objective"])] if patience else [],
+        verbose=verbose,
+    )
+    return tuner
+
+
+def parallel_search(
+    model: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    outputs: int = 1,
+    workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+    max_trials: int = 10,
+    executions_per_trial: int = 2,
+    epochs: int = 5,
+    validation_split: float = 0.2,
+    batch_size: int = 32,
+    objective: str = "val_loss",
+    algorithm: str = "bayesian",
+    max_epochs: int = 20,
+    factor: int = 3,
+    patience: Optional[int] = None,
+    seed: Optional[int] = None,
+    directory: str = "tuner_dir",
+    project_name: str = "parallel_search",
+    timeout: Optional[float] = None,
+):
+    """Run one keras-tuner search with trials in parallel processes.
+
+    keras-tuner's distributed mode does the coordination: a chief process
+    serves the oracle on a localhost port and ``workers`` tuner processes
+    ask it for trials, so no two run the same hyperparameters. The data is
+    saved once under ``directory/project_name/data`` and memory-mapped by
+    every worker. Each process gets ``threads_per_worker`` TF/OpenMP
+    threads (default: the cores split evenly), so trials don't
+    oversubscribe the CPU. Workers are fresh interpreters, so the calling
+    script is not re-imported in them. ``algorithm="hyperband"`` with a
+    ``patience`` gives the budgets and pruning of :func:`halving_search`.
+    ``workers=1`` runs the same search in this process, with no oracle or
+    worker processes, so a serial run tunes exactly what workers would.
+    Returns the best hyperparameters.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; expected one of {MODELS}")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm {algorithm!r}; expected {ALGORITHMS}")
+    cpus = os.cpu_count() or 1
+    workers = workers or max(1, min(cpus, max_trials))
+    threads = threads_per_worker or max(1, cpus // workers)
+
+    config = {
+        "model": model,
+        "input_shape": list(X.shape[1:]),
+        "outputs": outputs,
+        "max_trials": max_trials,
+        "executions_per_trial": executions_per_trial,
+        "epochs": epochs,
+        "validation_split": validation_split,
+        "batch_size": batch_size,
+        "objective": objective,
+        "algorithm": algorithm,
+        "max_epochs": max_epochs,
+        "factor": factor,
+        "patience": patience,
+        "seed": seed,
+        "directory": str(directory),
+        "project_name": project_name,
+    }
+    if workers == 1:
+        return _search(config, X, y).get_best_hyperparameters(num_trials=1)[0]
+
+    project_dir = Path(directory) / project_name
+    config["data_dir"] = str(save_dataset(project_dir / "data", X, y))
+    config_path = project_dir / "search.json"
+    config_path.write_text(json.dumps(config, indent=2))
+
+    port = str(_free_port())
+    thread_env = {
+        "OMP_NUM_THREADS": str(threads),
+        "TF_NUM_INTRAOP_THREADS": str(threads),
+        "TF_NUM_INTEROP_THREADS": "1",
+        "KERASTUNER_ORACLE_IP": "127.0.0.1",
+        "KERASTUNER_ORACLE_PORT": port,
+    }
+    command = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--worker",
+        str(config_path),
+    ]
+
+    def spawn(tuner_id: str) -> subprocess.Popen:
+        env = dict(os.environ, KERASTUNER_TUNER_ID=tuner_id, **thread_env)
+        return subprocess.Popen(command, env=env)
+
+    chief = spawn("chief")
+    tuners = [spawn(f"tuner{i}") for i in range(workers)]
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        for process in tuners:
+            remaining = (
+                None if deadline is None else max(0, deadline - time.monotonic())
+            )
+            process.wait(remaining)
+        chief.wait(60)  # Exits once the oracle has no trials left
+    except subprocess.TimeoutExpired:
+        pass
+    finally:
+        for process in [chief] + tuners:
+            if process.poll() is None:
+                process.terminate()
+                process.wait()
+    failed = [p.returncode for p in tuners if p.returncode]
+    if failed:
+        raise RuntimeError(f"{len(failed)} tuner worker(s) failed: {failed}")
+
+    for name in (
+        "KERASTUNER_TUNER_ID",
+        "KERASTUNER_ORACLE_IP",
+        "KERASTUNER_ORACLE_PORT",
+    ):
+        os.environ.pop(name, None)  # Reload the finished oracle locally
+    return _make_tuner(config).get_best_hyperparameters(num_trials=1)[0]
+
+
+def tune(
+    model: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    outputs: int = 1,
+    mode: str = "bayesian",
+    workers: int = 1,
+    max_trials: int = 10,
+    executions_per_trial: int = 2,
+    epochs: int = 5,
+    max_epochs: int = 20,
+    patience: int = 2,
+    validation_split: float = 0.2,
+    directory: str = "tuner_dir",
+    project_name: str = "search",
+):
+    """Search ``model``'s space; returns ``(model, best_hps, callbacks)``.
+
+    ``mode="bayesian"`` runs Bayesian optimisation of ``epochs``-long trials
+    through :func:`parallel_search`, in ``workers`` processes (1 searches in
+    this process), and returns a fresh model built from the best trial.
+    ``mode="hyperband"`` prunes trials by successive halving with early
+    stopping instead; in one process it keeps the best trial's weights (see
+    :func:`halving_search`), so the final fit only fine-tunes them.
+    ``callbacks`` are for that final fit: early stopping after Hyperband,
+    none after a Bayesian search. Hyperband results go to
+    ``<project_name>_hyperband`` so the two modes never share an oracle.
+    """
+    if mode not in ALGORITHMS:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {ALGORITHMS}")
+    build = _hypermodel(model, X.shape[1:], outputs)
+    if mode == "hyperband":
+        project_name = f"{project_name}_hyperband"
+        callbacks = [early_stopping(patience=3)]
+        if workers == 1:
+            tuned, best_hps = halving_search(
+                build,
+                X,
+                y,
+                max_epochs=max_epochs,
+                patience=patience,
+                validation_split=validation_split,
+                directory=directory,
+                project_name=project_name,
+            )
+            return tuned, best_hps, callbacks
+    else:
+        callbacks = []
+    best_hps = parallel_search(
+        model,
+        X,
+        y,
+        outputs=outputs,
+        workers=workers,
+        max_trials=max_trials,
+        executions_per_trial=executions_per_trial,
+        epochs=epochs,
+        validation_split=validation_split,
+        algorithm=mode,
+        max_epochs=max_epochs,
+        patience=patience if mode == "hyperband" else None,
+        directory=directory,
+        project_name=project_name,
+    )
+    return build(best_hps), best_hps, callbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parallel keras-tuner search over saved training arrays"
+    )
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--model", choices=MODELS, default="cnn")
+    parser.add_argument("--data", help="Directory with X.npy and y.npy")
+    parser.add_argument(
+        "--outputs", type=int, default=1, help="1 regresses, >1 classes"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None, help="Per worker")
+    parser.add_argument("--max-trials", type=int, default=10)
+    parser.add_argument("--executions", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="bayesian")
+    parser.add_argument("--max-epochs", type=int, default=20, help="Hyperband")
+    parser.add_argument("--factor", type=int, default=3, help="Hyperband")
+    parser.add_argument("--patience", type=int, default=None)
+    parser.add_argument("--directory", default="tuner_dir")
+    parser.add_argument("--project", default="parallel_search")
+    args = parser.parse_args()
+
+    if args.worker:
+        _run_process(args.worker)
+        return
+    if not args.data:
+        parser.error("--data is required")
+    X, y = load_dataset(args.data)
+    best = parallel_search(
+        args.model,
+        np.asarray(X),
+        np.asarray(y),
+        outputs=args.outputs,
+        workers=args.workers,
+        threads_per_worker=args.threads,
+        max_trials=args.max_trials,
+        executions_per_trial=args.executions,
+        epochs=args.epochs,
+        algorithm=args.algorithm,
+        max_epochs=args.max_epochs,
+        factor=args.factor,
+        patience=args.patience,
+        directory=args.directory,
+        project_name=args.project,
+    )
+    print(json.dumps(best.values, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import json
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Callable, Dict, List
+
+
+class StridedWindows:
+    """Window observations over a fixed feature matrix as zero-copy views.
+
+    ``at(tick)`` is the ``window_size`` rows ending at ``tick``, the slice
+    ``signal_features[tick - window_size + 1 : tick + 1]`` of the notebook
+    ``TradingEnv``; ``ending_before(step)`` is the ``seq_length`` window
+    ``df.iloc[step - seq_length : step]`` of the ForexEnv variants. Both
+    index one strided view of the matrix, so no feature data is copied per
+    step. ``batch(ticks)`` gathers the windows of many envs at once.
+    """
+
+    def __init__(self, features, window_size: int, dtype=np.float32):
+        if isinstance(features, pd.DataFrame):
+            features = features.to_numpy(dtype=dtype)
+        features = np.ascontiguousarray(features, dtype=dtype)
+        if features.ndim == 1:
+            features = features[:, None]
+        if len(features) < window_size:
+            raise ValueError("Fewer rows than window_size.")
+        # Freeze a view only; the caller's array may be this very buffer
+        features = features.view()
+        features.flags.writeable = False
+        self.features = features
+        self.window_size = window_size
+        # windows[i] holds rows i .. i + window_size - 1
+        self.windows = sliding_window_view(features, window_size, axis=0).transpose(
+            0, 2, 1
+        )
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    @property
+    def shape(self):
+        return self.windows.shape[1:]
+
+    def at(self, tick: int) -> np.ndarray:
+        return self.windows[tick - self.window_size + 1]
+
+    def ending_before(self, step: int) -> np.ndarray:
+        return self.windows[step - self.window_size]
+
+    def batch(self, ticks: np.ndarray) -> np.ndarray:
+        return self.windows[np.asarray(ticks) - self.window_size + 1]
+
+
+class RingWindow:
+    """Rolling window of the latest rows for live or streaming observations.
+
+    Rows are written twice into a preallocated buffer of ``2 * window_size``
+    rows, so the current window is always one contiguous slice of it. The
+    ``window_size`` possible slices are built once, which makes :meth:`push`
+    and :meth:`window` allocation-free. The returned view is overwritten by
+    later pushes; copy it if it has to outlive the next row.
+    """
+
+    def __init__(self, window_size: int, n_features: int, dtype=np.float32):
+        self.window_size = window_size
+        self._buffer = np.zeros((2 * window_size, n_features), dtype=dtype)
+        self._views = [
+            self._buffer[head : head + window_size] for head in range(window_size)
+        ]
+        for view in self._views:
+            view.flags.writeable = False
+        self._head = 0  # Next row to overwrite, also the oldest row of the window
+        self.count = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.window_size
+
+    def push(self, row) -> np.ndarray:
+        """Append one feature row and return the window ending with it."""
+        head = self._head
+        self._buffer[head] = row
+        self._buffer[head + self.window_size] = row
+        head += 1
+        self._head = 0 if head == self.window_size else head
+        self.count += 1
+        return self._views[self._head]
+
+    def extend(self, rows) -> np.ndarray:
+        """Prime the window from history; only the last ``window_size`` rows matter."""
+        rows = np.asarray(rows)[-self.window_size :]
+        for row in rows:
+            self.push(row)
+        return self.window()
+
+    def window(self) -> np.ndarray:
+        """Rows oldest first; zeros stand in for rows not pushed yet."""
+        return self._views[self._head]
+
+
+def _measure(fn: Callable[[int], np.ndarray], ticks: range) -> Dict[str, float]:
+    started = time.perf_counter()
+    for tick in ticks:
+        fn(tick)
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    retained = [fn(tick) for tick in ticks[:1000]]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {
+        "us_per_obs": seconds / len(ticks) * 1e6,
+        "bytes_per_obs": allocated / len(retained),
+    }
+
+
+def benchmark(
+    window_sizes: List[int], bars: int = 20000, columns: int = 16, seed: int = 0
+) -> List[Dict[str, float]]:
+    """Per-observation time and retained bytes of each provider per window size.
+
+    ``bytes_per_obs`` counts memory still held when 1000 observations are
+    kept alive, i.e. what each one costs a rollout buffer that stores it.
+    """
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.normal(size=(bars, columns)).astype(np.float32))
+    features = frame.to_numpy()
+    results = []
+    for window_size in window_sizes:
+        ticks = range(window_size, bars)
+        strided = StridedWindows(features, window_size)
+        ring = RingWindow(window_size, columns)
+        ring.extend(features[:window_size])
+        providers = {
+            "iloc_values": lambda t: frame.iloc[t - window_size : t].values,
+            "slice_copy": lambda t: np.array(features[t - window_size + 1 : t + 1]),
+            "strided_view": strided.at,
+            "ring_push": lambda t: ring.push(features[t]),
+        }
+        for name, fn in providers.items():
+            row = {"window_size": window_size, "provider": name}
+            row.update(_measure(fn, ticks))
+            results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark window observation providers"
+    )
+    parser.add_argument("--windows", type=int, nargs="+", default=[5, 20, 64, 256])
+    parser.add_argument("--bars", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            benchmark(args.windows, args.bars, args.columns, args.seed), indent=2
+        )
+    )